@@ -0,0 +1,95 @@
+"""Cost of routing one button tap as the number of callback handlers grows.
+
+Compares the CallbackRouter (one handler, a dict lookup on the action) with
+the previous layout, one Pyrogram CallbackQueryHandler with a filters.regex
+per action, checked in order until one matches. Each is timed for the first
+and the last registered action:
+
+    python -m bench.callbacks
+    python -m bench.callbacks --json --max-router-us 50   # CI
+
+Exits with 1 when a router dispatch takes longer than --max-router-us.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+
+os.environ.setdefault("MONGO_DB_URI", "mongodb://localhost:1")  # importing `diary` never connects
+
+HANDLER_COUNTS = (4, 16, 64, 256)
+
+
+async def handled(client, callback_query, *args):
+    pass
+
+
+async def regex_dispatch(handlers, client, update):
+    """✅ Pyrogram's dispatch: the first handler whose filter matches runs"""
+    for handler in handlers:
+        if await handler.check(client, update):
+            await handler.callback(client, update)
+            return
+
+
+async def time_per_call(call, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await call()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+async def measure(count, iterations):
+    from pyrogram import filters
+    from pyrogram.handlers import CallbackQueryHandler
+
+    from bench.loadgen import FakeClient, FakeUser
+    from diary.callbacks import CallbackRouter, encode
+    from diary.metrics import instrument
+
+    client = FakeClient()
+    user = FakeUser(client, 1)
+    actions = [f"action{i}" for i in range(count)]
+
+    router = CallbackRouter()
+    for action in actions:
+        router.route(action)(handled)
+    # Timed like the router's routes, so only the routing differs
+    regex_handlers = [CallbackQueryHandler(instrument(handled), filters.regex(f"^{re.escape(encode(action))}$")) for action in actions]
+
+    result = {"handlers": count}
+    for position, action in (("first", actions[0]), ("last", actions[-1])):
+        update = user.callback(encode(action))
+        result[f"router_{position}_us"] = round(await time_per_call(lambda: router.dispatch(client, update), iterations), 2)
+        result[f"regex_{position}_us"] = round(await time_per_call(lambda: regex_dispatch(regex_handlers, client, update), iterations), 2)
+    return result
+
+
+async def main(args):
+    results = [await measure(count, args.iterations) for count in HANDLER_COUNTS]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"\nµs per tap, {args.iterations} taps each\n")
+        print(f"{'handlers':>10}{'router 1st':>12}{'router last':>13}{'regex 1st':>12}{'regex last':>12}")
+        for result in results:
+            print(f"{result['handlers']:>10}{result['router_first_us']:>12}{result['router_last_us']:>13}"
+                  f"{result['regex_first_us']:>12}{result['regex_last_us']:>12}")
+
+    worst = max(max(result["router_first_us"], result["router_last_us"]) for result in results)
+    if args.max_router_us and worst > args.max_router_us:
+        print(f"router dispatch above {args.max_router_us} µs", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure callback dispatch cost by handler count")
+    parser.add_argument("--iterations", type=int, default=2000, help="taps timed per case (default 2000)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--max-router-us", type=float, help="fail when a router dispatch takes longer than this")
+    sys.exit(asyncio.run(main(parser.parse_args())))
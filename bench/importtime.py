@@ -0,0 +1,105 @@
+"""Cold-start import cost, from `python -X importtime`.
+
+Imports what `python -m diary` imports before the event loop starts, plus
+every handler module (load_modules()), in a fresh interpreter --runs times
+and keeps the fastest run:
+
+    python -m bench.importtime                  # budgets: 2500 ms total, 150 ms own
+    python -m bench.importtime --json --max-own-ms 50   # CI, tighter
+
+"total" is everything imported; "own" only counts this repo's modules
+(`diary.*` and `config`, their self time), which is what a change here can
+regress. Exits with 1 when a budget is exceeded or a dependency that should
+load lazily (the KDF libraries, Flask, pytz) is imported at startup.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP = "import diary.__main__; from diary.modules import load_modules; load_modules()"
+
+# Only imported when first used
+DEFERRED = ("bcrypt", "argon2", "flask", "pytz")
+
+
+def import_times():
+    """✅ `(name, depth, self_us, cumulative_us)` for every import of one cold start"""
+    env = dict(os.environ, PYTHONPATH=ROOT, MONGO_DB_URI="mongodb://localhost:1")  # no SRV lookup
+    with tempfile.TemporaryDirectory() as cwd:  # the bot's log.txt lands here
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", STARTUP],
+            cwd=cwd, env=env, capture_output=True, text=True,
+        )
+    if result.returncode:
+        sys.exit(f"startup failed:\n{result.stderr[-2000:]}")
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # the header
+        name = name[1:]
+        depth = (len(name) - len(name.lstrip())) // 2
+        imports.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return imports
+
+
+def is_own(name):
+    return name == "config" or name == "diary" or name.startswith("diary.")
+
+
+def summarize(imports):
+    # Top-level packages (pyrogram, aiohttp, ...) with everything they pulled in
+    packages = sorted((entry for entry in imports if "." not in entry[0] and not is_own(entry[0])), key=lambda entry: -entry[3])
+    return {
+        "total_ms": round(sum(entry[3] for entry in imports if entry[1] == 0) / 1000, 1),
+        "own_ms": round(sum(entry[2] for entry in imports if is_own(entry[0])) / 1000, 1),
+        "modules": len(imports),
+        "slowest": [{"module": name, "cumulative_ms": round(cumulative / 1000, 1)} for name, _, _, cumulative in packages[:10]],
+        "deferred_imported": sorted({entry[0] for entry in imports if entry[0].split(".")[0] in DEFERRED}),
+    }
+
+
+def main(args):
+    runs = [summarize(import_times()) for _ in range(args.runs)]
+    report = min(runs, key=lambda run: run["total_ms"])
+    report["own_ms"] = min(run["own_ms"] for run in runs)
+    report["runs"] = args.runs
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"\ncold start imports, best of {args.runs}: {report['total_ms']} ms total, "
+              f"{report['own_ms']} ms in diary / config, {report['modules']} modules\n")
+        for entry in report["slowest"]:
+            print(f"{entry['cumulative_ms']:>10} ms  {entry['module']}")
+        if report["deferred_imported"]:
+            print(f"\nimported at startup, should be lazy: {', '.join(report['deferred_imported'])}")
+
+    failed = False
+    if report["deferred_imported"]:
+        print(f"{', '.join(report['deferred_imported'])} must not be imported at startup", file=sys.stderr)
+        failed = True
+    if args.max_ms and report["total_ms"] > args.max_ms:
+        print(f"total import time above the {args.max_ms} ms budget", file=sys.stderr)
+        failed = True
+    if args.max_own_ms and report["own_ms"] > args.max_own_ms:
+        print(f"diary / config import time above the {args.max_own_ms} ms budget", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure cold-start import time")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to start (default 5)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--max-ms", type=float, default=2500, help="fail when all imports take longer (default 2500)")
+    parser.add_argument("--max-own-ms", type=float, default=150, help="fail when diary / config modules take longer (default 150)")
+    sys.exit(main(parser.parse_args()))
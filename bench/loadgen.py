@@ -0,0 +1,534 @@
+"""Offline load generator for the register / login flows.
+
+Drives the real handlers (filters, per-user dispatcher, sessions, KDF pool,
+Mongo code) with synthetic Pyrogram updates. Telegram is replaced by a fake
+client that answers instantly, Mongo by mongomock-motor unless --mongo-uri
+points at a throwaway mongod.
+
+    python -m bench.loadgen --users 500 --concurrency 100
+    python -m bench.loadgen --users 200 --json --max-p99-ms 2000   # CI
+
+Reports flows per second, p50/p99 latency per step and per flow, peak RSS
+and Mongo operations per flow (mongomock only). Exits with 1 when a handler
+raised or --max-p99-ms is exceeded.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from types import SimpleNamespace
+
+PASSWORD = "loadgen-pass!"
+
+### 🔹 Setup (must run before `diary` is imported)
+def patch_mongo(mongo_uri):
+    # FakeClient's file_ids must not end up in the real media_cache.json
+    os.environ["MEDIA_CACHE_FILE"] = os.path.join(tempfile.mkdtemp(prefix="diary-bench-"), "media_cache.json")
+
+    if mongo_uri:
+        os.environ["MONGO_DB_URI"] = mongo_uri
+        return None
+
+    try:
+        import mongomock.collection
+        import motor.motor_asyncio
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        sys.exit("mongomock-motor is not installed: pip install mongomock-motor, or pass --mongo-uri")
+
+    class MockClient(AsyncMongoMockClient):
+        def __init__(self, *args, **kwargs):
+            super().__init__()  # pool / listener options mean nothing here
+
+    motor.motor_asyncio.AsyncIOMotorClient = MockClient
+
+    # Count top-level operations (mongomock calls its own methods internally)
+    ops = Counter()
+    depth = [0]
+    names = (
+        "find", "find_one", "insert_one", "insert_many", "update_one", "update_many", "replace_one",
+        "delete_one", "delete_many", "find_one_and_update", "find_one_and_delete", "aggregate",
+        "bulk_write", "count_documents",
+    )
+    for name in names:
+        original = getattr(mongomock.collection.Collection, name)
+
+        def counted(self, *args, _original=original, _name=name, **kwargs):
+            if depth[0] == 0:
+                ops[_name] += 1
+            depth[0] += 1
+            try:
+                return _original(self, *args, **kwargs)
+            finally:
+                depth[0] -= 1
+
+        setattr(mongomock.collection.Collection, name, counted)
+    return ops
+
+
+### 🔹 Fake Telegram
+class FakeClient:
+    """✅ Stands in for the bot's Pyrogram client: every API call succeeds at once"""
+
+    def __init__(self):
+        from pyrogram.enums import ParseMode
+        from pyrogram.types import User
+
+        self.me = User(id=1, is_bot=True, first_name="Diary", username="DiaryBot")
+        self.parse_mode = ParseMode.DEFAULT
+        self.calls = Counter()
+        self._ids = itertools.count(1_000_000)
+
+    # pyrofork's conversation listeners, none are used by the bot
+    def get_listener_matching_with_data(self, data, listener_type):
+        return None
+
+    def get_listener_matching_with_identifier_pattern(self, pattern, listener_type):
+        return None
+
+    def _sent(self, chat_id, **fields):
+        return SimpleNamespace(id=next(self._ids), chat=SimpleNamespace(id=chat_id), **fields)
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.calls["send_message"] += 1
+        return self._sent(chat_id, text=text, photo=None)
+
+    async def send_photo(self, chat_id, photo, **kwargs):
+        self.calls["send_photo"] += 1
+        return self._sent(chat_id, photo=SimpleNamespace(file_id=f"fake-{hash(photo)}"))
+
+    async def send_document(self, chat_id, document, **kwargs):
+        self.calls["send_document"] += 1
+        file_id = document if isinstance(document, str) and not os.path.exists(document) else f"fake-{next(self._ids)}"
+        return self._sent(chat_id, document=SimpleNamespace(file_id=file_id))
+
+    async def answer_callback_query(self, callback_query_id, **kwargs):
+        self.calls["answer_callback_query"] += 1
+        return True
+
+    async def edit_message_text(self, chat_id, message_id, text, **kwargs):
+        self.calls["edit_message_text"] += 1
+        return self._sent(chat_id, text=text)
+
+    async def delete_messages(self, chat_id, message_ids, **kwargs):
+        self.calls["delete_messages"] += 1
+        return len(message_ids) if isinstance(message_ids, list) else 1
+
+
+class FakeUser:
+    """✅ One simulated Telegram user sending updates"""
+
+    def __init__(self, client, user_id):
+        from pyrogram.enums import ChatType
+        from pyrogram.types import Chat, User
+
+        self.client = client
+        self.user = User(id=user_id, is_bot=False, first_name=f"user{user_id}", client=client)
+        self.chat = Chat(id=user_id, type=ChatType.PRIVATE)
+        self._ids = itertools.count(1)
+
+    def message(self, text):
+        from pyrogram.types import Message
+
+        return Message(id=next(self._ids), chat=self.chat, from_user=self.user, text=text, client=self.client)
+
+    def callback(self, data):
+        from pyrogram.types import CallbackQuery, Message
+
+        # Buttons sit on the bot's messages
+        message = Message(id=next(self._ids), chat=self.chat, from_user=self.client.me, text="", client=self.client)
+        return CallbackQuery(
+            client=self.client, id=str(next(self._ids)), from_user=self.user,
+            chat_instance="loadgen", message=message, data=data,
+        )
+
+
+### 🔹 Driving Handlers
+async def feed(bot, client, update):
+    """✅ Pyrogram's dispatch: the first matching handler of each group runs"""
+    from pyrogram.handlers import CallbackQueryHandler, MessageHandler
+    from pyrogram.types import CallbackQuery, Message
+
+    kinds = {MessageHandler: Message, CallbackQueryHandler: CallbackQuery}
+    for handlers in bot.dispatcher.groups.values():
+        for handler in handlers:
+            if isinstance(update, kinds.get(type(handler), ())) and await handler.check(client, update):
+                await handler.callback(client, update)
+                break
+
+
+class Flow:
+    def __init__(self, bot, client, user_id, username):
+        self.bot = bot
+        self.client = client
+        self.user = FakeUser(client, user_id)
+        self.username = username
+        self.steps = []  # (name, seconds)
+
+    async def step(self, name, update):
+        started = time.perf_counter()
+        await feed(self.bot, self.client, update)
+        await self.bot.user_dispatcher.join(self.user.user.id)  # handlers run queued per user
+        self.steps.append((name, time.perf_counter() - started))
+
+    async def register(self):
+        from diary.callbacks import encode
+
+        user = self.user
+        await self.step("start", user.message("/start"))
+        await self.step("register", user.callback(encode("register")))
+        await self.step("username", user.message(self.username))
+        await self.step("nickname", user.message(self.username[:12]))
+        await self.step("password", user.message(PASSWORD))
+        await self.step("email", user.message(f"{self.username}@gmail.com"))
+        await self.step("register_confirm", user.callback(encode("confirm")))
+
+    async def login(self):
+        from diary.callbacks import encode
+
+        user = self.user
+        await self.step("login", user.callback(encode("login")))
+        await self.step("login_username", user.message(self.username))
+        await self.step("login_password", user.message(PASSWORD))
+        await self.step("login_confirm", user.callback(encode("confirm")))
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def run_phase(name, flows, method, concurrency, ops):
+    slots = asyncio.Semaphore(concurrency)
+    durations = []
+    ops_before = sum(ops.values()) if ops is not None else 0
+
+    async def one(flow):
+        async with slots:
+            started = time.perf_counter()
+            await getattr(flow, method)()
+            durations.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(flow) for flow in flows))
+    elapsed = time.perf_counter() - started
+    return {
+        "flow": name,
+        "flows": len(flows),
+        "seconds": round(elapsed, 3),
+        "flows_per_second": round(len(flows) / elapsed, 2),
+        "p50_ms": round(percentile(durations, 0.50) * 1000, 1),
+        "p99_ms": round(percentile(durations, 0.99) * 1000, 1),
+        "db_ops_per_flow": round((sum(ops.values()) - ops_before) / len(flows), 1) if ops is not None else None,
+    }
+
+
+def offline(mocked, rate_limits=False):
+    """✅ Settings every offline bot needs: mongomock quirks, and no rate limits unless asked"""
+    from diary import ratelimit
+    import diary.database
+
+    if mocked:
+        # mongomock-motor does not wrap collections made by `with_options`
+        diary.database.users_read_db = diary.database.users_db
+
+    if not rate_limits:
+        for limiter in (ratelimit.chat_send_limiter, ratelimit.global_send_limiter, ratelimit.kdf_limiter):
+            limiter.rate = limiter.burst = 1e9
+
+
+async def start_bot(mocked, rate_limits=False):
+    """✅ The bot with its handlers and background services, fed by a FakeClient"""
+    from diary import DiaryBot
+    from diary.modules import load_modules
+    from diary.database.indexes import ensure_indexes
+
+    offline(mocked, rate_limits)
+    client = FakeClient()
+    DiaryBot.username = client.me.username
+    DiaryBot.delete_messages = client.delete_messages
+    load_modules()
+    await ensure_indexes()
+    await DiaryBot.sessions.start()
+    await DiaryBot.deleter.start()
+    await DiaryBot.pending_users.start()
+    return DiaryBot, client
+
+async def stop_bot(bot):
+    from diary.database.password import shutdown_kdf_pool
+
+    await bot.pending_users.stop()
+    await bot.deleter.stop()
+    await bot.sessions.stop()
+    shutdown_kdf_pool()
+
+
+### 🔹 Sharded Workers (`diary.sharding` with Telegram faked)
+class RawUser:
+    """✅ FakeUser's updates as raw TL objects, as the receiver gets them from Telegram"""
+
+    def __init__(self, user_id):
+        from pyrogram import raw
+
+        self.id = user_id
+        self.peer = raw.types.PeerUser(user_id=user_id)
+        self.raw = raw.types.User(id=user_id, access_hash=user_id, first_name=f"user{user_id}")
+        self._ids = itertools.count(1)
+
+    def message(self, text):
+        from pyrogram import raw
+
+        message = raw.types.Message(id=next(self._ids), peer_id=self.peer, from_id=self.peer, date=int(time.time()), message=text)
+        return raw.types.UpdateNewMessage(message=message, pts=0, pts_count=0)
+
+    def callback(self, data):
+        from pyrogram import raw
+
+        return raw.types.UpdateBotCallbackQuery(
+            query_id=next(self._ids), user_id=self.id, peer=self.peer,
+            msg_id=next(self._ids), chat_instance=0, data=data.encode(),
+        )
+
+
+def run_fake_worker(index, shard_queue, ready, handled, results, metrics_port, mongo_uri):
+    """✅ `diary.sharding.run_worker` with Telegram faked: no login, API calls succeed at once.
+
+    Serves its /metrics on `metrics_port`. Puts `(user_id, telegram_calls)` on `handled` whenever a user's queued
+    updates are done, and the worker's totals on `results` once it drained.
+    """
+    os.environ["SHARD_METRICS_PORT"] = str(metrics_port - index)
+    mocked = patch_mongo(mongo_uri) is not None
+
+    import contextvars
+
+    import pyrogram
+    from pyrogram.enums import ChatType
+    from pyrogram.types import Chat, Message, User
+
+    from diary import DiaryBot
+    from diary.dispatcher import UserDispatcher
+    from diary.metrics import HANDLER_ERRORS
+    from diary.sharding import run_worker
+
+    offline(mocked)
+    client = FakeClient()
+    current_user = contextvars.ContextVar("current_user", default=None)
+    calls = Counter()  # user_id -> Telegram calls while handling their updates
+
+    async def start(self):
+        await self.storage.open()  # fetch_peers() stores the users of each update
+        self.me = User(id=client.me.id, is_bot=True, first_name=client.me.first_name, username=client.me.username, client=self)
+        ready.put(index)
+        return self
+
+    async def stop(self, block=True):
+        await self.storage.close()
+        return self
+
+    pyrogram.Client.start, pyrogram.Client.stop = start, stop
+
+    def counted(method):
+        async def call(*args, **kwargs):
+            calls[current_user.get()] += 1
+            return await method(*args, **kwargs)
+        return call
+
+    for name in ("send_message", "send_photo", "answer_callback_query", "edit_message_text", "delete_messages"):
+        setattr(DiaryBot, name, counted(getattr(client, name)))
+
+    async def get_messages(chat_id, message_ids, **kwargs):
+        # The bot's message a button was on, CallbackQuery._parse fetches it
+        chat = Chat(id=chat_id, type=ChatType.PRIVATE, client=DiaryBot)
+        return Message(id=message_ids, chat=chat, from_user=DiaryBot.me, client=DiaryBot)
+
+    DiaryBot.get_messages = get_messages
+
+    drain = UserDispatcher._drain
+
+    async def reporting_drain(self, user_id, pending):
+        current_user.set(user_id)
+        try:
+            await drain(self, user_id, pending)
+        finally:
+            handled.put((user_id, calls.pop(user_id, 0)))
+
+    UserDispatcher._drain = reporting_drain
+
+    run_worker(index, shard_queue)
+    results.put({
+        "shard": index,
+        "handlers": sum(len(group) for group in DiaryBot.dispatcher.groups.values()),
+        "errors": sum(HANDLER_ERRORS.values.values()),
+    })
+
+
+class ShardedBot:
+    """✅ The receiver's side of `diary.sharding`: fake workers fed through ShardRouter"""
+
+    def __init__(self, shards, mongo_uri=None, timeout=30):
+        import multiprocessing
+        import socket
+
+        from config import SHARD_QUEUE_SIZE
+        from diary.sharding import ShardRouter
+
+        self.timeout = timeout
+        context = multiprocessing.get_context("spawn")
+        self.shard_queues = [context.Queue(SHARD_QUEUE_SIZE) for _ in range(shards)]
+        self.ready, self.handled, self.results = context.Queue(), context.Queue(), context.Queue()
+        self.router = ShardRouter(self.shard_queues)
+        self._waiting = {}  # user_id -> future of the update sent last
+
+        def free_port():
+            with socket.socket() as probe:
+                probe.bind(("127.0.0.1", 0))
+                return probe.getsockname()[1]
+
+        self.processes = [
+            context.Process(
+                target=run_fake_worker, name=f"shard-{index}",
+                args=(index, shard_queue, self.ready, self.handled, self.results, free_port(), mongo_uri),
+            )
+            for index, shard_queue in enumerate(self.shard_queues)
+        ]
+        self._collector = None
+
+    async def start(self):
+        """✅ Start the workers and wait until each has started its client"""
+        loop = asyncio.get_running_loop()
+        for process in self.processes:
+            process.start()
+        for _ in self.processes:
+            await loop.run_in_executor(None, self.ready.get, True, self.timeout)
+        self._collector = asyncio.create_task(self._collect())
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await loop.run_in_executor(None, self.handled.get)
+            if item is None:
+                return
+            user_id, calls = item
+            future = self._waiting.pop(user_id, None)
+            if future is not None and not future.done():
+                future.set_result(calls)
+
+    async def send(self, user, update) -> int:
+        """✅ Hand `update` to its shard, wait until handled; the Telegram calls it made"""
+        future = self._waiting[user.id] = asyncio.get_running_loop().create_future()
+        self.router.put_nowait((update, {user.id: user.raw}, {}))
+        return await asyncio.wait_for(future, self.timeout)
+
+    async def stop(self):
+        """✅ Drain and stop the workers like the receiver does; their totals by shard"""
+        loop = asyncio.get_running_loop()
+        for shard_queue in self.shard_queues:
+            shard_queue.put(None)
+        results = [await loop.run_in_executor(None, self.results.get, True, self.timeout) for _ in self.processes]
+        for process in self.processes:
+            await loop.run_in_executor(None, process.join)
+        self.handled.put(None)
+        await self._collector
+        return sorted(results, key=lambda result: result["shard"])
+
+
+class ShardedFlow(Flow):
+    """✅ Flow through a ShardedBot; stops at the first step that got no reply"""
+
+    def __init__(self, sharded, user_id, username):
+        self.sharded = sharded
+        self.user = RawUser(user_id)
+        self.username = username
+        self.steps = []  # (name, seconds)
+        self.unanswered = None  # first step no handler replied to
+
+    async def step(self, name, update):
+        if self.unanswered:
+            return
+        started = time.perf_counter()
+        try:
+            calls = await self.sharded.send(self.user, update)
+        except asyncio.TimeoutError:
+            calls = 0
+        if not calls:
+            self.unanswered = name
+        self.steps.append((name, time.perf_counter() - started))
+
+
+async def main(args):
+    ops = patch_mongo(args.mongo_uri)
+
+    from diary.metrics import HANDLER_ERRORS
+
+    DiaryBot, client = await start_bot(ops is not None, args.rate_limits)
+
+    run_id = int(time.time())
+    flows = [
+        Flow(DiaryBot, client, 10_000_000 + i, f"lg{run_id}_{i}")
+        for i in range(args.users)
+    ]
+
+    results = [
+        await run_phase("register", flows, "register", args.concurrency, ops),
+        await run_phase("login", flows, "login", args.concurrency, ops),
+    ]
+
+    steps = defaultdict(list)
+    for flow in flows:
+        for name, seconds in flow.steps:
+            steps[name].append(seconds)
+
+    await stop_bot(DiaryBot)
+
+    report = {
+        "users": args.users,
+        "concurrency": args.concurrency,
+        "flows": results,
+        "steps": {
+            name: {"p50_ms": round(percentile(values, 0.50) * 1000, 1), "p99_ms": round(percentile(values, 0.99) * 1000, 1)}
+            for name, values in steps.items()
+        },
+        "handler_errors": sum(HANDLER_ERRORS.values.values()),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "telegram_calls": dict(client.calls),
+        "db_ops": dict(ops) if ops is not None else None,
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"\n{args.users} users, {args.concurrency} at a time, peak RSS {report['peak_rss_mb']} MB, "
+              f"{report['handler_errors']} handler errors\n")
+        print(f"{'flow':<10}{'flows/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'db ops':>10}")
+        for result in results:
+            print(f"{result['flow']:<10}{result['flows_per_second']:>10}{result['p50_ms']:>10}{result['p99_ms']:>10}{str(result['db_ops_per_flow']):>10}")
+        print(f"\n{'step':<18}{'p50 ms':>10}{'p99 ms':>10}")
+        for name, stats in report["steps"].items():
+            print(f"{name:<18}{stats['p50_ms']:>10}{stats['p99_ms']:>10}")
+
+    if report["handler_errors"]:
+        print("handlers raised, see the log above", file=sys.stderr)
+        return 1
+    if args.max_p99_ms and any(result["p99_ms"] > args.max_p99_ms for result in results):
+        print(f"p99 above the {args.max_p99_ms} ms budget", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate concurrent register / login flows")
+    parser.add_argument("--users", type=int, default=200, help="simulated users (default 200)")
+    parser.add_argument("--concurrency", type=int, default=50, help="flows in flight at once (default 50)")
+    parser.add_argument("--mongo-uri", help="use this (throwaway!) mongod instead of mongomock")
+    parser.add_argument("--rate-limits", action="store_true", help="keep the bot's send / KDF rate limits")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--max-p99-ms", type=float, help="fail when a flow's p99 is above this")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,114 @@
+"""Handler latency while a burst of logins runs.
+
+Registers --logins users, then logs them all in at once while a few other
+users keep sending /start. The /start latency is what everybody else feels
+during a login storm: with the KDF on its worker pool it should stay near
+its idle value, with --inline (the KDF on the event loop, as before the pool)
+it grows with every password check.
+
+    python -m bench.logins                  # 50 concurrent logins
+    python -m bench.logins --inline         # the same with the KDF on the loop
+    python -m bench.logins --json --max-p99-ms 250   # CI
+
+Exits with 1 when a handler raised or the /start p99 is above --max-p99-ms.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from bench.loadgen import Flow, patch_mongo, percentile, start_bot, stop_bot
+
+
+async def probe(flow, done, latencies):
+    """✅ Send /start again and again until the logins are done"""
+    while not done.is_set():
+        started = time.perf_counter()
+        await flow.step("start", flow.user.message("/start"))
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0.005)
+
+
+async def main(args):
+    ops = patch_mongo(args.mongo_uri)
+
+    from diary.database import password
+    from diary.metrics import HANDLER_ERRORS
+
+    if args.inline:
+        async def inline(func, *call_args):
+            return func(*call_args)
+        password._run_kdf = inline  # looked up at call time by the *_async helpers
+
+    bot, client = await start_bot(ops is not None)
+
+    run_id = int(time.time())
+    flows = [Flow(bot, client, 40_000_000 + i, f"li{run_id}_{i}") for i in range(args.logins)]
+    probes = [Flow(bot, client, 41_000_000 + i, f"lp{run_id}_{i}") for i in range(args.probes)]
+    await asyncio.gather(*(flow.register() for flow in flows))
+
+    # /start with nothing else running, for reference
+    idle = []
+    for flow in probes:
+        for _ in range(10):
+            started = time.perf_counter()
+            await flow.step("start", flow.user.message("/start"))
+            idle.append(time.perf_counter() - started)
+
+    done = asyncio.Event()
+    busy = []
+    probing = [asyncio.create_task(probe(flow, done, busy)) for flow in probes]
+
+    async def login(flow):
+        started = time.perf_counter()
+        await flow.login()
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    logins = await asyncio.gather(*(login(flow) for flow in flows))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await asyncio.gather(*probing)
+    await stop_bot(bot)
+
+    report = {
+        "logins": args.logins,
+        "kdf": "inline" if args.inline else "pool",
+        "seconds": round(elapsed, 3),
+        "login_p50_ms": round(percentile(logins, 0.50) * 1000, 1),
+        "login_p99_ms": round(percentile(logins, 0.99) * 1000, 1),
+        "start_idle_p99_ms": round(percentile(idle, 0.99) * 1000, 1),
+        "start_p50_ms": round(percentile(busy, 0.50) * 1000, 1),
+        "start_p99_ms": round(percentile(busy, 0.99) * 1000, 1),
+        "start_samples": len(busy),
+        "handler_errors": sum(HANDLER_ERRORS.values.values()),
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"\n{args.logins} concurrent logins, KDF {report['kdf']}, {report['seconds']} s\n")
+        print(f"{'':<22}{'p50 ms':>10}{'p99 ms':>10}")
+        print(f"{'login':<22}{report['login_p50_ms']:>10}{report['login_p99_ms']:>10}")
+        print(f"{'/start, idle':<22}{'':>10}{report['start_idle_p99_ms']:>10}")
+        print(f"{'/start, during logins':<22}{report['start_p50_ms']:>10}{report['start_p99_ms']:>10}")
+
+    if report["handler_errors"]:
+        print("handlers raised, see the log above", file=sys.stderr)
+        return 1
+    if args.max_p99_ms and report["start_p99_ms"] > args.max_p99_ms:
+        print(f"/start p99 above the {args.max_p99_ms} ms budget", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure handler p99 during concurrent logins")
+    parser.add_argument("--logins", type=int, default=50, help="concurrent logins (default 50)")
+    parser.add_argument("--probes", type=int, default=5, help="users sending /start meanwhile (default 5)")
+    parser.add_argument("--inline", action="store_true", help="run the KDF on the event loop, for comparison")
+    parser.add_argument("--mongo-uri", help="use this (throwaway!) mongod instead of mongomock")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--max-p99-ms", type=float, help="fail when the /start p99 is above this")
+    sys.exit(asyncio.run(main(parser.parse_args())))
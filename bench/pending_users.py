@@ -0,0 +1,125 @@
+"""Per-call vs buffered inserts of users pressing /start.
+
+Writes --users new telegram_ids into a scratch collection twice: once the
+way /start used to (find_one + insert_one per user, --concurrency at a time)
+and once through the bot's WriteBuffer (bulk_write upserts of --batch-size
+keys). Throughput only means something against a real mongod:
+
+    python -m bench.pending_users --mongo-uri mongodb://localhost:27017
+    python -m bench.pending_users --mongo-uri ... --json --min-speedup 5   # CI
+
+Also reports what /start waits for in each case: the two round trips, or
+WriteBuffer.add(). Exits with 1 when a run lost users or the speedup is
+below --min-speedup.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from pymongo import ASCENDING
+
+from bench.loadgen import patch_mongo, percentile
+
+
+async def fresh_collection(db):
+    collection = db.bench_pending_users
+    await collection.drop()
+    await collection.create_index([("telegram_id", ASCENDING)], unique=True)
+    return collection
+
+
+async def per_call(collection, user_ids, concurrency):
+    """✅ /start before the write buffer: a lookup, then an insert if missing"""
+    slots = asyncio.Semaphore(concurrency)
+    waits = []
+
+    async def start(user_id):
+        async with slots:
+            started = time.perf_counter()
+            if not await collection.find_one({"telegram_id": user_id}):
+                await collection.insert_one({"telegram_id": user_id, "registered_at": "bench"})
+            waits.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(start(user_id) for user_id in user_ids))
+    return waits
+
+
+async def buffered(collection, user_ids, batch_size):
+    """✅ /start now: WriteBuffer.add(), written by the buffer's own flushes"""
+    from diary.writer import WriteBuffer
+
+    buffer = WriteBuffer(collection, "telegram_id", batch_size=batch_size)
+    await buffer.start()
+    waits = []
+    for user_id in user_ids:
+        started = time.perf_counter()
+        buffer.add(user_id, {"registered_at": "bench"})
+        waits.append(time.perf_counter() - started)
+        if len(buffer) >= batch_size:
+            await asyncio.sleep(0)  # let the full-buffer flush start, like between updates
+    await buffer.stop()  # flushes the rest
+    return waits
+
+
+async def measure(name, db, ops, users, run):
+    collection = await fresh_collection(db)
+    ops_before = sum(ops.values()) if ops is not None else 0
+    started = time.perf_counter()
+    waits = await run(collection)
+    elapsed = time.perf_counter() - started
+    written = await collection.count_documents({})
+    await collection.drop()
+    return {
+        "mode": name,
+        "seconds": round(elapsed, 3),
+        "users_per_second": round(users / elapsed, 1),
+        "start_wait_p99_ms": round(percentile(waits, 0.99) * 1000, 3),
+        "db_ops": sum(ops.values()) - ops_before if ops is not None else None,
+        "written": written,
+    }
+
+
+async def main(args):
+    ops = patch_mongo(args.mongo_uri)
+    if ops is not None:
+        print("mongomock: only the op counts mean anything, pass --mongo-uri for throughput", file=sys.stderr)
+
+    from diary import db
+
+    user_ids = list(range(80_000_000, 80_000_000 + args.users))
+    results = [
+        await measure("per_call", db, ops, args.users, lambda c: per_call(c, user_ids, args.concurrency)),
+        await measure("buffered", db, ops, args.users, lambda c: buffered(c, user_ids, args.batch_size)),
+    ]
+    speedup = round(results[0]["seconds"] / results[1]["seconds"], 1)
+
+    if args.json:
+        print(json.dumps({"users": args.users, "results": results, "speedup": speedup}, indent=2))
+    else:
+        print(f"\n{args.users} users, per-call {args.concurrency} at a time, batches of {args.batch_size}\n")
+        print(f"{'mode':<10}{'users/s':>12}{'/start p99 ms':>15}{'db ops':>10}{'written':>10}")
+        for result in results:
+            print(f"{result['mode']:<10}{result['users_per_second']:>12}{result['start_wait_p99_ms']:>15}"
+                  f"{str(result['db_ops']):>10}{result['written']:>10}")
+        print(f"\nbuffered throughput is {speedup}x per-call")
+
+    if any(result["written"] != args.users for result in results):
+        print("a run did not write every user", file=sys.stderr)
+        return 1
+    if args.min_speedup and speedup < args.min_speedup:
+        print(f"speedup below {args.min_speedup}x", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare per-call and buffered pending-user inserts")
+    parser.add_argument("--users", type=int, default=20000, help="users pressing /start (default 20000)")
+    parser.add_argument("--concurrency", type=int, default=100, help="per-call writes in flight (default 100)")
+    parser.add_argument("--batch-size", type=int, default=500, help="keys per bulk_write (default 500)")
+    parser.add_argument("--mongo-uri", help="use this (throwaway!) mongod instead of mongomock")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--min-speedup", type=float, help="fail when buffered is not this many times faster")
+    sys.exit(asyncio.run(main(parser.parse_args())))
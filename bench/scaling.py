@@ -0,0 +1,112 @@
+"""Throughput of the register / login flows through the sharded receiver.
+
+For each shard count (1, 2, 4, ... up to --max-shards, by default the cores
+available), starts that many workers with `diary.sharding.run_worker` and
+sends them raw Telegram updates through the receiver's ShardRouter (pack,
+shard queue, unpack, the worker's Pyrogram dispatcher, the handlers). Only
+Telegram is faked: workers do not log in and their API calls succeed at once
+(see ShardedBot in bench/loadgen.py). Each simulated user sends the next
+update once the previous one was handled, like a person waiting for the
+reply. Workers are started before the clock starts:
+
+    python -m bench.scaling --users 200
+    python -m bench.scaling --json --min-efficiency 0.7   # CI, on a multi-core runner
+
+Each worker has its own mongomock, which is fine since its users are its own;
+--mongo-uri makes them share a (throwaway!) mongod like real workers do.
+Exits with 1 when a step got no reply within --step-timeout (no handler
+took it), a handler raised, or the efficiency (speedup / shards) at the
+largest shard count is below --min-efficiency.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+from bench.loadgen import ShardedBot, ShardedFlow, patch_mongo, run_phase
+
+USER_ID_BASE = 90_000_000
+
+
+async def measure(shards, args):
+    sharded = ShardedBot(shards, args.mongo_uri, args.step_timeout)
+    await sharded.start()
+    flows = [
+        ShardedFlow(sharded, user_id, f"sc{args.run_id}_{shards}_{user_id - USER_ID_BASE}")
+        for user_id in range(USER_ID_BASE, USER_ID_BASE + args.users)
+    ]
+
+    started = time.perf_counter()
+    await run_phase("register", flows, "register", args.concurrency, None)
+    await run_phase("login", flows, "login", args.concurrency, None)
+    elapsed = time.perf_counter() - started
+    workers = await sharded.stop()
+
+    unanswered = [flow for flow in flows if flow.unanswered]
+    steps = sum(len(flow.steps) for flow in flows)
+    return {
+        "shards": shards,
+        "flows": 2 * len(flows),
+        "steps": steps,
+        "seconds": round(elapsed, 2),
+        "flows_per_second": round(2 * len(flows) / elapsed, 2),
+        "unanswered_flows": len(unanswered),
+        "first_unanswered_step": unanswered[0].unanswered if unanswered else None,
+        "dropped_updates": sharded.router.dropped,
+        "handler_errors": sum(worker["errors"] for worker in workers),
+    }
+
+
+async def main(args):
+    patch_mongo(args.mongo_uri)  # the receiver side imports `diary` too
+    args.run_id = int(time.time())
+    counts = []
+    shards = 1
+    while shards < args.max_shards:
+        counts.append(shards)
+        shards *= 2
+    counts.append(args.max_shards)
+
+    results = []
+    for shards in counts:
+        result = await measure(shards, args)
+        result["speedup"] = round(result["flows_per_second"] / results[0]["flows_per_second"], 2) if results else 1.0
+        result["efficiency"] = round(result["speedup"] / shards, 2)
+        results.append(result)
+
+    if args.json:
+        print(json.dumps({"users": args.users, "results": results}, indent=2))
+    else:
+        print(f"\n{args.users} users (register + login each), through ShardRouter\n")
+        print(f"{'shards':>8}{'flows/s':>10}{'speedup':>10}{'efficiency':>12}{'unanswered':>12}")
+        for result in results:
+            print(f"{result['shards']:>8}{result['flows_per_second']:>10}{result['speedup']:>10}"
+                  f"{result['efficiency']:>12}{result['unanswered_flows']:>12}")
+
+    failed = False
+    for result in results:
+        if result["unanswered_flows"] or result["dropped_updates"]:
+            print(f"{result['shards']} shards: {result['unanswered_flows']} flows stopped without a reply "
+                  f"(first at {result['first_unanswered_step']!r}), {result['dropped_updates']} updates dropped", file=sys.stderr)
+            failed = True
+    if any(result["handler_errors"] for result in results):
+        print("handlers raised, see the log above", file=sys.stderr)
+        failed = True
+    if args.min_efficiency and results[-1]["efficiency"] < args.min_efficiency:
+        print(f"efficiency at {results[-1]['shards']} shards below {args.min_efficiency}", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure flow throughput through the sharded receiver by shard count")
+    parser.add_argument("--users", type=int, default=200, help="simulated users, split across shards (default 200)")
+    parser.add_argument("--concurrency", type=int, default=50, help="flows in flight at once (default 50)")
+    parser.add_argument("--max-shards", type=int, default=len(os.sched_getaffinity(0)), help="most shards to try (default: cores available)")
+    parser.add_argument("--step-timeout", type=float, default=30, help="seconds to wait for a step's reply (default 30)")
+    parser.add_argument("--mongo-uri", help="use this (throwaway!) mongod instead of one mongomock per worker")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--min-efficiency", type=float, help="fail when speedup / shards at the most shards is below this")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,139 @@
+"""Ranked /search over a synthetic corpus of diary pages.
+
+Stores --pages pages (stored like add_page stores them) for --owners users,
+with words drawn from a Zipf-like vocabulary, so some terms match a large
+share of a user's pages and some almost none. Then runs --queries searches of
+1-3 terms, half of them with a 30-day date range, and the next screen of each
+that has one. Needs a mongod, mongomock has no $setIntersection:
+
+    python -m bench.search --mongo-uri mongodb://localhost:27017          # 1M pages
+    python -m bench.search --mongo-uri ... --json --max-p99-ms 100         # CI
+
+The pages are deleted afterwards. Exits with 1 when a p99 is above --max-p99-ms.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from bench.loadgen import patch_mongo, percentile
+
+VOCABULARY = 20000
+WORDS_PER_PAGE = (20, 120)
+DAYS = 730
+INSERT_BATCH = 5000
+
+
+def make_vocabulary(rng):
+    words = [f"{''.join(rng.choices('abcdefghijklmnopqrstuvwxyz', k=rng.randint(3, 9)))}{i}" for i in range(VOCABULARY)]
+    weights = [1 / (rank + 1) for rank in range(VOCABULARY)]
+    return words, weights
+
+
+async def build_corpus(pages_db, owners, count, words, weights, rng):
+    """✅ `count` pages spread evenly over `owners`, written with insert_many"""
+    from diary.database.pages import _encode_body
+    from diary.database.search import tokenize
+
+    now = datetime.utcnow().replace(microsecond=0)
+    batch = []
+    for i in range(count):
+        text = " ".join(rng.choices(words, weights, k=rng.randint(*WORDS_PER_PAGE)))
+        batch.append({
+            "owner": owners[i % len(owners)],
+            "created_at": now - timedelta(seconds=rng.randrange(DAYS * 86400)),
+            **_encode_body(text),
+            "terms": tokenize(text),
+        })
+        if len(batch) == INSERT_BATCH:
+            await pages_db.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await pages_db.insert_many(batch, ordered=False)
+
+
+def make_query(owners, words, rng):
+    # Terms from the head, the middle and the tail of the vocabulary
+    terms = [words[int(VOCABULARY ** rng.random()) - 1] for _ in range(rng.randint(1, 3))]
+    search = {"owner": rng.choice(owners), "terms": terms, "since": None, "until": None}
+    if rng.random() < 0.5:
+        until = datetime.utcnow() - timedelta(days=rng.randrange(DAYS))
+        search["since"], search["until"] = until - timedelta(days=30), until
+    return search
+
+
+async def main(args):
+    patch_mongo(args.mongo_uri)
+    pages = args.pages
+
+    from diary.database.indexes import ensure_indexes
+    from diary.database.pages import pages_db
+    from diary.database.search import encode_search_cursor, search_pages
+
+    rng = random.Random(args.seed)
+    words, weights = make_vocabulary(rng)
+    run_id = int(time.time())
+    owners = [f"sb{run_id}_{i}" for i in range(args.owners)]
+
+    await ensure_indexes()
+    first, more, hits = [], [], []
+    try:
+        started = time.perf_counter()
+        await build_corpus(pages_db, owners, pages, words, weights, rng)
+        build_seconds = time.perf_counter() - started
+
+        for _ in range(args.queries):
+            search = make_query(owners, words, rng)
+            started = time.perf_counter()
+            results, has_more = await search_pages(search)
+            first.append(time.perf_counter() - started)
+            hits.append(len(results))
+            if has_more:
+                started = time.perf_counter()
+                await search_pages(search, encode_search_cursor(results[-1]))
+                more.append(time.perf_counter() - started)
+    finally:
+        await pages_db.delete_many({"owner": {"$in": owners}})
+
+    report = {
+        "pages": pages,
+        "owners": args.owners,
+        "pages_per_owner": pages // args.owners,
+        "build_seconds": round(build_seconds, 1),
+        "queries": args.queries,
+        "queries_with_results": sum(1 for count in hits if count),
+        "first_p50_ms": round(percentile(first, 0.50) * 1000, 2),
+        "first_p99_ms": round(percentile(first, 0.99) * 1000, 2),
+        "next_screens": len(more),
+        "next_p50_ms": round(percentile(more, 0.50) * 1000, 2),
+        "next_p99_ms": round(percentile(more, 0.99) * 1000, 2),
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"\n{pages} pages, {report['pages_per_owner']} per user, built in {report['build_seconds']} s; "
+              f"{args.queries} searches, {report['queries_with_results']} with results\n")
+        print(f"{'':<14}{'p50 ms':>10}{'p99 ms':>10}")
+        print(f"{'first screen':<14}{report['first_p50_ms']:>10}{report['first_p99_ms']:>10}")
+        print(f"{'next screen':<14}{report['next_p50_ms']:>10}{report['next_p99_ms']:>10}")
+
+    if args.max_p99_ms and max(report["first_p99_ms"], report["next_p99_ms"]) > args.max_p99_ms:
+        print(f"search p99 above the {args.max_p99_ms} ms budget", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark /search over a synthetic corpus")
+    parser.add_argument("--pages", type=int, default=1_000_000, help="pages in the corpus (default 1M)")
+    parser.add_argument("--owners", type=int, default=100, help="users the pages belong to (default 100)")
+    parser.add_argument("--queries", type=int, default=200, help="searches to time (default 200)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for corpus and queries")
+    parser.add_argument("--mongo-uri", required=True, help="the (throwaway!) mongod to use")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--max-p99-ms", type=float, help="fail when a p99 is above this")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,91 @@
+"""Cost of the sudoers_only guard on an admin command.
+
+Compares the guard as it is (a lookup in the in-memory SUDOERS set) with the
+previous one, which fetched the sudoers document with get_sudoers() on every
+call. Both wrap a handler that does nothing and are called --iterations times
+by an admin. The fetch costs a round trip, so run it against a real mongod to
+see the difference in production terms:
+
+    python -m bench.sudoers
+    python -m bench.sudoers --mongo-uri mongodb://localhost:27017
+    python -m bench.sudoers --json --max-guard-us 20   # CI
+
+Exits with 1 when the in-memory guard's p99 is above --max-guard-us.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from functools import wraps
+
+from bench.loadgen import FakeClient, FakeUser, patch_mongo, percentile
+
+
+def fetching_sudoers_only(func):
+    """✅ The guard before the in-memory set: one find_one per command"""
+    from diary.database import get_sudoers
+
+    @wraps(func)
+    async def wrapper(client, message, *args, **kwargs):
+        if message.from_user.id not in await get_sudoers():
+            await message.reply_text("This command is only available to bot admins.")
+            return
+        return await func(client, message, *args, **kwargs)
+
+    return wrapper
+
+
+async def command(client, message):
+    pass
+
+
+async def time_calls(guarded, client, message, iterations):
+    durations = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await guarded(client, message)
+        durations.append(time.perf_counter() - started)
+    return {
+        "p50_us": round(percentile(durations, 0.50) * 1e6, 2),
+        "p99_us": round(percentile(durations, 0.99) * 1e6, 2),
+    }
+
+
+async def main(args):
+    patch_mongo(args.mongo_uri)
+
+    from config import OWNER_ID
+    from diary.misc import sudo
+    from diary.utils import sudoers_only
+
+    await sudo()  # fills SUDOERS and the sudoers document
+    client = FakeClient()
+    message = FakeUser(client, OWNER_ID).message("/addsudo")
+
+    results = {
+        "in_memory": await time_calls(sudoers_only(command), client, message, args.iterations),
+        "fetch_per_call": await time_calls(fetching_sudoers_only(command), client, message, args.iterations),
+    }
+
+    if args.json:
+        print(json.dumps({"iterations": args.iterations, **results}, indent=2))
+    else:
+        print(f"\nµs per guarded admin command, {args.iterations} calls\n")
+        print(f"{'guard':<16}{'p50 µs':>10}{'p99 µs':>10}")
+        for name, result in results.items():
+            print(f"{name:<16}{result['p50_us']:>10}{result['p99_us']:>10}")
+
+    if args.max_guard_us and results["in_memory"]["p99_us"] > args.max_guard_us:
+        print(f"guard p99 above {args.max_guard_us} µs", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the sudoers_only guard")
+    parser.add_argument("--iterations", type=int, default=2000, help="guarded calls per guard (default 2000)")
+    parser.add_argument("--mongo-uri", help="use this (throwaway!) mongod instead of mongomock")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--max-guard-us", type=float, help="fail when the in-memory guard's p99 is above this")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -8,15 +8,94 @@ MONGO_DB_URI=environ.get("MONGO_DB_URI","mongodb+srv://Shivam00:yMX7zaq9AR7DIDbT
 OWNER_ID=int(environ.get("OWNER_ID",7234206438))
 SUDOERS=filters.user()
 SUDOERS.add(OWNER_ID) 
+SUDOERS_POLL_INTERVAL=int(environ.get("SUDOERS_POLL_INTERVAL",30))
 SUPPORT_GRP =environ.get("SUPPORT_GRP", "kycsellsofficial")
 LOG_ID=environ.get("LOG_ID",-1002278232887)
 DATA_CHANNEL=environ.get("DATA_CHANNEL",-1002278232887)
+DEV_MODE=environ.get("DEV_MODE","False").lower()=="true"
+PORT=int(environ.get("PORT",8080))
+
+# Mongo connection pool (compressors e.g. "zstd,snappy,zlib", empty = none)
+MONGO_MAX_POOL_SIZE=int(environ.get("MONGO_MAX_POOL_SIZE",100))
+MONGO_MIN_POOL_SIZE=int(environ.get("MONGO_MIN_POOL_SIZE",5))
+MONGO_SERVER_SELECTION_TIMEOUT_MS=int(environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS",5000))
+MONGO_WAIT_QUEUE_TIMEOUT_MS=int(environ.get("MONGO_WAIT_QUEUE_TIMEOUT_MS",10000))
+MONGO_COMPRESSORS=environ.get("MONGO_COMPRESSORS","")
+# Read preference for lookups that may be slightly stale (user profiles)
+MONGO_STALE_READ_PREFERENCE=environ.get("MONGO_STALE_READ_PREFERENCE","secondaryPreferred")
+
+# Password hashing pool ("thread" or "process")
+KDF_EXECUTOR=environ.get("KDF_EXECUTOR","thread")
+KDF_WORKERS=int(environ.get("KDF_WORKERS",4))
+KDF_MAX_PENDING=int(environ.get("KDF_MAX_PENDING",64))
+# Seconds a password check waits for one of those slots before the user is asked to retry
+KDF_WAIT_TIMEOUT=float(environ.get("KDF_WAIT_TIMEOUT",10))
+# Algorithm for new hashes ("scrypt", "argon2" if installed, or "bcrypt") and its cost;
+# `python -m diary.database.calibrate` suggests costs for KDF_TARGET_MS on this host
+KDF_ALGORITHM=environ.get("KDF_ALGORITHM","scrypt")
+KDF_TARGET_MS=float(environ.get("KDF_TARGET_MS",250))
+BCRYPT_ROUNDS=int(environ.get("BCRYPT_ROUNDS",12))
+SCRYPT_LOG_N=int(environ.get("SCRYPT_LOG_N",15))
+SCRYPT_R=int(environ.get("SCRYPT_R",8))
+SCRYPT_P=int(environ.get("SCRYPT_P",1))
+ARGON2_TIME_COST=int(environ.get("ARGON2_TIME_COST",3))
+ARGON2_MEMORY_KIB=int(environ.get("ARGON2_MEMORY_KIB",65536))
+ARGON2_PARALLELISM=int(environ.get("ARGON2_PARALLELISM",1))
+
+# Worker processes for update handling (1 = everything in one process);
+# each one logs in to Telegram itself, see `diary/sharding.py` for the costs
+SHARDS=int(environ.get("SHARDS",1))
+SHARD_QUEUE_SIZE=int(environ.get("SHARD_QUEUE_SIZE",10000))
+# Worker i serves its /metrics on 127.0.0.1:SHARD_METRICS_PORT+i, merged into the receiver's /metrics
+SHARD_METRICS_PORT=int(environ.get("SHARD_METRICS_PORT",PORT+1))
+
+# Conversation sessions ("memory" or "mongo" to share them between workers)
+SESSION_BACKEND=environ.get("SESSION_BACKEND","mongo" if SHARDS > 1 else "memory")
+SESSION_TTL=int(environ.get("SESSION_TTL",900))
+SESSION_MAX_SIZE=int(environ.get("SESSION_MAX_SIZE",10000))
+SESSION_SWEEP_INTERVAL=int(environ.get("SESSION_SWEEP_INTERVAL",60))
+USER_QUEUE_SIZE=int(environ.get("USER_QUEUE_SIZE",10))
+
+# Rate limits ("memory" or "mongo" to share them between workers, two round trips per send)
+RATE_LIMIT_BACKEND=environ.get("RATE_LIMIT_BACKEND","mongo" if SHARDS > 1 else "memory")
+AUTH_ATTEMPTS_PER_MINUTE=int(environ.get("AUTH_ATTEMPTS_PER_MINUTE",5))
+CHAT_SENDS_PER_SECOND=float(environ.get("CHAT_SENDS_PER_SECOND",1))
+CHAT_SEND_BURST=int(environ.get("CHAT_SEND_BURST",3))
+GLOBAL_SENDS_PER_SECOND=float(environ.get("GLOBAL_SENDS_PER_SECOND",25))
+SEND_RETRIES=int(environ.get("SEND_RETRIES",3))
+
+# User / login document cache
+CACHE_TTL=int(environ.get("CACHE_TTL",60))
+CACHE_MAX_SIZE=int(environ.get("CACHE_MAX_SIZE",5000))
+
+# Buffered inserts (e.g. users pressing /start): seconds between flushes, keys per bulk_write
+WRITE_FLUSH_INTERVAL=float(environ.get("WRITE_FLUSH_INTERVAL",2))
+WRITE_BATCH_SIZE=int(environ.get("WRITE_BATCH_SIZE",500))
+
+# /broadcast: sends in flight at once, recipients per checkpoint
+BROADCAST_CONCURRENCY=int(environ.get("BROADCAST_CONCURRENCY",20))
+BROADCAST_CHUNK_SIZE=int(environ.get("BROADCAST_CHUNK_SIZE",500))
+
+# Days a login stays listed as an active account after its last use
+LOGIN_SESSION_DAYS=int(environ.get("LOGIN_SESSION_DAYS",30))
+
+# Diary pages
+PAGE_COMPRESS_THRESHOLD=int(environ.get("PAGE_COMPRESS_THRESHOLD",1024))
+PAGES_PER_SCREEN=int(environ.get("PAGES_PER_SCREEN",5))
+SEARCH_MAX_TERMS=int(environ.get("SEARCH_MAX_TERMS",500))
+SEARCH_TTL=int(environ.get("SEARCH_TTL",3600))
+
+# /export: archives built at once across all users
+EXPORT_CONCURRENCY=int(environ.get("EXPORT_CONCURRENCY",2))
 
 # Images 
 
 AUTH_IMG=environ.get("AUTH_IMG","https://i.imghippo.com/files/lOv4210co.jpg")
 START_IMG=environ.get("START_IMG","https://i.imghippo.com/files/lOv4210co.jpg")
 
+# Telegram file_ids of the images above, so each is only uploaded once
+MEDIA_CACHE_FILE=environ.get("MEDIA_CACHE_FILE","media_cache.json")
+
 STEP_IMAGES = {
     "username": "https://i.imghippo.com/files/lOv4210co.jpg",
     "password": "https://i.imghippo.com/files/lOv4210co.jpg",
@@ -1,8 +1,14 @@
 from pyrogram import Client, filters
 from motor.motor_asyncio import AsyncIOMotorClient
+from diary.sessions import MemorySessionStore, MongoSessionStore
+from diary.deleter import MessageDeleter
+from diary.writer import WriteBuffer
+from diary.metrics import CommandCounter, PoolStats, instrument, add_telegram_request
+from diary.dispatcher import UserDispatcher, serialized
 
 from config import *
 import logging
+import time
 
 # Logging Configuration
 logging.basicConfig(
@@ -16,7 +22,15 @@ logging.getLogger("pyrogram").setLevel(logging.ERROR)
 LOGGER = logging.getLogger(__name__)
 
 # Initialize MongoDB connection
-mongo_client = AsyncIOMotorClient(MONGO_DB_URI)
+mongo_client = AsyncIOMotorClient(
+    MONGO_DB_URI,
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+    minPoolSize=MONGO_MIN_POOL_SIZE,
+    serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    compressors=[name for name in MONGO_COMPRESSORS.split(",") if name],
+    event_listeners=[CommandCounter(), PoolStats()],
+)
 db = mongo_client.diarybot  
 
 class Diary(Client):
@@ -29,17 +43,65 @@ class Diary(Client):
             bot_token=BOT_TOKEN,
             in_memory=True,
         )
-        self.user_data = {}  
+        # ✅ Register / login conversation state, see `diary/sessions.py`
+        if SESSION_BACKEND == "mongo":
+            self.sessions = MongoSessionStore(db.conversations)
+        else:
+            self.sessions = MemorySessionStore()
+        # ✅ Scheduled message deletions, see `diary/deleter.py`
+        self.deleter = MessageDeleter(self, db.pending_deletions)
+        # ✅ Users who pressed /start, written in batches, see `diary/writer.py`
+        self.pending_users = WriteBuffer(db.pending_users, "telegram_id")
+        # ✅ One user's updates run in order, see `diary/dispatcher.py`
+        self.user_dispatcher = UserDispatcher()
+        # ✅ Set in the sharded receiver, which only forwards updates and needs none of the above
+        self.receive_only = False
+
+    # ✅ Every handler is queued per user and timed for /metrics
+    def on_message(self, filters=None, group=0):
+        register = super().on_message(filters, group)
+
+        def decorator(func):
+            register(serialized(self.user_dispatcher, instrument(func)))
+            return func  # direct calls (e.g. `start_command`) stay unwrapped
+
+        return decorator
+
+    def on_callback_query(self, filters=None, group=0):
+        register = super().on_callback_query(filters, group)
+
+        def decorator(func):
+            register(serialized(self.user_dispatcher, instrument(func)))
+            return func
+
+        return decorator
+
+    async def invoke(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await super().invoke(*args, **kwargs)
+        finally:
+            add_telegram_request(time.perf_counter() - started)
 
     async def start(self):
         await super().start()
+        if not self.receive_only:
+            await self.sessions.start()
+            await self.deleter.start()
+            await self.pending_users.start()
         self.id = self.me.id
         self.name = self.me.first_name + " " + (self.me.last_name or "")
         self.username = self.me.username
         self.mention = self.me.mention
 
     async def stop(self):
+        if not self.receive_only:
+            await self.deleter.stop()
+            await self.pending_users.stop()
+            await self.sessions.stop()
         await super().stop()
+        from diary.database.password import shutdown_kdf_pool
+        shutdown_kdf_pool()
 
 
 DiaryBot = Diary()  
@@ -1,29 +1,48 @@
 import asyncio
-import importlib
 from pyrogram import idle
-from Sellbot.misc import sudo
-from Sellbot import LOGGER, SellRobot, HELPABLE
-from Sellbot.modules import ALL_MODULES
+from diary.misc import sudo, watch_sudoers
+from diary.media import load_media
+from diary import LOGGER, DiaryBot
+from diary.modules import ALL_MODULES, load_modules
+from diary.database import warm_pool
+from diary.database.indexes import ensure_indexes, audit_query_shapes
+from config import DEV_MODE, SHARDS, SHARD_METRICS_PORT
 from pyrogram.types import BotCommand
 
-from keep_alive import keep_alive
-keep_alive()
+from diary.keep_alive import keep_alive
+
+async def prepare_db():
+    """✅ Open the connection pool, then indexes (and the DEV_MODE index audit)"""
+    await warm_pool()
+    await ensure_indexes()
+    if DEV_MODE:
+        collscans = await audit_query_shapes()
+        if collscans:
+            raise RuntimeError(f"Queries without an index: {collscans}")
+
+async def warm_up():
+    """✅ Everything Mongo-side the handlers need, run while Pyrogram logs in"""
+    await prepare_db()
+    await asyncio.gather(sudo(), load_media())
 
 async def diary_start():
     try:
-
-        await sudo()
-        await DiaryBot.start()
+        if SHARDS > 1:
+            # Handlers run in worker processes, see `diary/sharding.py`
+            from diary.sharding import run_receiver
+            await prepare_db()
+            await keep_alive(shard_ports=[SHARD_METRICS_PORT + index for index in range(SHARDS)])
+            await run_receiver()
+            return
+        # ✅ Handlers exist before the first update can arrive
+        load_modules()
+        await asyncio.gather(warm_up(), DiaryBot.start())
+        await keep_alive()
+        sudoers_watch = asyncio.create_task(watch_sudoers())
     except Exception as ex:
         LOGGER.error(ex)
         quit(1)
-    
-    for all_module in ALL_MODULES:
-        imported_module=importlib.import_module("diary.modules." + all_module)
-        if hasattr(imported_module, "__MODULE__") and imported_module.__MODULE__:
-            imported_module.__MODULE__ = imported_module.__MODULE__
-            if hasattr(imported_module, "__HELP__") and imported_module.__HELP__:
-                HELPABLE[imported_module.__MODULE__.lower()] = imported_module
+
     LOGGER.info(ALL_MODULES)
     LOGGER.info(f"@{DiaryBot.username} Started.")
 
@@ -31,10 +50,15 @@ async def diary_start():
         BotCommand("start", "Start the bot"),
         BotCommand("verify", "login / register"),
         BotCommand("addpage","add your diary pages"),
-        BotCommand("getpages", "find you diary pages")
+        BotCommand("getpages", "find you diary pages"),
+        BotCommand("search", "search your diary pages"),
+        BotCommand("export", "download your whole diary"),
     ])
 
     await idle()
+    sudoers_watch.cancel()
+    # ✅ Flushes buffered writes and persists pending deletions before exiting
+    await DiaryBot.stop()
 
 
 if __name__ == "__main__":
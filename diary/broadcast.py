@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+
+from pyrogram.errors import (
+    InputUserDeactivated,
+    MessageNotModified,
+    PeerIdInvalid,
+    UserDeactivated,
+    UserDeactivatedBan,
+    UserIsBlocked,
+)
+
+from diary import DiaryBot, db
+from diary.database import users_db, pending_users_db
+from diary.metrics import Counter
+from diary.sender import send
+from config import BROADCAST_CONCURRENCY, BROADCAST_CHUNK_SIZE
+
+LOGGER = logging.getLogger(__name__)
+
+broadcasts_db = db.broadcasts
+
+BROADCAST_SENDS = Counter("diary_broadcast_sends_total", "Broadcast messages, by outcome")
+
+# Recipients that will never receive anything, counted but not retried
+UNREACHABLE = (UserIsBlocked, InputUserDeactivated, UserDeactivated, UserDeactivatedBan, PeerIdInvalid)
+
+# Seconds between edits of the progress message
+PROGRESS_EVERY = 5
+
+### 🔹 Recipients
+async def _ids(collection, after):
+    cursor = collection.find(
+        {"telegram_id": {"$gt": after}}, {"_id": 0, "telegram_id": 1}
+    ).sort("telegram_id", 1).batch_size(BROADCAST_CHUNK_SIZE)
+    async for doc in cursor:
+        yield doc["telegram_id"]
+
+async def _next(stream):
+    try:
+        return await stream.__anext__()
+    except StopAsyncIteration:
+        return None
+
+async def recipients(after=0):
+    """✅ Every telegram_id in `users_db` and `pending_users`, ascending and without repeats.
+
+    Both cursors walk the `telegram_id` index, so only one batch of each is in
+    memory, and a broadcast can resume from the last id it finished.
+    """
+    streams = [_ids(users_db, after), _ids(pending_users_db, after)]
+    heads = [await _next(stream) for stream in streams]
+    last = after
+    while any(head is not None for head in heads):
+        current = min(head for head in heads if head is not None)
+        if current != last:
+            yield current
+            last = current
+        for i, head in enumerate(heads):
+            if head == current:
+                heads[i] = await _next(streams[i])
+
+async def _chunks(after):
+    chunk = []
+    async for user_id in recipients(after):
+        chunk.append(user_id)
+        if len(chunk) >= BROADCAST_CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+### 🔹 Broadcast Job
+class Broadcast:
+    """✅ One announcement to every user, checkpointed in `db.broadcasts` after each chunk"""
+
+    def __init__(self, job, status_message):
+        self.job = job
+        self.status_message = status_message
+        self.stopped_by_owner = False
+        self._last_edit = 0
+
+    @classmethod
+    async def create(cls, content, status_message):
+        """✅ `content` is {"text": ...} or {"from_chat_id": ..., "message_id": ...} to copy"""
+        job = {
+            **content,
+            "status": "running",
+            "last_id": 0,
+            "sent": 0,
+            "failed": 0,
+            "started_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow(),
+        }
+        job["_id"] = (await broadcasts_db.insert_one(job)).inserted_id
+        return cls(job, status_message)
+
+    @classmethod
+    async def unfinished(cls, status_message):
+        """✅ The latest broadcast that was interrupted or failed, if any"""
+        job = await broadcasts_db.find_one({"status": {"$in": ["running", "failed"]}}, sort=[("started_at", -1)])
+        if not job:
+            return None
+        job["status"] = "running"  # written with the next checkpoint
+        return cls(job, status_message)
+
+    async def _send_one(self, chat_id):
+        job = self.job
+        if "text" in job:
+            call = lambda: DiaryBot.send_message(chat_id, job["text"])
+        else:
+            call = lambda: DiaryBot.copy_message(chat_id, job["from_chat_id"], job["message_id"])
+        try:
+            await send(chat_id, call)
+            BROADCAST_SENDS.inc(outcome="sent")
+            return True
+        except UNREACHABLE:
+            BROADCAST_SENDS.inc(outcome="unreachable")
+        except Exception as e:
+            LOGGER.error(f"⚠️ Broadcast to {chat_id} failed: {e}")
+            BROADCAST_SENDS.inc(outcome="failed")
+        return False
+
+    async def _send_chunk(self, chunk):
+        # A fixed pool of workers, so a chunk never holds more than that many sends
+        pending = iter(chunk)
+        sent = 0
+
+        async def worker():
+            nonlocal sent
+            for chat_id in pending:
+                sent += await self._send_one(chat_id)
+
+        await asyncio.gather(*(worker() for _ in range(BROADCAST_CONCURRENCY)))
+        return sent
+
+    async def _checkpoint(self, **changes):
+        self.job.update(changes, updated_at=datetime.utcnow())
+        await broadcasts_db.update_one(
+            {"_id": self.job["_id"]},
+            {"$set": {key: self.job[key] for key in ("status", "last_id", "sent", "failed", "updated_at")}},
+        )
+
+    def progress_text(self) -> str:
+        job = self.job
+        return (
+            f"📣 **Broadcast {job['status']}**\n\n"
+            f"✅ Sent: {job['sent']}\n"
+            f"❌ Failed: {job['failed']}\n"
+            f"🆔 Last user: `{job['last_id']}`"
+        )
+
+    async def _show_progress(self, force=False):
+        if not force and time.monotonic() - self._last_edit < PROGRESS_EVERY:
+            return
+        self._last_edit = time.monotonic()
+        try:
+            await self.status_message.edit_text(self.progress_text())
+        except MessageNotModified:
+            pass
+        except Exception as e:
+            LOGGER.error(f"⚠️ Could not update broadcast progress: {e}")
+
+    async def run(self):
+        """✅ Send to everyone after the checkpoint.
+
+        Cancelled by the owner it ends as "cancelled"; cancelled by a shutdown it
+        stays "running" so `/broadcast resume` picks it up again. Any other error
+        is logged and ends it as "failed", which can be resumed as well. Nothing
+        awaits the task, so it never raises.
+        """
+        try:
+            async for chunk in _chunks(self.job["last_id"]):
+                sent = await self._send_chunk(chunk)
+                await self._checkpoint(
+                    last_id=chunk[-1],
+                    sent=self.job["sent"] + sent,
+                    failed=self.job["failed"] + len(chunk) - sent,
+                )
+                await self._show_progress()
+            await self._checkpoint(status="done")
+        except asyncio.CancelledError:
+            if self.stopped_by_owner:
+                await self._checkpoint(status="cancelled")
+            raise
+        except Exception as e:
+            LOGGER.exception(f"⚠️ Broadcast {self.job['_id']} failed after user {self.job['last_id']}: {e}")
+            try:
+                await self._checkpoint(status="failed")
+            except Exception as e:
+                LOGGER.error(f"⚠️ Could not mark broadcast {self.job['_id']} as failed: {e}")
+        finally:
+            await self._show_progress(force=True)
+
+    def cancel(self, task):
+        self.stopped_by_owner = True
+        task.cancel()
@@ -0,0 +1,92 @@
+from pyrogram.handlers import CallbackQueryHandler
+
+from diary import DiaryBot
+from diary.dispatcher import serialized
+from diary.metrics import Counter, instrument
+
+# Callback data is "<version><action>[:<arg>]", e.g. "1older:<cursor hex>".
+# Bumping VERSION retires every button already sent; their taps get a
+# "please start again" answer instead of reaching a handler with stale args.
+VERSION = "1"
+
+# Telegram's limit for `callback_data`, in bytes
+MAX_DATA = 64
+
+CALLBACKS_UNROUTED = Counter("diary_callbacks_unrouted_total", "Button taps no handler took, by reason")
+
+EXPIRED_TEXT = "⌛ This button has expired, please use /start again."
+
+### 🔹 Encoding
+def encode(action: str, arg=None) -> str:
+    """✅ `callback_data` for `action`, raises ValueError past Telegram's 64 bytes"""
+    data = VERSION + action if arg is None else f"{VERSION}{action}:{arg}"
+    if len(data.encode()) > MAX_DATA:
+        raise ValueError(f"Callback data for {action!r} is {len(data.encode())} bytes, the limit is {MAX_DATA}")
+    return data
+
+def decode(data: str):
+    """✅ `(action, raw_arg)`, or None for data of another version"""
+    if not data or data[0] != VERSION:
+        return None
+    action, _, arg = data[1:].partition(":")
+    return action, arg or None
+
+
+### 🔹 Argument Types
+def hex_arg(raw: str) -> str:
+    """✅ A hex string such as a page or search cursor"""
+    bytes.fromhex(raw)  # ValueError for anything else
+    return raw
+
+def hex_args(raw: str) -> tuple:
+    """✅ Several hex strings joined by ':'"""
+    return tuple(hex_arg(part) for part in raw.split(":"))
+
+
+### 🔹 Router
+class CallbackRouter:
+    """✅ One Pyrogram handler for all buttons, routed by a dict lookup on the action.
+
+    Routes are registered with `@router.route("action")`, or
+    `@router.route("action", arg=hex_arg)` for handlers that take a typed
+    argument as their third parameter.
+    """
+
+    def __init__(self):
+        self._routes = {}  # action -> (handler, arg parser)
+
+    def route(self, action: str, arg=None):
+        if action in self._routes:
+            raise ValueError(f"Callback action {action!r} is already routed")
+
+        def decorator(func):
+            self._routes[action] = (instrument(func), arg)
+            return func
+
+        return decorator
+
+    async def dispatch(self, client, callback_query):
+        decoded = decode(callback_query.data)
+        route = self._routes.get(decoded[0]) if decoded else None
+        if route is None:
+            CALLBACKS_UNROUTED.inc(reason="unknown")
+            await callback_query.answer(EXPIRED_TEXT, show_alert=True)
+            return
+
+        handler, parse = route
+        if parse is None:
+            return await handler(client, callback_query)
+
+        try:
+            arg = parse(decoded[1] or "")
+        except ValueError:
+            CALLBACKS_UNROUTED.inc(reason="bad_arg")
+            await callback_query.answer(EXPIRED_TEXT, show_alert=True)
+            return
+        return await handler(client, callback_query, arg)
+
+
+router = CallbackRouter()
+
+# Queued per user like every other handler; each route is timed under its own name
+DiaryBot.add_handler(CallbackQueryHandler(serialized(DiaryBot.user_dispatcher, router.dispatch)))
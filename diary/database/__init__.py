@@ -1,24 +1,64 @@
-import re
-import bcrypt
-from .. import db, LOGGER
-from datetime import datetime
-import pytz  
+import asyncio
+import time
+from .. import db, LOGGER, DiaryBot
+from config import OWNER_ID, SUDOERS, LOGIN_SESSION_DAYS, MONGO_MIN_POOL_SIZE, MONGO_STALE_READ_PREFERENCE
+from pymongo.read_preferences import read_pref_mode_from_name, make_read_preference
+from datetime import datetime, timedelta, timezone
 
-IST = pytz.timezone("Asia/Kolkata") 
+# India has no DST, a fixed offset is enough (and avoids loading pytz)
+IST = timezone(timedelta(hours=5, minutes=30), "IST")
 
 # ✅ Databases
 users_db = db.users_db  # ✅ Fully registered users
 pending_users_db = db.pending_users  # ✅ Users who started but haven't registered
-login_db = db.login_db  # ✅ Multiple login sessions
+login_db = db.login_db  # ✅ Legacy credentials (older accounts only)
+sessions_db = db.sessions  # ✅ One row per (Telegram user, account) login
 sudoers_db = db.sudoers  # ✅ Admin users
 
-### 🔹 Hash & Verify Password
-def hash_password(password):
-    salt = bcrypt.gensalt()
-    return bcrypt.hashpw(password.encode(), salt).decode()
+# ✅ `users_db` for reads that may lag a little (replica secondaries)
+users_read_db = users_db.with_options(
+    read_preference=make_read_preference(read_pref_mode_from_name(MONGO_STALE_READ_PREFERENCE), None)
+)
 
-def check_password(password, hashed_password):
-    return bcrypt.checkpw(password.encode(), hashed_password.encode())
+### 🔹 Hash & Verify Password
+from .password import hash_password_async, verify_password_async
+from .cache import AsyncCache
+
+### 🔹 Read-through cache for user & login documents
+user_cache = AsyncCache()
+
+# Seconds after a write during which that user is read from the primary,
+# so a secondary that has not caught up yet cannot undo the write for them
+READ_YOUR_WRITES = 10
+_written = {}  # cache key -> time of the last write
+
+def invalidate_user(telegram_id=None, username=None):
+    """✅ Forget cached documents of a user after any write to them"""
+    keys = []
+    if telegram_id is not None:
+        keys.append(("id", telegram_id))
+    if username is not None:
+        keys += [("username", username), ("login", username)]
+    user_cache.invalidate(*keys)
+
+    now = time.monotonic()
+    if len(_written) > 10000:
+        for key, at in list(_written.items()):
+            if now - at > READ_YOUR_WRITES:
+                del _written[key]
+    for key in keys:
+        _written[key] = now
+
+def _users_for(key):
+    """✅ Collection to read `key` from: primary right after a write, else `users_read_db`"""
+    at = _written.get(key)
+    if at is not None and time.monotonic() - at < READ_YOUR_WRITES:
+        return users_db
+    return users_read_db
+
+async def warm_pool():
+    """✅ Open MONGO_MIN_POOL_SIZE connections now instead of on the first updates"""
+    await asyncio.gather(*(db.command("ping") for _ in range(max(MONGO_MIN_POOL_SIZE, 1))))
 
 ### 🔹 Sudo Users Management
 async def get_sudoers() -> list:
@@ -26,17 +66,14 @@ async def get_sudoers() -> list:
     return sudoers["sudoers"] if sudoers else []
 
 async def add_sudo(user_id: int) -> bool:
-    sudoers = await get_sudoers()
-    if user_id not in sudoers:
-        sudoers.append(user_id)
-        await sudoers_db.update_one({"sudo": "sudo"}, {"$set": {"sudoers": sudoers}}, upsert=True)
+    await sudoers_db.update_one({"sudo": "sudo"}, {"$addToSet": {"sudoers": user_id}}, upsert=True)
+    SUDOERS.add(user_id)
     return True
 
 async def remove_sudo(user_id: int) -> bool:
-    sudoers = await get_sudoers()
-    if user_id in sudoers:
-        sudoers.remove(user_id)
-        await sudoers_db.update_one({"sudo": "sudo"}, {"$set": {"sudoers": sudoers}}, upsert=True)
+    await sudoers_db.update_one({"sudo": "sudo"}, {"$pull": {"sudoers": user_id}})
+    if user_id != OWNER_ID:
+        SUDOERS.discard(user_id)
     return True
 
 ### 🔹 Check If User is Registered
@@ -52,41 +89,52 @@ async def is_registered_by_id(telegram_id: int) -> bool:
 
 async def get_user_by_username(username: str):
     """✅ Get user details by username"""
-    return await users_db.find_one({"username": username})
+    key = ("username", username)
+    return await user_cache.get(key, lambda: _users_for(key).find_one({"username": username}, {"password": 0}))
 
 async def get_user_by_id(telegram_id: int):
     """✅ Get user details by Telegram ID"""
-    return await users_db.find_one({"telegram_id": telegram_id})
+    key = ("id", telegram_id)
+    return await user_cache.get(key, lambda: _users_for(key).find_one({"telegram_id": telegram_id}, {"password": 0}))
 
 
 ### 🔹 Save User When They Start the Bot
-async def add_pending_user(user_id):
-    """✅ Save user entry when they start the bot (before registration)"""
-    user_exists = await pending_users_db.find_one({"telegram_id": user_id})
-    
-    if not user_exists:
-        current_time_utc = datetime.utcnow()
-        current_time_ist = current_time_utc.astimezone(IST)
-
-        new_user = {
-            "telegram_id": user_id,  
-            "registered_at": str(current_time_ist.strftime("%d-%m-%Y %I:%M %p"))
-        }
-        await pending_users_db.insert_one(new_user)  # ✅ Save in pending_users_db
-        return True
-    return False
-
-
-### 🔹 Save Login Sessions for Multiple Accounts
-async def save_login_session(user_id, username, password):
-    """✅ Save additional login session"""
-    hashed_password = hash_password(password)
-    await login_db.insert_one({
-        "telegram_id": user_id,
-        "username": username,
-        "password": hashed_password
+def add_pending_user(user_id):
+    """✅ Save user entry when they start the bot (before registration), written in the background"""
+    current_time_ist = datetime.now(IST)
+    DiaryBot.pending_users.add(user_id, {
+        "registered_at": str(current_time_ist.strftime("%d-%m-%Y %I:%M %p"))
     })
 
+
+### 🔹 Login Sessions for Multiple Accounts
+async def save_login_session(user_id, username):
+    """✅ Record a login (password is verified before this, never stored again)"""
+    now = datetime.utcnow()
+    await sessions_db.update_one(
+        {"telegram_id": user_id, "username": username},
+        {
+            "$set": {"last_login_at": now, "expires_at": now + timedelta(days=LOGIN_SESSION_DAYS)},
+            "$setOnInsert": {"first_login_at": now},
+            "$inc": {"logins": 1},
+        },
+        upsert=True,
+    )
+    invalidate_user(user_id, username)
+
+async def get_active_accounts(user_id) -> list:
+    """✅ Usernames this Telegram user is logged in to, most recent first"""
+    cursor = sessions_db.find(
+        {"telegram_id": user_id, "expires_at": {"$gt": datetime.utcnow()}},
+        {"_id": 0, "username": 1},
+    ).sort("last_login_at", -1)
+    return [doc["username"] async for doc in cursor]
+
+async def end_login_session(user_id, username) -> bool:
+    """✅ Log a Telegram user out of one account"""
+    result = await sessions_db.delete_one({"telegram_id": user_id, "username": username})
+    return result.deleted_count > 0
+
 ### 🔹 Fetch All Registered Users
 async def get_all_registered_users():
     """✅ Fetch all registered users"""
@@ -94,16 +142,25 @@ async def get_all_registered_users():
     return [doc["username"] async for doc in cursor]
 
 ### 🔹 Fetch Login Data by Username
+async def _load_login_data(username):
+    user = await users_db.find_one({"username": username, "password": {"$exists": True}})
+    if user:
+        return user
+    # Accounts registered before credentials moved into `users_db` keep them in
+    # `login_db` rows that carry `email` (session rows do not).
+    return await login_db.find_one({"username": username, "email": {"$exists": True}})
+
 async def get_login_data(username):
     """✅ Get login credentials for a username"""
-    return await login_db.find_one({"username": username})
+    return await user_cache.get(("login", username), lambda: _load_login_data(username))
 
 ### 🔹 Delete a User from Database
 async def delete_user(filter_query):
     """✅ Delete a user from the registered users database"""
     try:
-        result = await users_db.delete_one(filter_query)
-        if result.deleted_count:
+        user = await users_db.find_one_and_delete(filter_query)
+        if user:
+            invalidate_user(user.get("telegram_id"), user.get("username"))
             LOGGER.info("✅ User deleted successfully.")
         else:
             LOGGER.info("❌ No user found to delete.")
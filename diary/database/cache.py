@@ -0,0 +1,75 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+from config import CACHE_TTL, CACHE_MAX_SIZE
+
+
+class AsyncCache:
+    """✅ Bounded TTL cache for DB documents with single-flight loading.
+
+    Each process has its own: with SHARDS > 1 a document changed or deleted by
+    another worker can be served from here for up to `ttl` seconds.
+    """
+
+    def __init__(self, max_size=CACHE_MAX_SIZE, ttl=CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "invalidations": 0}
+        self._entries = OrderedDict()
+        self._loading = {}
+
+    async def get(self, key, loader):
+        """✅ Return the cached value for `key`, calling `loader()` once on a miss"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return value
+            del self._entries[key]
+
+        future = self._loading.get(key)
+        if future is not None:
+            # Someone is already loading this key, wait for their result.
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(future)
+
+        self.stats["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        try:
+            value = await loader()
+        except BaseException as e:
+            if self._loading.get(key) is future:
+                del self._loading[key]
+            if isinstance(e, Exception):
+                future.set_exception(e)
+                future.exception()  # mark as retrieved when nobody else waits
+            else:
+                future.cancel()
+            raise
+
+        # Only store the value if nobody invalidated the key while it loaded.
+        if self._loading.get(key) is future:
+            del self._loading[key]
+            # Nor a miss (None): another worker may create the document any moment,
+            # and its invalidation never reaches this one
+            if value is not None:
+                self._entries[key] = (value, time.monotonic() + self.ttl)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        future.set_result(value)
+        return value
+
+    def invalidate(self, *keys):
+        """✅ Drop keys after a write so the next read goes to the DB"""
+        for key in keys:
+            self._entries.pop(key, None)
+            self._loading.pop(key, None)
+            self.stats["invalidations"] += 1
+
+    def __len__(self):
+        return len(self._entries)
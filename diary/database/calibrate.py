@@ -0,0 +1,60 @@
+import os
+import sys
+import time
+
+from .password import HASHERS
+from config import KDF_TARGET_MS, KDF_WORKERS
+
+# Run with `python -m diary.database.calibrate [target_ms] [concurrent_logins]`
+# on the host the bot runs on, then set the printed values in the environment.
+
+# Cost parameter tried for each algorithm, cheapest first
+COST_RANGES = {
+    "bcrypt": ("rounds", "BCRYPT_ROUNDS", range(10, 17)),
+    "scrypt": ("log_n", "SCRYPT_LOG_N", range(14, 21)),
+    "argon2": ("time_cost", "ARGON2_TIME_COST", range(1, 11)),
+}
+
+def _time_hash(hasher, runs=3) -> float:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        hasher.hash("calibration-password!")
+        timings.append(time.perf_counter() - started)
+    return sorted(timings)[len(timings) // 2]
+
+def calibrate(target_ms=KDF_TARGET_MS, concurrent=None, workers=None):
+    """✅ Highest cost per algorithm whose login latency stays within `target_ms`.
+
+    Hashes are CPU bound, so at most one runs per core whatever KDF_WORKERS
+    says. With `concurrent` logins arriving together, the last one waits for
+    ceil(concurrent / workers) hashes; that is the latency held to the target.
+    Returns {algorithm: (env name, value, ms per hash)}.
+    """
+    workers = workers or min(KDF_WORKERS, os.cpu_count() or 1)
+    concurrent = concurrent or workers
+    rounds = -(-concurrent // workers)
+    chosen = {}
+    for name, (param, env, values) in COST_RANGES.items():
+        for value in values:
+            try:
+                hasher = HASHERS[name](**{param: value})
+            except ImportError:
+                break  # argon2-cffi not installed
+            seconds = _time_hash(hasher)
+            if seconds * rounds * 1000 > target_ms:
+                break
+            chosen[name] = (env, value, round(seconds * 1000, 1))
+    return chosen
+
+
+if __name__ == "__main__":
+    target_ms = float(sys.argv[1]) if len(sys.argv) > 1 else KDF_TARGET_MS
+    concurrent = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    workers = min(KDF_WORKERS, os.cpu_count() or 1)
+    print(f"Target {target_ms} ms, {concurrent or workers} concurrent logins, {workers} KDF workers ({os.cpu_count()} cores)")
+    chosen = calibrate(target_ms, concurrent, workers)
+    for name, (env, value, ms) in chosen.items():
+        print(f"{name:<8} {env}={value}  ({ms} ms per hash)")
+    for name in COST_RANGES.keys() - chosen.keys():
+        print(f"{name:<8} unavailable, or too slow even at its lowest cost")
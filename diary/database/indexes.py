@@ -0,0 +1,87 @@
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from .. import db, LOGGER
+from . import users_db, pending_users_db, login_db, sessions_db, sudoers_db
+from .pages import pages_db
+from .search import searches_db
+
+### 🔹 Indexes for every collection (create_indexes is a no-op when they exist)
+INDEXES = [
+    (users_db, [
+        IndexModel([("username", ASCENDING)], unique=True, name="username_unique"),
+        IndexModel([("telegram_id", ASCENDING)], name="telegram_id"),
+    ]),
+    (pending_users_db, [
+        IndexModel([("telegram_id", ASCENDING)], unique=True, name="telegram_id_unique"),
+    ]),
+    (login_db, [
+        IndexModel([("username", ASCENDING), ("email", ASCENDING)], name="username_email"),
+    ]),
+    (sessions_db, [
+        IndexModel([("telegram_id", ASCENDING), ("username", ASCENDING)], unique=True, name="telegram_id_username_unique"),
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl"),
+    ]),
+    (sudoers_db, [
+        IndexModel([("sudo", ASCENDING)], unique=True, name="sudo_unique"),
+    ]),
+    (pages_db, [
+        IndexModel([("owner", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="owner_created_at_id"),
+        IndexModel([("owner", ASCENDING), ("terms", ASCENDING), ("created_at", DESCENDING)], name="owner_terms_created_at"),
+    ]),
+    (searches_db, [
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl"),
+    ]),
+    (db.broadcasts, [
+        IndexModel([("status", ASCENDING), ("started_at", DESCENDING)], name="status_started_at"),
+    ]),
+    (db.rate_limits, [
+        IndexModel([("updated", ASCENDING)], expireAfterSeconds=3600, name="updated_ttl"),
+    ]),
+]
+
+# Every filter shape the bot sends, with placeholder values.
+QUERY_SHAPES = [
+    (users_db, {"username": ""}),
+    (users_db, {"username": "", "password": {"$exists": True}}),
+    (users_db, {"telegram_id": 0}),
+    (pending_users_db, {"telegram_id": 0}),
+    (users_db, {"telegram_id": {"$gt": 0}}),
+    (pending_users_db, {"telegram_id": {"$gt": 0}}),
+    (db.broadcasts, {"status": "running"}),
+    (login_db, {"username": "", "email": {"$exists": True}}),
+    (sessions_db, {"telegram_id": 0, "username": ""}),
+    (sessions_db, {"telegram_id": 0, "expires_at": {"$gt": 0}}),
+    (sudoers_db, {"sudo": "sudo"}),
+    (pages_db, {"owner": ""}),
+    (pages_db, {"owner": "", "$or": [{"created_at": {"$lt": 0}}, {"created_at": 0, "_id": {"$lt": 0}}]}),
+    (pages_db, {"owner": "", "terms": {"$in": [""]}, "created_at": {"$gte": 0}}),
+]
+
+async def ensure_indexes():
+    """✅ Create all indexes, safe to run on every start"""
+    for collection, indexes in INDEXES:
+        try:
+            await collection.create_indexes(indexes)
+        except OperationFailure as e:
+            # e.g. a unique index over existing duplicate rows
+            LOGGER.error(f"⚠️ Could not create indexes on {collection.name}: {e}")
+
+
+def _stages(plan):
+    yield plan.get("stage")
+    if "inputStage" in plan:
+        yield from _stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+async def audit_query_shapes():
+    """✅ Run explain() on every query shape, returns the ones doing a COLLSCAN"""
+    collscans = []
+    for collection, query in QUERY_SHAPES:
+        explain = await collection.find(query).explain()
+        plan = explain["queryPlanner"]["winningPlan"]
+        plan = plan.get("queryPlan", plan)  # slot-based engine wraps the plan
+        if "COLLSCAN" in _stages(plan):
+            collscans.append((collection.name, query))
+    return collscans
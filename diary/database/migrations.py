@@ -0,0 +1,93 @@
+import asyncio
+from datetime import timedelta
+
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+
+from .. import LOGGER
+from . import login_db, sessions_db
+from .indexes import ensure_indexes
+from config import LOGIN_SESSION_DAYS
+
+# Run once with `python -m diary.database.migrations`, safe to run again.
+
+BATCH_SIZE = 1000
+
+# Session rows are the `login_db` rows without credentials
+LEGACY_SESSION = {"email": {"$exists": False}}
+
+### 🔹 login_db session rows -> sessions
+async def _apply(batch, ids):
+    """✅ Upsert one batch of sessions, then delete exactly the rows folded into it"""
+    await sessions_db.bulk_write(batch, ordered=False)
+    result = await login_db.delete_many({"_id": {"$in": ids}})
+    return result.deleted_count
+
+def _fold(row):
+    """✅ Upsert adding one group of legacy rows to its session, at most once.
+
+    Legacy rows only hold telegram_id, username and password, their times
+    come from their ObjectIds. The session keeps the newest row folded into it
+    (`legacy_last_id`), so a run that failed between the upserts and the
+    delete can be repeated without counting those rows again.
+    """
+    first_login_at = row["first_id"].generation_time.replace(tzinfo=None)
+    last_login_at = row["last_id"].generation_time.replace(tzinfo=None)
+    logins = {"$add": [{"$ifNull": ["$logins", 0]}, row["logins"]]}
+    return UpdateOne(
+        row["_id"],
+        [
+            {"$set": {"_folded": {"$gte": ["$legacy_last_id", row["last_id"]]}}},
+            # `$max`/`$min` keep an existing newer/older value if the bot wrote one already
+            {"$set": {
+                "logins": {"$cond": ["$_folded", "$logins", logins]},
+                "legacy_last_id": {"$max": ["$legacy_last_id", row["last_id"]]},
+                "first_login_at": {"$min": [{"$ifNull": ["$first_login_at", first_login_at]}, first_login_at]},
+                "last_login_at": {"$max": ["$last_login_at", last_login_at]},
+                "expires_at": {"$max": ["$expires_at", last_login_at + timedelta(days=LOGIN_SESSION_DAYS)]},
+            }},
+            {"$project": {"_folded": 0}},  # drop the helper field
+        ],
+        upsert=True,
+    )
+
+async def compact_login_sessions():
+    """✅ Fold duplicate `login_db` session rows into one `sessions` row per (telegram_id, username)"""
+    pipeline = [
+        {"$match": LEGACY_SESSION},
+        {"$group": {
+            "_id": {"telegram_id": "$telegram_id", "username": "$username"},
+            "first_id": {"$min": "$_id"},
+            "last_id": {"$max": "$_id"},
+            "logins": {"$sum": 1},
+            "ids": {"$push": "$_id"},
+        }},
+    ]
+    # Rows are deleted batch by batch and only after their upserts succeeded,
+    # so a failed run leaves every row it did not delete for the next run
+    batch, ids, accounts, deleted = [], [], 0, 0
+    async for row in login_db.aggregate(pipeline, allowDiskUse=True):
+        batch.append(_fold(row))
+        ids.extend(row["ids"])
+        if len(batch) >= BATCH_SIZE:
+            deleted += await _apply(batch, ids)
+            accounts += len(batch)
+            batch, ids = [], []
+    if batch:
+        deleted += await _apply(batch, ids)
+        accounts += len(batch)
+
+    LOGGER.info(f"✅ Compacted {deleted} login rows into {accounts} sessions.")
+
+    try:
+        await login_db.drop_index("telegram_id_username")
+    except OperationFailure:
+        pass  # never created, or already dropped
+
+async def migrate():
+    await ensure_indexes()
+    await compact_login_sessions()
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
@@ -0,0 +1,122 @@
+import struct
+import zlib
+from datetime import datetime, timedelta
+
+from bson import Binary, ObjectId
+from pymongo.errors import OperationFailure
+
+from .. import db, mongo_client, LOGGER
+from config import PAGE_COMPRESS_THRESHOLD, PAGES_PER_SCREEN
+from . import users_db, invalidate_user
+from .search import tokenize
+
+# ✅ Diary pages, one document per page
+pages_db = db.pages
+
+### 🔹 Page Bodies (zlib above PAGE_COMPRESS_THRESHOLD bytes)
+def _encode_body(text: str) -> dict:
+    raw = text.encode()
+    if len(raw) > PAGE_COMPRESS_THRESHOLD:
+        return {"body_z": Binary(zlib.compress(raw))}
+    return {"body": text}
+
+def page_text(page: dict) -> str:
+    """✅ Plain text of a stored page"""
+    if "body_z" in page:
+        return zlib.decompress(page["body_z"]).decode()
+    return page["body"]
+
+
+### 🔹 Opaque Pagination Cursors
+EPOCH = datetime(1970, 1, 1)
+
+def encode_cursor(page: dict) -> str:
+    """✅ Cursor pointing at a page: created_at in ms + ObjectId, as hex"""
+    millis = (page["created_at"] - EPOCH) // timedelta(milliseconds=1)
+    return (struct.pack(">q", millis) + page["_id"].binary).hex()
+
+def decode_cursor(cursor: str):
+    raw = bytes.fromhex(cursor)
+    millis = struct.unpack(">q", raw[:8])[0]
+    return EPOCH + timedelta(milliseconds=millis), ObjectId(raw[8:])
+
+
+### 🔹 Add a Page
+# Server error code when transactions are used on a standalone mongod
+ILLEGAL_OPERATION = 20
+_transactions = True  # cleared after the server refused the first one
+
+async def add_page(owner: str, text: str, telegram_id: int = None) -> dict:
+    """✅ Store a page and bump the owner's `total_pages` in one transaction.
+
+    Transactions need a replica set (or mongos); on a standalone mongod both
+    writes run on their own, the `$inc` being atomic by itself. Pass the
+    writer's `telegram_id` so their next read sees the new count.
+    """
+    global _transactions
+    now = datetime.utcnow()
+    page = {
+        "owner": owner,
+        # Mongo keeps milliseconds only, truncate so cursors match stored values
+        "created_at": now.replace(microsecond=now.microsecond // 1000 * 1000),
+        **_encode_body(text),
+        # search terms stay plain even when the body is compressed
+        "terms": tokenize(text),
+    }
+
+    async def write(session):
+        await pages_db.insert_one(page, session=session)
+        await users_db.update_one({"username": owner}, {"$inc": {"total_pages": 1}}, session=session)
+
+    if _transactions:
+        try:
+            async with await mongo_client.start_session() as session:
+                await session.with_transaction(write)
+        except OperationFailure as e:
+            if e.code != ILLEGAL_OPERATION:
+                raise
+            LOGGER.info(f"Transactions unavailable ({e}), writing pages without them.")
+            _transactions = False
+    if not _transactions:
+        await write(None)
+    invalidate_user(telegram_id, owner)
+    return page
+
+
+### 🔹 Fetch Pages with Keyset Pagination on (owner, created_at, _id)
+async def get_pages(owner: str, cursor: str = None, newer: bool = False, limit: int = PAGES_PER_SCREEN):
+    """✅ Pages older than `cursor` (or newer with `newer=True`), newest first.
+
+    Returns `(pages, has_more)`; `has_more` tells if more pages exist in the
+    direction that was asked for.
+    """
+    query = {"owner": owner}
+    if cursor:
+        created_at, page_id = decode_cursor(cursor)
+        op = "$gt" if newer else "$lt"
+        query["$or"] = [
+            {"created_at": {op: created_at}},
+            {"created_at": created_at, "_id": {op: page_id}},
+        ]
+
+    order = 1 if newer else -1
+    pages = await (
+        pages_db.find(query)
+        .sort([("created_at", order), ("_id", order)])
+        .limit(limit + 1)
+        .to_list(length=limit + 1)
+    )
+    has_more = len(pages) > limit
+    pages = pages[:limit]
+    if newer:
+        pages.reverse()
+    return pages, has_more
+
+
+### 🔹 Stream Every Page (exports)
+async def iter_pages(owner: str, batch_size: int = 200):
+    """✅ All pages of `owner`, oldest first, one cursor batch in memory at a time"""
+    cursor = pages_db.find({"owner": owner}, {"terms": 0})
+    cursor = cursor.sort([("created_at", 1), ("_id", 1)]).batch_size(batch_size)
+    async for page in cursor:
+        yield page
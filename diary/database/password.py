@@ -0,0 +1,235 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from config import (
+    KDF_EXECUTOR,
+    KDF_WORKERS,
+    KDF_MAX_PENDING,
+    KDF_WAIT_TIMEOUT,
+    KDF_ALGORITHM,
+    BCRYPT_ROUNDS,
+    SCRYPT_LOG_N,
+    SCRYPT_R,
+    SCRYPT_P,
+    ARGON2_TIME_COST,
+    ARGON2_MEMORY_KIB,
+    ARGON2_PARALLELISM,
+)
+from diary.metrics import add_kdf_time
+
+LOGGER = logging.getLogger(__name__)
+
+# Every stored hash names its algorithm and cost, so old hashes keep
+# verifying after the policy changes and are upgraded on the next login.
+
+def _b64(raw: bytes) -> str:
+    return base64.b64encode(raw).decode().rstrip("=")
+
+def _unb64(text: str) -> bytes:
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+### 🔹 Hashers
+class BcryptHasher:
+    """✅ `$2b$<rounds>$...`, the format every account before scrypt used"""
+    name = "bcrypt"
+
+    def __init__(self, rounds=BCRYPT_ROUNDS):
+        self.rounds = rounds
+
+    def identifies(self, hashed: str) -> bool:
+        return hashed.startswith("$2")
+
+    def hash(self, password: str) -> str:
+        import bcrypt  # loaded on first use (and only in pool processes with KDF_EXECUTOR=process)
+
+        return bcrypt.hashpw(password.encode(), bcrypt.gensalt(self.rounds)).decode()
+
+    def verify(self, password: str, hashed: str) -> bool:
+        import bcrypt
+
+        return bcrypt.checkpw(password.encode(), hashed.encode())
+
+    def needs_rehash(self, hashed: str) -> bool:
+        return int(hashed.split("$")[2]) != self.rounds
+
+
+class ScryptHasher:
+    """✅ `$scrypt$ln=<log2 N>,r=<r>,p=<p>$<salt>$<key>` with `hashlib.scrypt` (memory-hard, no extra package)"""
+    name = "scrypt"
+
+    def __init__(self, log_n=SCRYPT_LOG_N, r=SCRYPT_R, p=SCRYPT_P):
+        self.log_n = log_n
+        self.r = r
+        self.p = p
+
+    def identifies(self, hashed: str) -> bool:
+        return hashed.startswith("$scrypt$")
+
+    @staticmethod
+    def _derive(password, salt, log_n, r, p):
+        n = 1 << log_n
+        # scrypt needs 128 * N * r bytes; OpenSSL refuses anything above `maxmem`
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r + 2 ** 20, dklen=32)
+
+    def hash(self, password: str) -> str:
+        salt = os.urandom(16)
+        key = self._derive(password, salt, self.log_n, self.r, self.p)
+        return f"$scrypt$ln={self.log_n},r={self.r},p={self.p}${_b64(salt)}${_b64(key)}"
+
+    @staticmethod
+    def _params(hashed: str):
+        _, _, params, salt, key = hashed.split("$")
+        params = dict(item.split("=") for item in params.split(","))
+        return int(params["ln"]), int(params["r"]), int(params["p"]), _unb64(salt), _unb64(key)
+
+    def verify(self, password: str, hashed: str) -> bool:
+        log_n, r, p, salt, key = self._params(hashed)
+        return hmac.compare_digest(self._derive(password, salt, log_n, r, p), key)
+
+    def needs_rehash(self, hashed: str) -> bool:
+        return self._params(hashed)[:3] != (self.log_n, self.r, self.p)
+
+
+class Argon2Hasher:
+    """✅ Argon2id through `argon2-cffi`, only when that package is installed"""
+    name = "argon2"
+
+    def __init__(self, time_cost=ARGON2_TIME_COST, memory_kib=ARGON2_MEMORY_KIB, parallelism=ARGON2_PARALLELISM):
+        from argon2 import PasswordHasher  # ImportError when not installed
+
+        self._hasher = PasswordHasher(time_cost=time_cost, memory_cost=memory_kib, parallelism=parallelism)
+
+    def identifies(self, hashed: str) -> bool:
+        return hashed.startswith("$argon2")
+
+    def hash(self, password: str) -> str:
+        return self._hasher.hash(password)
+
+    def verify(self, password: str, hashed: str) -> bool:
+        from argon2.exceptions import VerificationError, InvalidHashError
+
+        try:
+            return self._hasher.verify(hashed, password)
+        except (VerificationError, InvalidHashError):
+            return False
+
+    def needs_rehash(self, hashed: str) -> bool:
+        return self._hasher.check_needs_rehash(hashed)
+
+
+HASHERS = {"bcrypt": BcryptHasher, "scrypt": ScryptHasher, "argon2": Argon2Hasher}
+
+_policy = None
+
+def current_hasher():
+    """✅ The hasher new passwords are stored with (KDF_ALGORITHM)"""
+    global _policy
+    if _policy is None:
+        try:
+            _policy = HASHERS[KDF_ALGORITHM]()
+        except ImportError:
+            LOGGER.warning(f"⚠️ {KDF_ALGORITHM} is not installed, hashing new passwords with scrypt.")
+            _policy = ScryptHasher()
+    return _policy
+
+def _hasher_for(hashed: str):
+    policy = current_hasher()
+    if policy.identifies(hashed):
+        return policy
+    for name, hasher in HASHERS.items():
+        if name != policy.name:
+            try:
+                hasher = hasher()
+            except ImportError:
+                continue
+            if hasher.identifies(hashed):
+                return hasher
+    raise ValueError("Unknown password hash format")
+
+
+### 🔹 Hash & Verify Password (blocking, ~100-300 ms of CPU each)
+def hash_password(password):
+    """✅ Hashes a password before storing"""
+    return current_hasher().hash(password)
+
+def check_password(password, hashed_password):
+    """✅ Checks a plain password against a stored hashed password"""
+    return _hasher_for(hashed_password).verify(password, hashed_password)
+
+def needs_rehash(hashed_password) -> bool:
+    """✅ True when a stored hash is not in the current algorithm / cost"""
+    policy = current_hasher()
+    return not policy.identifies(hashed_password) or policy.needs_rehash(hashed_password)
+
+
+### 🔹 Worker Pool so the KDF never runs on the event loop
+class KdfBusy(Exception):
+    """✅ No KDF slot came free within KDF_WAIT_TIMEOUT"""
+
+_executor = None
+_slots = None
+_pending = 0  # calls running or waiting for a slot
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        if KDF_EXECUTOR == "process":
+            _executor = ProcessPoolExecutor(max_workers=KDF_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=KDF_WORKERS, thread_name_prefix="kdf")
+    return _executor
+
+def _get_slots():
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(KDF_MAX_PENDING)
+    return _slots
+
+def kdf_queue_depth() -> int:
+    """✅ Number of KDF calls running or waiting for a worker"""
+    return _pending
+
+async def _run_kdf(func, *args):
+    # At most KDF_MAX_PENDING calls may be queued on the pool; further callers
+    # wait here, so a login storm slows logins down instead of growing the queue.
+    # Past KDF_WAIT_TIMEOUT they get KdfBusy instead of waiting on.
+    global _pending
+    started = time.perf_counter()
+    _pending += 1
+    try:
+        slots = _get_slots()
+        try:
+            await asyncio.wait_for(slots.acquire(), KDF_WAIT_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise KdfBusy(f"no KDF slot free within {KDF_WAIT_TIMEOUT}s") from None
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(_get_executor(), func, *args)
+        finally:
+            slots.release()
+    finally:
+        _pending -= 1
+        add_kdf_time(time.perf_counter() - started)
+
+async def hash_password_async(password):
+    """✅ Hashes a password on the KDF worker pool"""
+    return await _run_kdf(hash_password, password)
+
+async def verify_password_async(password, hashed_password):
+    """✅ Verifies a password on the KDF worker pool"""
+    return await _run_kdf(check_password, password, hashed_password)
+
+def shutdown_kdf_pool():
+    """✅ Stop the KDF workers (called from `Diary.stop`)"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
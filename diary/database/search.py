@@ -0,0 +1,89 @@
+import re
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from .. import db
+from config import PAGES_PER_SCREEN, SEARCH_MAX_TERMS, SEARCH_TTL
+
+# ✅ Diary pages (see `pages.py`)
+pages_db = db.pages
+# ✅ Saved search queries, referenced from the "More results" button
+searches_db = db.searches
+
+WORD_RE = re.compile(r"\w{2,}")
+MAX_QUERY_TERMS = 10
+
+### 🔹 Inverted Index Terms (stored in `terms` on every page write)
+def tokenize(text: str) -> list:
+    """✅ Unique lowercase words of a text, capped at SEARCH_MAX_TERMS"""
+    terms = []
+    seen = set()
+    for word in WORD_RE.findall(text.lower()):
+        if word not in seen:
+            seen.add(word)
+            terms.append(word)
+            if len(terms) >= SEARCH_MAX_TERMS:
+                break
+    return terms
+
+
+### 🔹 Saved Searches
+async def save_search(owner: str, query: str, since=None, until=None) -> dict:
+    """✅ Store the parsed query so result pages only carry its id"""
+    search = {
+        "_id": ObjectId(),
+        "owner": owner,
+        "terms": tokenize(query)[:MAX_QUERY_TERMS],
+        "since": since,
+        "until": until,
+        "expires_at": datetime.utcnow() + timedelta(seconds=SEARCH_TTL),
+    }
+    await searches_db.insert_one(search)
+    return search
+
+async def get_search(search_id: str):
+    return await searches_db.find_one({"_id": ObjectId(search_id)})
+
+
+### 🔹 Result Cursors: 1 byte score + ObjectId, as hex
+def encode_search_cursor(page: dict) -> str:
+    return (bytes([page["score"]]) + page["_id"].binary).hex()
+
+def decode_search_cursor(cursor: str):
+    raw = bytes.fromhex(cursor)
+    return raw[0], ObjectId(raw[1:])
+
+
+### 🔹 Ranked Search
+async def search_pages(search: dict, cursor: str = None, limit: int = PAGES_PER_SCREEN):
+    """✅ Pages matching any term, most matched terms first, then newest first.
+
+    Returns `(pages, has_more)`, each page carrying its `score`.
+    """
+    match = {"owner": search["owner"], "terms": {"$in": search["terms"]}}
+    if search.get("since") or search.get("until"):
+        match["created_at"] = {}
+        if search.get("since"):
+            match["created_at"]["$gte"] = search["since"]
+        if search.get("until"):
+            match["created_at"]["$lt"] = search["until"]
+
+    pipeline = [
+        {"$match": match},
+        {"$addFields": {"score": {"$size": {"$setIntersection": ["$terms", search["terms"]]}}}},
+    ]
+    if cursor:
+        score, page_id = decode_search_cursor(cursor)
+        pipeline.append({"$match": {"$or": [
+            {"score": {"$lt": score}},
+            {"score": score, "_id": {"$lt": page_id}},
+        ]}})
+    pipeline += [
+        {"$sort": {"score": -1, "_id": -1}},
+        {"$limit": limit + 1},
+        {"$project": {"terms": 0}},
+    ]
+
+    pages = await pages_db.aggregate(pipeline).to_list(length=limit + 1)
+    return pages[:limit], len(pages) > limit
@@ -0,0 +1,173 @@
+import asyncio
+import heapq
+import logging
+import time
+from collections import defaultdict
+
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+from pyrogram.errors import FloodWait
+
+LOGGER = logging.getLogger(__name__)
+
+# Telegram accepts up to 100 ids per `delete_messages` call
+BATCH_SIZE = 100
+
+
+class MessageDeleter:
+    """✅ One task and one heap for every scheduled message deletion.
+
+    Deletions that are due together are sent as one `delete_messages` call per
+    chat. Delayed deletions are saved in Mongo by the worker, one `bulk_write`
+    per wakeup, so a restart does not forget them; the others are saved by
+    `stop()`. `schedule()` itself never waits for Mongo.
+    """
+
+    def __init__(self, client, collection):
+        self.client = client
+        self.collection = collection
+        self.stats = {"scheduled": 0, "deleted": 0, "failed": 0, "batches": 0}
+        self._heap = []  # (due, chat_id, message_id)
+        self._jobs = {}  # (chat_id, message_id) -> (due, owner, persisted)
+        self._unsaved = set()  # delayed jobs the worker has yet to save
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._jobs)
+
+    @staticmethod
+    def _doc(chat_id, message_id, due, owner):
+        return {"chat_id": chat_id, "message_id": message_id, "due": due, "owner": owner}
+
+    def _push(self, chat_id, message_id, due, owner, persisted):
+        self._jobs[(chat_id, message_id)] = (due, owner, persisted)
+        heapq.heappush(self._heap, (due, chat_id, message_id))
+        self._wakeup.set()
+
+    async def schedule(self, message, delay=0, owner=None):
+        """✅ Delete `message` after `delay` seconds; `owner` groups jobs of one user flow"""
+        if delay > 0:
+            self._unsaved.add((message.chat.id, message.id))
+        self._push(message.chat.id, message.id, time.time() + delay, owner, False)
+        self.stats["scheduled"] += 1
+
+    def flush(self, owner):
+        """✅ A flow finished: stop waiting and delete its messages right away"""
+        now = time.time()
+        for key, (due, job_owner, persisted) in list(self._jobs.items()):
+            if job_owner == owner and due > now:
+                self._push(*key, now, owner, persisted)
+
+    ### 🔹 Worker
+    async def _save_new(self):
+        """✅ Save the delayed jobs scheduled since the last wakeup in one round trip"""
+        now = time.time()
+        # Jobs due already are deleted right after this, saving them is wasted
+        keys = [key for key in self._unsaved if key in self._jobs and self._jobs[key][0] > now]
+        self._unsaved.clear()
+        if not keys:
+            return
+        writes = []
+        for chat_id, message_id in keys:
+            due, owner, _ = self._jobs[(chat_id, message_id)]
+            writes.append(UpdateOne({"_id": f"{chat_id}:{message_id}"}, {"$set": self._doc(chat_id, message_id, due, owner)}, upsert=True))
+        try:
+            await self.collection.bulk_write(writes, ordered=False)
+        except PyMongoError as e:
+            # Still unsaved, so `stop()` tries again; only a crash would lose them
+            LOGGER.error(f"⚠️ Could not save {len(keys)} delayed deletions: {e}")
+            return
+        for key in keys:
+            if key in self._jobs:
+                due, owner, _ = self._jobs[key]
+                self._jobs[key] = (due, owner, True)
+
+    def _pop_due(self):
+        now = time.time()
+        due_jobs = defaultdict(list)
+        while self._heap and self._heap[0][0] <= now:
+            due, chat_id, message_id = heapq.heappop(self._heap)
+            job = self._jobs.get((chat_id, message_id))
+            # Skip heap entries of jobs done already or superseded by a newer due time
+            if job is None or job[0] != due:
+                continue
+            del self._jobs[(chat_id, message_id)]
+            due_jobs[chat_id].append((message_id, job[2]))
+        return due_jobs
+
+    async def _delete_batch(self, chat_id, jobs):
+        ids = [message_id for message_id, _ in jobs]
+        try:
+            await self.client.delete_messages(chat_id, ids)
+            self.stats["deleted"] += len(ids)
+        except FloodWait as e:
+            retry_at = time.time() + e.value
+            for message_id, persisted in jobs:
+                self._push(chat_id, message_id, retry_at, None, persisted)
+            return
+        except Exception as e:
+            LOGGER.error(f"⚠️ Could not delete messages in {chat_id}: {e}")
+            self.stats["failed"] += len(ids)
+        self.stats["batches"] += 1
+
+        persisted = [f"{chat_id}:{message_id}" for message_id, saved in jobs if saved]
+        if persisted:
+            try:
+                await self.collection.delete_many({"_id": {"$in": persisted}})
+            except PyMongoError as e:
+                # The rows are reloaded on the next start and deleted again, which is harmless
+                LOGGER.error(f"⚠️ Could not clear saved deletions in {chat_id}: {e}")
+
+    async def _run(self):
+        while True:
+            # Cleared before saving, so jobs scheduled while saving wake the wait below
+            self._wakeup.clear()
+            try:
+                await self._save_new()
+            except Exception:
+                LOGGER.exception("⚠️ Saving delayed deletions failed")
+
+            timeout = self._heap[0][0] - time.time() if self._heap else None
+            if timeout is None or timeout > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+            for chat_id, jobs in self._pop_due().items():
+                # One chat's failure must not stop the worker, nothing else would restart it
+                try:
+                    for i in range(0, len(jobs), BATCH_SIZE):
+                        await self._delete_batch(chat_id, jobs[i:i + BATCH_SIZE])
+                except Exception:
+                    LOGGER.exception(f"⚠️ Deleting messages in {chat_id} failed")
+
+    async def start(self):
+        """✅ Reload deletions that were pending when the bot stopped, then run"""
+        async for job in self.collection.find({}):
+            self._push(job["chat_id"], job["message_id"], job["due"], job.get("owner"), True)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """✅ Stop the worker and save the jobs not saved yet, so the next start runs them"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        unsaved = [
+            UpdateOne({"_id": f"{chat_id}:{message_id}"}, {"$set": self._doc(chat_id, message_id, due, owner)}, upsert=True)
+            for (chat_id, message_id), (due, owner, persisted) in self._jobs.items()
+            if not persisted
+        ]
+        if unsaved:
+            try:
+                await self.collection.bulk_write(unsaved, ordered=False)
+            except PyMongoError as e:
+                LOGGER.error(f"⚠️ Could not save {len(unsaved)} pending deletions: {e}")
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from functools import wraps
+
+from pyrogram.types import CallbackQuery
+
+from diary.metrics import Counter, Gauge, Histogram
+from config import USER_QUEUE_SIZE
+
+LOGGER = logging.getLogger(__name__)
+
+QUEUE_WAIT_SECONDS = Histogram("diary_user_queue_wait_seconds", "Time an update waited behind the same user's earlier updates")
+QUEUE_REJECTED = Counter("diary_user_queue_rejected_total", "Updates not queued, by reason")
+
+
+class UserDispatcher:
+    """✅ Runs each user's updates one at a time, in arrival order.
+
+    Different users still run concurrently. Each user gets a bounded queue and
+    a task that exists only while the queue is not empty.
+    """
+
+    def __init__(self, max_pending=USER_QUEUE_SIZE):
+        self.max_pending = max_pending
+        self._queues = {}  # user_id -> deque of (key, job, queued_at)
+        self._keys = {}  # user_id -> keys of queued or running jobs
+        self._idle = {}  # user_id -> Event set when the user's queue runs dry
+        self._tasks = set()  # running drain tasks, referenced until they finish
+        Gauge("diary_user_queues", "Users with updates queued or running", lambda: len(self._queues))
+
+    def submit(self, user_id, job, key=None) -> str:
+        """✅ Queue `job()` behind the user's earlier updates.
+
+        Returns "queued", or "duplicate" when a job with the same `key` is
+        still waiting or running, or "full" when the user's queue is full.
+        """
+        keys = self._keys.setdefault(user_id, set())
+        if key is not None and key in keys:
+            QUEUE_REJECTED.inc(reason="duplicate")
+            return "duplicate"
+
+        pending = self._queues.get(user_id)
+        if pending is not None and len(pending) >= self.max_pending:
+            QUEUE_REJECTED.inc(reason="full")
+            return "full"
+
+        if key is not None:
+            keys.add(key)
+        if pending is None:
+            pending = self._queues[user_id] = deque()
+            pending.append((key, job, time.perf_counter()))
+            task = asyncio.create_task(self._drain(user_id, pending))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            pending.append((key, job, time.perf_counter()))
+        return "queued"
+
+    async def join(self, user_id):
+        """✅ Wait until every update queued so far for `user_id` has been handled"""
+        while user_id in self._queues:
+            await self._idle.setdefault(user_id, asyncio.Event()).wait()
+
+    async def join_all(self):
+        """✅ Wait until every user's queue is empty, including jobs queued meanwhile"""
+        while self._tasks:
+            await asyncio.gather(*self._tasks)
+
+    async def _drain(self, user_id, pending):
+        keys = self._keys[user_id]
+        try:
+            while pending:
+                key, job, queued_at = pending.popleft()
+                QUEUE_WAIT_SECONDS.observe(time.perf_counter() - queued_at)
+                try:
+                    await job()
+                except Exception as e:
+                    LOGGER.exception(e)
+                finally:
+                    keys.discard(key)
+        finally:
+            # Also when cancelled, so the user's next update starts a new queue
+            del self._queues[user_id]
+            del self._keys[user_id]
+            idle = self._idle.pop(user_id, None)
+            if idle is not None:
+                idle.set()
+
+
+def serialized(dispatcher, func):
+    """✅ Handler wrapper that hands the update to `dispatcher` and returns at once"""
+
+    @wraps(func)
+    async def wrapper(client, update, *args, **kwargs):
+        user = getattr(update, "from_user", None)
+        if user is None:
+            return await func(client, update, *args, **kwargs)
+
+        key = None
+        if isinstance(update, CallbackQuery):
+            # Double taps on the same button of the same message collapse into one
+            key = (update.data, update.message.id if update.message else None)
+
+        result = dispatcher.submit(user.id, lambda: func(client, update, *args, **kwargs), key)
+        if result == "queued":
+            return
+        if isinstance(update, CallbackQuery):
+            await update.answer("⏳ Please wait..." if result == "full" else None)
+        else:
+            from diary.sender import reply_text
+
+            LOGGER.warning(f"Queue of user {user.id} is full, dropping a message.")
+            await reply_text(update, "⏳ Please wait, I'm still working on your earlier messages.")
+
+    return wrapper
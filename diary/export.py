@@ -0,0 +1,90 @@
+import asyncio
+import json
+import os
+import tempfile
+import zlib
+
+import aiofiles
+import aiofiles.os
+
+from diary import db
+from diary.database.pages import iter_pages, page_text
+from config import EXPORT_CONCURRENCY
+
+# ✅ Last export of each (user, format), reused until `total_pages` changes
+exports_db = db.exports
+
+# Exports being built at once, across all users
+export_slots = asyncio.Semaphore(EXPORT_CONCURRENCY)
+
+# Uncompressed bytes collected before each compress + write
+WRITE_CHUNK = 64 * 1024
+
+### 🔹 Serializers, one page at a time
+def _jsonl(page: dict) -> str:
+    return json.dumps(
+        {"created_at": page["created_at"].isoformat() + "Z", "text": page_text(page)},
+        ensure_ascii=False,
+    ) + "\n"
+
+def _markdown(page: dict) -> str:
+    return f"## {page['created_at'].strftime('%d-%m-%Y %I:%M %p')}\n\n{page_text(page)}\n\n"
+
+SERIALIZERS = {"jsonl": _jsonl, "md": _markdown}
+
+
+### 🔹 Build the Archive
+async def write_export(owner: str, fmt: str):
+    """✅ Stream `owner`'s pages into a gzip file, returns `(path, pages)`.
+
+    Pages come from the cursor one batch at a time and are compressed as they
+    are written, so memory stays flat however long the diary is. The caller
+    removes the file.
+    """
+    serialize = SERIALIZERS[fmt]
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    fd, path = tempfile.mkstemp(prefix="diary-export-", suffix=f".{fmt}.gz")
+    os.close(fd)
+
+    pages = 0
+    buffer = []
+    size = 0
+    try:
+        async with aiofiles.open(path, "wb") as f:
+            if fmt == "md":
+                buffer.append(f"# {owner}'s diary\n\n")
+            async for page in iter_pages(owner):
+                text = serialize(page)
+                buffer.append(text)
+                size += len(text)
+                pages += 1
+                if size >= WRITE_CHUNK:
+                    await f.write(compressor.compress("".join(buffer).encode()))
+                    buffer, size = [], 0
+            await f.write(compressor.compress("".join(buffer).encode()) + compressor.flush())
+    except BaseException:
+        await remove_export(path)
+        raise
+    return path, pages
+
+async def remove_export(path: str):
+    try:
+        await aiofiles.os.remove(path)
+    except OSError:
+        pass
+
+
+### 🔹 Cached file_id of the Last Export
+async def cached_export(owner: str, fmt: str, total_pages: int):
+    """✅ file_id of the last export if the diary has not changed since"""
+    doc = await exports_db.find_one({"_id": f"{owner}:{fmt}"})
+    if doc and doc["total_pages"] == total_pages:
+        return doc["file_id"]
+    return None
+
+async def remember_export(owner: str, fmt: str, total_pages: int, file_id: str):
+    await exports_db.update_one(
+        {"_id": f"{owner}:{fmt}"},
+        {"$set": {"total_pages": total_pages, "file_id": file_id}},
+        upsert=True,
+    )
@@ -25,3 +25,27 @@ LOGIN_TEXTS = {
     "username": "🔑 Please enter your **username**:",
     "password": "🔑 Now enter your **password**:",
 }
+
+PAGES_TEXTS = {
+    "add": "📝 Send me the **text** of your new diary page:",
+    "saved": "✅ Page saved! Your diary now has **{0}** pages.",
+    "empty": "📭 Your diary is empty. Use /addpage to write your first page.",
+    "header": "📖 **My Diary**\n\n",
+    "entry": "🗓 **{0}**\n{1}\n\n",
+    "not_registered": "❗ Please **register** or **login** first using /start.",
+}
+
+SEARCH_TEXTS = {
+    "usage": "🔍 Usage: `/search words [from:dd-mm-yyyy] [to:dd-mm-yyyy]`",
+    "bad_date": "❗ Dates must look like **dd-mm-yyyy**.",
+    "no_results": "📭 No pages found for **{0}**.",
+    "header": "🔍 **Results for {0}**\n\n",
+}
+
+EXPORT_TEXTS = {
+    "usage": "📦 Usage: `/export` for JSON Lines or `/export md` for Markdown",
+    "empty": "📭 Your diary is empty, nothing to export.",
+    "preparing": "⏳ Preparing your export...",
+    "caption": "📦 Your diary, **{0}** pages.",
+    "failed": "❌ Export failed, please try again later.",
+}
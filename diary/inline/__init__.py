@@ -1,21 +1,36 @@
 from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from diary.callbacks import encode
 
 # Login / register buttons
 AUTH_BUTTONS = InlineKeyboardMarkup([
-    [InlineKeyboardButton("📝 Register", callback_data="register")],
-    [InlineKeyboardButton("🔑 Login", callback_data="login")]
+    [InlineKeyboardButton("📝 Register", callback_data=encode("register"))],
+    [InlineKeyboardButton("🔑 Login", callback_data=encode("login"))]
 ])
 
 # Start buttons
 START_KEYBOARD = InlineKeyboardMarkup([
-    [InlineKeyboardButton("📝 Add pages", callback_data="add_pages")],
+    [InlineKeyboardButton("📝 Add pages", callback_data=encode("add_pages"))],
     [
-        InlineKeyboardButton("📖 My Diary", callback_data="my_diary"),
+        InlineKeyboardButton("📖 My Diary", callback_data=encode("my_diary")),
         InlineKeyboardButton("owner", user_id=7234206438)
     ],
 ])
 
 CONFIRM_CANCEL_BUTTONS = InlineKeyboardMarkup([
-    [InlineKeyboardButton("confirm", callback_data="confirm")],
-    [InlineKeyboardButton("cancel", callback_data="cancel")]
-])
\ No newline at end of file
+    [InlineKeyboardButton("confirm", callback_data=encode("confirm"))],
+    [InlineKeyboardButton("cancel", callback_data=encode("cancel"))]
+])
+# Diary page navigation, cursors come from `diary.database.pages.encode_cursor`
+def pages_keyboard(newer_cursor=None, older_cursor=None):
+    row = []
+    if newer_cursor:
+        row.append(InlineKeyboardButton("⬅️ Newer", callback_data=encode("newer", newer_cursor)))
+    if older_cursor:
+        row.append(InlineKeyboardButton("Older ➡️", callback_data=encode("older", older_cursor)))
+    return InlineKeyboardMarkup([row]) if row else None
+
+# More search results, `search_id` points at a saved search in `searches_db`
+def search_keyboard(search_id, cursor):
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton("More results ➡️", callback_data=encode("more", f"{search_id}:{cursor}"))]
+    ])
@@ -1,14 +1,73 @@
-from flask import Flask
-from threading import Thread
+import asyncio
 
-app = Flask(__name__)
+import aiohttp
+from aiohttp import web
 
-@app.route('/')
-def home():
-    return "✅ Bot is running!"
+from diary import DiaryBot, mongo_client, LOGGER
+from diary import metrics
+from diary.database import user_cache
+from diary.database.password import kdf_queue_depth
+from config import PORT
 
-def run():
-    app.run(host="0.0.0.0", port=8080)
+# ✅ Gauges read at scrape time
+metrics.Gauge("diary_sessions", "Conversation sessions in the store", lambda: DiaryBot.sessions.size())
+metrics.StatsCounter("diary_session_events_total", "Session lookups (hits / misses), expiries and LRU evictions (memory store; mongo: expiries seen on read only), by event", "event", lambda: DiaryBot.sessions.stats)
+metrics.Gauge("diary_pending_deletions", "Messages waiting to be deleted", lambda: DiaryBot.deleter.queue_depth)
+metrics.Gauge("diary_pending_user_writes", "Users from /start waiting to be written", lambda: len(DiaryBot.pending_users))
+metrics.Gauge("diary_kdf_queue_depth", "Password hashes running or waiting", kdf_queue_depth)
+metrics.Gauge("diary_user_cache_entries", "User and login documents in the cache", lambda: len(user_cache))
+metrics.StatsCounter("diary_user_cache_events_total", "User / login cache lookups and invalidations, by event", "event", lambda: user_cache.stats)
 
-def keep_alive():
-    Thread(target=run).start()
+async def home(request):
+    return web.Response(text="✅ Bot is running!")
+
+async def mongo_ok() -> bool:
+    try:
+        await asyncio.wait_for(mongo_client.admin.command("ping"), timeout=2)
+        return True
+    except Exception:
+        return False
+
+async def healthz(request):
+    """✅ 200 only when both Telegram and Mongo are reachable"""
+    status = {
+        "telegram": bool(DiaryBot.is_connected),
+        "mongo": await mongo_ok(),
+    }
+    return web.json_response(status, status=200 if all(status.values()) else 503)
+
+async def shard_page(session, port):
+    try:
+        async with session.get(f"http://127.0.0.1:{port}/metrics") as response:
+            return await response.text()
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        LOGGER.error(f"⚠️ Could not scrape shard metrics on :{port}: {e}")
+        return None
+
+async def metrics_page(request):
+    text = await metrics.render()
+    shard_ports = request.app["shard_ports"]
+    if shard_ports:
+        # ✅ Sharded: the workers' metrics too, labelled by shard
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=2)) as session:
+            pages = await asyncio.gather(*(shard_page(session, port) for port in shard_ports))
+        shards = {index: page for index, page in enumerate(pages) if page is not None}
+        text = metrics.merge({None: text, **shards}, "shard")
+    return web.Response(text=text, content_type="text/plain", charset="utf-8")
+
+async def keep_alive(port=PORT, host="0.0.0.0", shard_ports=()):
+    """✅ Health & metrics server on the bot's own event loop.
+
+    `shard_ports` are the workers' metrics servers, merged into /metrics.
+    """
+    app = web.Application()
+    app["shard_ports"] = list(shard_ports)
+    app.router.add_get("/", home)
+    app.router.add_get("/healthz", healthz)
+    app.router.add_get("/metrics", metrics_page)
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    LOGGER.info(f"Health server listening on {host}:{port}")
+    return runner
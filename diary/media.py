@@ -0,0 +1,114 @@
+import asyncio
+import json
+import os
+import time
+
+import aiofiles
+from pyrogram.errors import FileIdInvalid, FileReferenceExpired, FileReferenceInvalid, MediaEmpty
+from pyrogram.file_id import FileId
+
+from diary import db, LOGGER
+from diary.metrics import Histogram
+from diary.sender import send
+from config import START_IMG, AUTH_IMG, STEP_IMAGES, MEDIA_CACHE_FILE
+
+# ✅ Every image the bot sends, by name
+MEDIA = {"start": START_IMG, "auth": AUTH_IMG, **STEP_IMAGES}
+
+# ✅ Telegram file_id for each image URL (persisted in Mongo + a local file)
+media_db = db.media
+_file_ids = {}
+_upload_locks = {}  # URL -> lock held by the send uploading it
+
+# Send latency by source, to compare URL sends with file_id sends
+SEND_SECONDS = Histogram("diary_image_send_seconds", "Image send latency, by source (url or file_id)")
+
+STALE_FILE_ID_ERRORS = (FileIdInvalid, FileReferenceExpired, FileReferenceInvalid, MediaEmpty)
+
+### 🔹 Load & Save Resolved file_ids
+def _decodes(file_id) -> bool:
+    try:
+        FileId.decode(file_id)
+        return True
+    except Exception:
+        return False
+
+def _restore(url, file_id):
+    # A corrupt cache entry is dropped here, so sends never have to guess at a failure's cause
+    if _decodes(file_id):
+        _file_ids[url] = file_id
+    else:
+        LOGGER.error(f"⚠️ Ignoring a cached file_id that does not decode for {url}")
+
+async def load_media():
+    """✅ Restore known file_ids at startup, Mongo wins over the local file"""
+    if os.path.exists(MEDIA_CACHE_FILE):
+        try:
+            async with aiofiles.open(MEDIA_CACHE_FILE) as f:
+                for url, file_id in json.loads(await f.read()).items():
+                    _restore(url, file_id)
+        except (OSError, ValueError) as e:
+            LOGGER.error(f"⚠️ Could not read {MEDIA_CACHE_FILE}: {e}")
+
+    async for doc in media_db.find({"_id": {"$in": list(set(MEDIA.values()))}}):
+        _restore(doc["_id"], doc["file_id"])
+
+async def _save_local():
+    try:
+        async with aiofiles.open(MEDIA_CACHE_FILE, "w") as f:
+            await f.write(json.dumps(_file_ids))
+    except OSError as e:
+        LOGGER.error(f"⚠️ Could not write {MEDIA_CACHE_FILE}: {e}")
+
+async def _remember(url, file_id):
+    _file_ids[url] = file_id
+    await media_db.update_one({"_id": url}, {"$set": {"file_id": file_id}}, upsert=True)
+    await _save_local()
+
+async def _forget(url):
+    _file_ids.pop(url, None)
+    await media_db.delete_one({"_id": url})
+    await _save_local()
+
+
+### 🔹 Send an Image by Name
+def _record(source, started):
+    SEND_SECONDS.observe(time.perf_counter() - started, source=source)
+
+async def _send_file_id(message, file_id, **kwargs):
+    started = time.perf_counter()
+    sent = await send(message.chat.id, lambda: message.reply_photo(photo=file_id, **kwargs))
+    _record("file_id", started)
+    return sent
+
+async def _upload_once(message, url, **kwargs):
+    """✅ Send `url` itself unless a concurrent send uploaded it meanwhile.
+
+    Returns `(sent, None)` after an upload, or `(None, file_id)` to send instead.
+    """
+    async with _upload_locks.setdefault(url, asyncio.Lock()):
+        file_id = _file_ids.get(url)
+        if file_id:
+            return None, file_id
+        started = time.perf_counter()
+        sent = await send(message.chat.id, lambda: message.reply_photo(photo=url, **kwargs))
+        _record("url", started)
+        if sent and sent.photo:
+            await _remember(url, sent.photo.file_id)
+        return sent, None
+
+async def reply_photo(message, key, **kwargs):
+    """✅ `message.reply_photo` for a named image, reusing its Telegram file_id (rate limited)"""
+    url = MEDIA[key]
+    file_id = _file_ids.get(url)
+
+    if file_id:
+        try:
+            return await _send_file_id(message, file_id, **kwargs)
+        except STALE_FILE_ID_ERRORS:
+            LOGGER.info(f"file_id for {key} is no longer valid, uploading it again.")
+            if _file_ids.get(url) == file_id:  # not replaced by another send yet
+                await _forget(url)
+
+    sent, file_id = await _upload_once(message, url, **kwargs)
+    return sent if file_id is None else await _send_file_id(message, file_id, **kwargs)
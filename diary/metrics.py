@@ -0,0 +1,299 @@
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+
+from pymongo import monitoring
+
+# ✅ Every metric, in the order /metrics renders them
+REGISTRY = []
+
+# pymongo listeners update metrics from Motor's executor threads while /metrics renders on the loop
+_lock = threading.Lock()
+
+def _labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class Counter:
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.values = {}
+        REGISTRY.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    async def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with _lock:
+            values = list(self.values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{_labels(labels)} {value}")
+        return lines
+
+
+class Gauge:
+    """✅ Value read from `callback` (sync or async) at scrape time"""
+
+    def __init__(self, name, help, callback):
+        self.name = name
+        self.help = help
+        self.callback = callback
+        REGISTRY.append(self)
+
+    async def render(self):
+        value = self.callback()
+        if inspect.isawaitable(value):
+            value = await value
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {value}"]
+
+
+class StatsCounter:
+    """✅ Counters an object keeps in a plain dict (e.g. `cache.stats`), one series per key, read at scrape time"""
+
+    def __init__(self, name, help, label, callback):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.callback = callback
+        REGISTRY.append(self)
+
+    async def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in list(self.callback().items()):
+            lines.append(f"{self.name}{_labels(((self.label, key),))} {value}")
+        return lines
+
+
+class Histogram:
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, name, help, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.values = {}  # labels -> [bucket counts..., sum, count]
+        REGISTRY.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        bucket = bisect_left(self.buckets, value)
+        with _lock:
+            series = self.values.get(key)
+            if series is None:
+                series = self.values[key] = [0] * (len(self.buckets) + 2)
+            if bucket < len(self.buckets):  # larger values only show up in +Inf
+                series[bucket] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    async def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with _lock:
+            values = [(labels, list(series)) for labels, series in self.values.items()]
+        for labels, series in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(labels + (('le', '+Inf'),))} {series[-1]}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {series[-2]}")
+            lines.append(f"{self.name}_count{_labels(labels)} {series[-1]}")
+        return lines
+
+
+async def render() -> str:
+    """✅ All metrics in Prometheus text format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(await metric.render())
+    return "\n".join(lines) + "\n"
+
+def _add_label(sample, key, value):
+    name, brace, rest = sample.partition("{")
+    if brace:
+        return f'{name}{{{key}="{value}",{rest}'
+    name, _, rest = sample.partition(" ")
+    return f'{name}{{{key}="{value}"}} {rest}'
+
+def merge(pages: dict, label: str) -> str:
+    """✅ Pages from `render()` in several processes as one page.
+
+    `pages` maps a value of `label` (e.g. the shard index) to a page; samples of
+    the page under `None` stay unlabelled. Each metric keeps one HELP / TYPE header.
+    """
+    families = {}  # name -> (header lines, sample lines), in first-seen order
+    for value, page in pages.items():
+        family = None
+        for line in page.splitlines():
+            if line.startswith("# "):
+                family = families.setdefault(line.split(" ", 3)[2], ([], []))
+                if line not in family[0]:
+                    family[0].append(line)
+            elif line and family is not None:
+                family[1].append(line if value is None else _add_label(line, label, value))
+    lines = []
+    for headers, samples in families.values():
+        lines.extend(headers)
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+### 🔹 Per-Update Breakdown
+class UpdateStats:
+    """✅ Time spent in Mongo, the KDF pool and Telegram while handling one update"""
+    __slots__ = ("db_seconds", "db_calls", "kdf_seconds", "tg_seconds", "tg_requests")
+
+    def __init__(self):
+        self.db_seconds = 0.0
+        self.db_calls = 0
+        self.kdf_seconds = 0.0
+        self.tg_seconds = 0.0
+        self.tg_requests = 0
+
+# Motor runs pymongo with a copy of the caller's context, so listeners see this too
+current_update = ContextVar("current_update", default=None)
+
+def add_kdf_time(seconds):
+    stats = current_update.get()
+    if stats is not None:
+        stats.kdf_seconds += seconds
+
+def add_telegram_request(seconds):
+    stats = current_update.get()
+    if stats is not None:
+        stats.tg_requests += 1
+        stats.tg_seconds += seconds
+
+
+### 🔹 Handler Metrics
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21)
+
+UPDATES = Counter("diary_updates_total", "Updates handled, by handler")
+HANDLER_ERRORS = Counter("diary_handler_errors_total", "Handlers that raised, by handler")
+HANDLER_SECONDS = Histogram("diary_handler_seconds", "Handler wall time, by handler")
+HANDLER_DB_SECONDS = Histogram("diary_handler_db_seconds", "Time in Mongo commands per update, by handler")
+HANDLER_DB_CALLS = Histogram("diary_handler_db_calls", "Mongo commands per update, by handler", COUNT_BUCKETS)
+HANDLER_KDF_SECONDS = Histogram("diary_handler_kdf_seconds", "Time in password hashing per update, by handler")
+HANDLER_TG_SECONDS = Histogram("diary_handler_telegram_seconds", "Time in Telegram API calls per update, by handler")
+HANDLER_TG_REQUESTS = Histogram("diary_handler_telegram_requests", "Telegram API calls per update, by handler", COUNT_BUCKETS)
+
+def instrument(func):
+    """✅ Count and time a Pyrogram handler, with its DB / KDF / Telegram breakdown"""
+    name = func.__name__
+
+    @wraps(func)
+    async def wrapper(client, update, *args, **kwargs):
+        UPDATES.inc(handler=name)
+        stats = UpdateStats()
+        token = current_update.set(stats)
+        started = time.perf_counter()
+        try:
+            return await func(client, update, *args, **kwargs)
+        except Exception:
+            HANDLER_ERRORS.inc(handler=name)
+            raise
+        finally:
+            HANDLER_SECONDS.observe(time.perf_counter() - started, handler=name)
+            HANDLER_DB_SECONDS.observe(stats.db_seconds, handler=name)
+            HANDLER_DB_CALLS.observe(stats.db_calls, handler=name)
+            HANDLER_KDF_SECONDS.observe(stats.kdf_seconds, handler=name)
+            HANDLER_TG_SECONDS.observe(stats.tg_seconds, handler=name)
+            HANDLER_TG_REQUESTS.observe(stats.tg_requests, handler=name)
+            current_update.reset(token)
+
+    return wrapper
+
+
+### 🔹 Mongo Command Metrics
+DB_COMMANDS = Counter("diary_db_commands_total", "Mongo commands sent, by command and outcome")
+
+class CommandCounter(monitoring.CommandListener):
+    """✅ pymongo listener counting every command the Motor client sends"""
+
+    def started(self, event):
+        pass
+
+    def _record(self, event):
+        stats = current_update.get()
+        if stats is not None:
+            stats.db_calls += 1
+            stats.db_seconds += event.duration_micros / 1e6
+
+    def succeeded(self, event):
+        DB_COMMANDS.inc(command=event.command_name, outcome="ok")
+        self._record(event)
+
+    def failed(self, event):
+        DB_COMMANDS.inc(command=event.command_name, outcome="error")
+        self._record(event)
+
+
+### 🔹 Mongo Connection Pool Metrics
+POOL_CHECKOUTS = Counter("diary_db_pool_checkouts_total", "Connection checkouts, by outcome")
+POOL_WAIT_SECONDS = Histogram("diary_db_pool_wait_seconds", "Time waiting for a pooled connection")
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """✅ pymongo listener tracking open / checked-out connections and checkout waits"""
+
+    def __init__(self):
+        self.open = 0
+        self.checked_out = 0
+        self._local = threading.local()  # checkout start, pymongo < 4.7 has no event.duration
+        Gauge("diary_db_pool_open_connections", "Open Mongo connections", lambda: self.open)
+        Gauge("diary_db_pool_checked_out", "Mongo connections in use", lambda: self.checked_out)
+
+    def _waited(self, event):
+        duration = getattr(event, "duration", None)
+        if duration is None:
+            started = getattr(self._local, "started", None)
+            duration = time.monotonic() - started if started is not None else 0.0
+        POOL_WAIT_SECONDS.observe(duration)
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.monotonic()
+
+    def connection_checked_out(self, event):
+        with _lock:
+            self.checked_out += 1
+        POOL_CHECKOUTS.inc(outcome="ok")
+        self._waited(event)
+
+    def connection_check_out_failed(self, event):
+        POOL_CHECKOUTS.inc(outcome=str(event.reason))
+        self._waited(event)
+
+    def connection_checked_in(self, event):
+        with _lock:
+            self.checked_out -= 1
+
+    def connection_created(self, event):
+        with _lock:
+            self.open += 1
+
+    def connection_closed(self, event):
+        with _lock:
+            self.open -= 1
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
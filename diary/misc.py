@@ -1,21 +1,53 @@
+import asyncio
 from diary import db,LOGGER
-from config import OWNER_ID,SUDOERS
+from config import OWNER_ID,SUDOERS,SUDOERS_POLL_INTERVAL
+from pymongo.errors import OperationFailure, PyMongoError
 from pyrogram import Client
 async def sudo():
     global SUDOERS
     SUDOERS.add(OWNER_ID)
     sudoersdb = db.sudoers
+    await sudoersdb.update_one(
+        {"sudo": "sudo"},
+        {"$addToSet": {"sudoers": OWNER_ID}},
+        upsert=True,
+    )
     sudoers = await sudoersdb.find_one({"sudo": "sudo"})
-    sudoers = [] if not sudoers else sudoers["sudoers"]
-    if OWNER_ID not in sudoers:
-        sudoers.append(OWNER_ID)
-        await sudoersdb.update_one(
-            {"sudo": "sudo"},
-            {"$set": {"sudoers": sudoers}},
-            upsert=True,
-        )
-    if sudoers:
-        for user_id in sudoers:
-            SUDOERS.add(user_id)
-            
-         
\ No newline at end of file
+    for user_id in sudoers["sudoers"]:
+        SUDOERS.add(user_id)
+
+
+def _sync_sudoers(sudoers):
+    # Swap the contents without an await in between, so no handler sees a half-updated set
+    new = set(sudoers) | {OWNER_ID}
+    SUDOERS.intersection_update(new)
+    SUDOERS.update(new)
+
+async def watch_sudoers():
+    """✅ Keep SUDOERS in sync with changes made by other workers.
+
+    Follows a change stream, or polls where there is none (standalone servers).
+    Mongo errors are logged and the sync retried, so it runs for the life of the process.
+    """
+    sudoersdb = db.sudoers
+    streaming = True
+    while True:
+        try:
+            # Also catches up on changes missed while the stream was down
+            sudoers = await sudoersdb.find_one({"sudo": "sudo"})
+            _sync_sudoers(sudoers["sudoers"] if sudoers else [])
+            if streaming:
+                async with sudoersdb.watch(full_document="updateLookup") as stream:
+                    async for change in stream:
+                        doc = change.get("fullDocument")
+                        _sync_sudoers(doc["sudoers"] if doc else [])
+        except OperationFailure as e:
+            if streaming:
+                # Change streams need a replica set, poll on standalone servers
+                LOGGER.info(f"Sudoers change stream unavailable ({e}), polling instead.")
+                streaming = False
+                continue
+            LOGGER.error(f"⚠️ Could not sync sudoers: {e}")
+        except PyMongoError as e:
+            LOGGER.error(f"⚠️ Could not sync sudoers, retrying in {SUDOERS_POLL_INTERVAL}s: {e}")
+        await asyncio.sleep(SUDOERS_POLL_INTERVAL)
@@ -1,18 +1,24 @@
-import glob
-from os.path import basename, dirname, isfile
+import importlib
 
+# ✅ Every handler module, in load order. New modules must be listed here.
+# `start` stays last: its catch-all text handler would take every command
+# registered after it in the same handler group.
+ALL_MODULES = [
+    "auth",
+    "pages",
+    "search",
+    "export",
+    "owner",
+    "start",
+]
+__all__ = ALL_MODULES + ["ALL_MODULES", "load_modules"]
 
-def __list_all_modules():
-    mod_paths = glob.glob(dirname(__file__) + "/*.py")
 
-    all_modules = [
-        basename(f)[:-3]
-        for f in mod_paths
-        if isfile(f) and f.endswith(".py") and not f.endswith("__init__.py")
-    ]
+def load_modules():
+    """✅ Import all modules (registering their handlers) and collect their help"""
+    from diary import HELPABLE
 
-    return all_modules
-
-
-ALL_MODULES = sorted(__list_all_modules())
-__all__ = ALL_MODULES + ["ALL_MODULES"]
+    for name in ALL_MODULES:
+        module = importlib.import_module("diary.modules." + name)
+        if getattr(module, "__MODULE__", None) and getattr(module, "__HELP__", None):
+            HELPABLE[module.__MODULE__.lower()] = module
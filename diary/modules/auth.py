@@ -1,86 +1,76 @@
+import asyncio
 import re
-import bcrypt
 from .. import db, LOGGER
+from ..database import IST, get_login_data, invalidate_user
+from ..database.password import KdfBusy, hash_password_async, verify_password_async, needs_rehash
 from datetime import datetime
-import pytz  
-
-IST = pytz.timezone("Asia/Kolkata") 
+from pymongo.errors import DuplicateKeyError
 
 # ✅ Databases
 users_db = db.users_db  # ✅ Fully registered users
 pending_users_db = db.pending_users  # ✅ Users who started but haven't registered
-login_db = db.login_db  # ✅ Multiple login sessions
+login_db = db.login_db  # ✅ Legacy credentials (older accounts only)
 sudoers_db = db.sudoers  # ✅ Admin users
 
-### 🔹 Hash & Verify Password
-def hash_password(password):
-    """✅ Hashes a password before storing"""
-    salt = bcrypt.gensalt()
-    return bcrypt.hashpw(password.encode(), salt).decode()
-
-def check_password(password, hashed_password):
-    """✅ Checks a plain password against a stored hashed password"""
-    return bcrypt.checkpw(password.encode(), hashed_password.encode())
-
-### 🔹 Save User When They Start the Bot
-async def add_pending_user(user_id):
-    """✅ Save user entry when they start the bot (before registration)"""
-    user_exists = await pending_users_db.find_one({"telegram_id": user_id})
-
-    if not user_exists:
-        current_time_utc = datetime.utcnow()
-        current_time_ist = current_time_utc.astimezone(IST)
-
-        new_user = {
-            "telegram_id": user_id,  
-            "registered_at": str(current_time_ist.strftime("%d-%m-%Y %I:%M %p"))
-        }
-        await pending_users_db.insert_one(new_user)  # ✅ Save in pending_users_db
-        return True
-    return False
-
-### 🔹 Register User in `users_db` & Save Login in `login_db`
-async def register_user(user_id, username, password, email, nickname):
-    """✅ Registers a new user & stores login details"""
-    existing_user = await users_db.find_one({"username": username})
-
-    if existing_user:
-        return False, "❌ Username already exists! Try another."
-
-    # Hash the password before saving
-    hashed_password = hash_password(password)  
-
-    # ✅ Save User Profile in `users_db`
+### 🔹 Register User in `users_db` (profile + credentials in one document)
+async def register_user(user_id, username, hashed_password, email, nickname):
+    """✅ Registers a new user in a single insert (password must already be hashed)"""
     new_user = {
         "telegram_id": user_id,
         "username": username,
+        "password": hashed_password,
         "email": email,
         "nickname": nickname,
         "total_pages": 0,
-        "registered_at": datetime.utcnow().astimezone(IST).strftime("%d-%m-%Y %I:%M %p")
+        "registered_at": datetime.now(IST).strftime("%d-%m-%Y %I:%M %p")
     }
-    await users_db.insert_one(new_user)  # ✅ Save in `users_db`
-
-    # ✅ Save Login Data in `login_db` with hashed password
-    await login_db.insert_one({
-           "telegram_id": user_id,
-           "username": username,
-           "password": hashed_password, 
-           "email": email
-       })
+    try:
+        # ✅ The unique `username` index rejects duplicates, even concurrent ones
+        await users_db.insert_one(new_user)
+    except DuplicateKeyError:
+        return False, "❌ Username already exists! Try another."
+    invalidate_user(user_id, username)
 
     return True, "✅ Registration successful!"
 
+### 🔹 Upgrade Old Hashes After a Successful Login
+_rehashes = set()  # running rehash tasks, referenced until they finish
+
+async def _rehash(username, password, old_hash):
+    """✅ Store the password again with the current KDF algorithm / cost"""
+    try:
+        new_hash = await hash_password_async(password)
+        update = {"$set": {"password": new_hash}}
+        # Only replace the hash that was just verified, a change made meanwhile wins
+        result = await users_db.update_one({"username": username, "password": old_hash}, update)
+        if not result.matched_count:
+            await login_db.update_one({"username": username, "password": old_hash}, update)
+        invalidate_user(username=username)
+    except Exception as e:
+        LOGGER.error(f"⚠️ Could not rehash the password of {username}: {e}")
+
 ### 🔹 Login User by Checking Password
+BUSY_TEXT = "⏳ Too many logins right now. Please try again in a minute."
+
 async def login_user(username, password):
     """✅ Checks username & verifies hashed password"""
-    user = await login_db.find_one({"username": username})
+    user = await get_login_data(username)
 
     if not user:
         return False, "❌ Username not found!"
 
-    if not check_password(password, user["password"]):
+    try:
+        verified = await verify_password_async(password, user["password"])
+    except KdfBusy:
+        return False, BUSY_TEXT
+    if not verified:
         return False, "❌ Incorrect password! Try again."
 
+    # ✅ The reply does not wait for the upgrade
+    if needs_rehash(user["password"]):
+        task = asyncio.create_task(_rehash(username, password, user["password"]))
+        _rehashes.add(task)
+        task.add_done_callback(_rehashes.discard)
+
     return True, user["telegram_id"]
 
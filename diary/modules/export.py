@@ -0,0 +1,63 @@
+from diary import DiaryBot, LOGGER
+from pyrogram import filters
+from pyrogram.types import Message
+from diary.sender import send, reply_text
+from diary.help import PAGES_TEXTS, EXPORT_TEXTS
+from diary.database import get_user_by_id
+from diary.export import SERIALIZERS, export_slots, write_export, remove_export, cached_export, remember_export
+
+__MODULE__ = "Export"
+__HELP__ = """
+/export - download your whole diary as JSON Lines (gzip)
+/export md - the same as Markdown
+"""
+
+@DiaryBot.on_message(filters.command("export") & filters.private)
+async def export_command(client, message: Message):
+    """✅ Send the user's diary as a compressed file"""
+    user = await get_user_by_id(message.from_user.id)
+    if not user:
+        await reply_text(message, PAGES_TEXTS["not_registered"])
+        return
+
+    fmt = message.command[1].lower() if len(message.command) > 1 else "jsonl"
+    if fmt not in SERIALIZERS:
+        await reply_text(message, EXPORT_TEXTS["usage"])
+        return
+
+    username = user["username"]
+    total_pages = user.get("total_pages", 0)
+    if not total_pages:
+        await reply_text(message, EXPORT_TEXTS["empty"])
+        return
+
+    file_name = f"{username}-diary.{fmt}.gz"
+    caption = EXPORT_TEXTS["caption"].format(total_pages)
+
+    # ✅ Nothing changed since the last export: resend the same file
+    file_id = await cached_export(username, fmt, total_pages)
+    if file_id:
+        await send(message.chat.id, lambda: message.reply_document(file_id, caption=caption))
+        return
+
+    status = await reply_text(message, EXPORT_TEXTS["preparing"])
+    path = sent = None
+    try:
+        # The slot is held until the upload is done, so temp files are capped too
+        async with export_slots:
+            path, _ = await write_export(username, fmt)
+            sent = await send(message.chat.id, lambda: message.reply_document(path, file_name=file_name, caption=caption))
+    except Exception as e:
+        LOGGER.error(f"⚠️ Export for {username} failed: {e}")
+        await reply_text(message, EXPORT_TEXTS["failed"])
+    finally:
+        if path:
+            await remove_export(path)
+        await DiaryBot.deleter.schedule(status)
+
+    # The user has the file by now; if this fails, the next /export just builds it again
+    if sent and sent.document:
+        try:
+            await remember_export(username, fmt, total_pages, sent.document.file_id)
+        except Exception as e:
+            LOGGER.error(f"⚠️ Could not remember the export for {username}: {e}")
@@ -0,0 +1,86 @@
+import asyncio
+import io
+from html import escape
+from diary import DiaryBot
+from pyrogram import filters
+from pyrogram.types import Message
+from config import OWNER_ID
+from diary.profiler import profiler
+from diary.broadcast import Broadcast
+
+__MODULE__ = "Owner"
+__HELP__ = """
+/profile on [interval_ms] - start the sampling profiler
+/profile off - stop it and get the report
+/broadcast [text] - send text (or the replied message) to every user
+/broadcast resume - continue a broadcast cut short by a restart or an error
+/broadcast cancel - stop the running broadcast
+"""
+
+# ✅ The running broadcast and its task (one at a time)
+_broadcast = None
+_broadcast_task = None
+
+@DiaryBot.on_message(filters.command("profile") & filters.user(OWNER_ID))
+async def profile_command(client, message: Message):
+    """✅ Toggle the sampling profiler at runtime"""
+    action = message.command[1].lower() if len(message.command) > 1 else ""
+
+    if action == "on":
+        interval_ms = int(message.command[2]) if len(message.command) > 2 and message.command[2].isdigit() else 5
+        profiler.start(interval_ms / 1000)
+        await message.reply_text(f"🔬 Profiler started, sampling every {interval_ms} ms.")
+
+    elif action == "off":
+        if not profiler.running:
+            await message.reply_text("❗ Profiler is not running.")
+            return
+        profiler.stop()
+        stacks = io.BytesIO(profiler.collapsed().encode())
+        stacks.name = "profile.folded"
+        await message.reply_document(stacks, caption=f"<pre>{escape(profiler.report()[:1000])}</pre>")
+
+    else:
+        await message.reply_text("Usage: `/profile on [interval_ms]` or `/profile off`")
+
+
+@DiaryBot.on_message(filters.command("broadcast") & filters.user(OWNER_ID))
+async def broadcast_command(client, message: Message):
+    """✅ Start, resume or cancel an announcement to every user"""
+    global _broadcast, _broadcast_task
+    action = message.command[1].lower() if len(message.command) > 1 else ""
+    running = _broadcast_task is not None and not _broadcast_task.done()
+
+    if action == "cancel":
+        if not running:
+            await message.reply_text("❗ No broadcast is running.")
+            return
+        _broadcast.cancel(_broadcast_task)
+        await message.reply_text("🛑 Broadcast cancelled.")
+        return
+
+    if running:
+        await message.reply_text("❗ A broadcast is already running, `/broadcast cancel` it first.")
+        return
+
+    if action == "resume":
+        status = await message.reply_text("📣 Resuming broadcast...")
+        broadcast = await Broadcast.unfinished(status)
+        if broadcast is None:
+            await status.edit_text("❗ Nothing to resume.")
+            return
+    elif message.reply_to_message:
+        status = await message.reply_text("📣 Starting broadcast...")
+        broadcast = await Broadcast.create(
+            {"from_chat_id": message.chat.id, "message_id": message.reply_to_message.id}, status
+        )
+    elif len(message.command) > 1:
+        status = await message.reply_text("📣 Starting broadcast...")
+        broadcast = await Broadcast.create({"text": message.text.split(None, 1)[1]}, status)
+    else:
+        await message.reply_text("Usage: `/broadcast text`, reply `/broadcast` to a message, or `/broadcast resume|cancel`")
+        return
+
+    # Runs in the background so `/broadcast cancel` is not queued behind it
+    _broadcast = broadcast
+    _broadcast_task = asyncio.create_task(broadcast.run())
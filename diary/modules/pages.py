@@ -0,0 +1,121 @@
+from diary import DiaryBot
+from pyrogram import filters
+from pyrogram.types import CallbackQuery, Message
+from diary.sender import reply_text
+from diary.help import PAGES_TEXTS
+from diary.inline import pages_keyboard
+from diary.callbacks import router, hex_arg
+from diary.database import get_user_by_id
+from diary.database.pages import add_page, get_pages, page_text, encode_cursor
+
+__MODULE__ = "Diary"
+__HELP__ = """
+/addpage [text] - write a new diary page
+/getpages - read your diary pages
+"""
+
+PREVIEW_LENGTH = 300
+
+async def save_page(message: Message, owner: str, text: str):
+    """✅ Store a page and tell the user"""
+    await add_page(owner, text, message.from_user.id)
+    user = await get_user_by_id(message.from_user.id)
+    await reply_text(message, PAGES_TEXTS["saved"].format(user["total_pages"] if user else 1))
+
+@DiaryBot.on_message(filters.command("addpage") & filters.private)
+async def add_page_command(client, message: Message):
+    """✅ `/addpage text` saves at once, plain `/addpage` asks for the text"""
+    user = await get_user_by_id(message.from_user.id)
+    if not user:
+        await reply_text(message, PAGES_TEXTS["not_registered"])
+        return
+
+    if len(message.command) > 1:
+        await save_page(message, user["username"], message.text.split(None, 1)[1])
+        return
+
+    await DiaryBot.sessions.set(message.from_user.id, {"step": "add_page", "owner": user["username"]})
+    await reply_text(message, PAGES_TEXTS["add"])
+
+@router.route("add_pages")
+async def add_pages_button(client, callback_query: CallbackQuery):
+    """✅ "📝 Add pages" button"""
+    user = await get_user_by_id(callback_query.from_user.id)
+    if not user:
+        await callback_query.answer(PAGES_TEXTS["not_registered"], show_alert=True)
+        return
+
+    await DiaryBot.sessions.set(callback_query.from_user.id, {"step": "add_page", "owner": user["username"]})
+    await callback_query.answer()
+    await reply_text(callback_query.message, PAGES_TEXTS["add"])
+
+async def handle_add_page(client, message: Message, session: dict):
+    """✅ Text sent after `/addpage`, routed here by `handle_messages`"""
+    await DiaryBot.sessions.delete(message.from_user.id)
+    await save_page(message, session["owner"], message.text)
+
+
+### 🔹 Reading Pages
+async def render_pages(owner: str, cursor: str = None, newer: bool = False):
+    """✅ Text and keyboard for one screen of pages"""
+    pages, has_more = await get_pages(owner, cursor, newer)
+    if not pages:
+        return PAGES_TEXTS["empty"], None
+
+    text = PAGES_TEXTS["header"]
+    for page in pages:
+        body = page_text(page)
+        if len(body) > PREVIEW_LENGTH:
+            body = body[:PREVIEW_LENGTH] + "…"
+        text += PAGES_TEXTS["entry"].format(page["created_at"].strftime("%d-%m-%Y %I:%M %p"), body)
+
+    # Going older: newer pages exist if we came from a cursor. Going newer: the reverse.
+    has_newer = has_more if newer else cursor is not None
+    has_older = cursor is not None if newer else has_more
+    keyboard = pages_keyboard(
+        encode_cursor(pages[0]) if has_newer else None,
+        encode_cursor(pages[-1]) if has_older else None,
+    )
+    return text, keyboard
+
+@DiaryBot.on_message(filters.command("getpages") & filters.private)
+async def get_pages_command(client, message: Message):
+    """✅ First screen of the user's diary"""
+    user = await get_user_by_id(message.from_user.id)
+    if not user:
+        await reply_text(message, PAGES_TEXTS["not_registered"])
+        return
+
+    text, keyboard = await render_pages(user["username"])
+    await reply_text(message, text, reply_markup=keyboard)
+
+@router.route("my_diary")
+async def my_diary(client, callback_query: CallbackQuery):
+    """✅ "📖 My Diary" button"""
+    user = await get_user_by_id(callback_query.from_user.id)
+    if not user:
+        await callback_query.answer(PAGES_TEXTS["not_registered"], show_alert=True)
+        return
+
+    text, keyboard = await render_pages(user["username"])
+    await callback_query.answer()
+    await reply_text(callback_query.message, text, reply_markup=keyboard)
+
+async def page_through(callback_query: CallbackQuery, cursor: str, newer: bool):
+    """✅ Older / Newer buttons, each a single keyset query"""
+    user = await get_user_by_id(callback_query.from_user.id)
+    if not user:
+        await callback_query.answer(PAGES_TEXTS["not_registered"], show_alert=True)
+        return
+
+    text, keyboard = await render_pages(user["username"], cursor, newer=newer)
+    await callback_query.answer()
+    await callback_query.message.edit_text(text, reply_markup=keyboard)
+
+@router.route("older", arg=hex_arg)
+async def older_pages(client, callback_query: CallbackQuery, cursor: str):
+    await page_through(callback_query, cursor, newer=False)
+
+@router.route("newer", arg=hex_arg)
+async def newer_pages(client, callback_query: CallbackQuery, cursor: str):
+    await page_through(callback_query, cursor, newer=True)
@@ -0,0 +1,91 @@
+import re
+from datetime import datetime, timedelta, timezone
+from diary import DiaryBot
+from pyrogram import filters
+from pyrogram.types import CallbackQuery, Message
+from diary.sender import reply_text
+from diary.help import PAGES_TEXTS, SEARCH_TEXTS
+from diary.inline import search_keyboard
+from diary.callbacks import router, hex_args
+from diary.database import IST, get_user_by_id
+from diary.database.pages import page_text
+from diary.database.search import tokenize, save_search, get_search, search_pages, encode_search_cursor
+
+__MODULE__ = "Search"
+__HELP__ = """
+/search words [from:dd-mm-yyyy] [to:dd-mm-yyyy] - find diary pages
+"""
+
+PREVIEW_LENGTH = 200
+DATE_RE = re.compile(r"\b(from|to):(\d{2}-\d{2}-\d{4})\b")
+
+def parse_day(value: str) -> datetime:
+    """✅ Midnight IST of a dd-mm-yyyy date, as naive UTC like stored pages"""
+    day = datetime.strptime(value, "%d-%m-%Y").replace(tzinfo=IST)
+    return day.astimezone(timezone.utc).replace(tzinfo=None)
+
+async def render_results(search: dict, cursor: str = None):
+    """✅ Text and keyboard for one screen of results"""
+    query = " ".join(search["terms"])
+    pages, has_more = await search_pages(search, cursor)
+    if not pages:
+        return SEARCH_TEXTS["no_results"].format(query), None
+
+    text = SEARCH_TEXTS["header"].format(query)
+    for page in pages:
+        body = page_text(page)
+        if len(body) > PREVIEW_LENGTH:
+            body = body[:PREVIEW_LENGTH] + "…"
+        text += PAGES_TEXTS["entry"].format(page["created_at"].strftime("%d-%m-%Y %I:%M %p"), body)
+
+    keyboard = search_keyboard(str(search["_id"]), encode_search_cursor(pages[-1])) if has_more else None
+    return text, keyboard
+
+@DiaryBot.on_message(filters.command("search") & filters.private)
+async def search_command(client, message: Message):
+    """✅ Ranked search over the user's pages"""
+    user = await get_user_by_id(message.from_user.id)
+    if not user:
+        await reply_text(message, PAGES_TEXTS["not_registered"])
+        return
+
+    args = message.text.split(None, 1)[1] if len(message.command) > 1 else ""
+    dates = {}
+    try:
+        for key, value in DATE_RE.findall(args):
+            dates[key] = parse_day(value)
+    except ValueError:
+        await reply_text(message, SEARCH_TEXTS["bad_date"])
+        return
+    query = DATE_RE.sub("", args).strip()
+    if not tokenize(query):
+        await reply_text(message, SEARCH_TEXTS["usage"])
+        return
+
+    until = dates["to"] + timedelta(days=1) if "to" in dates else None
+    search = await save_search(user["username"], query, dates.get("from"), until)
+
+    text, keyboard = await render_results(search)
+    await reply_text(message, text, reply_markup=keyboard)
+
+def more_arg(raw: str) -> tuple:
+    """✅ `search_id:cursor` of a "More results" button"""
+    search_id, cursor = hex_args(raw)
+    if len(search_id) != 24:
+        raise ValueError(f"Not a search id: {search_id}")
+    return search_id, cursor
+
+@router.route("more", arg=more_arg)
+async def more_results(client, callback_query: CallbackQuery, args: tuple):
+    """✅ "More results" button"""
+    search_id, cursor = args
+    search = await get_search(search_id)
+    user = await get_user_by_id(callback_query.from_user.id)
+    # Someone else's search (e.g. a forwarded button) looks the same as an expired one
+    if not search or not user or search["owner"] != user["username"]:
+        await callback_query.answer("⌛ This search has expired, please search again.", show_alert=True)
+        return
+
+    text, keyboard = await render_results(search, cursor)
+    await callback_query.answer()
+    await callback_query.message.edit_text(text, reply_markup=keyboard)
@@ -1,17 +1,17 @@
 import re
-import asyncio
 from diary import DiaryBot
 from pyrogram import filters
 from diary.help import WELCOME_MESSAGE, AUTH_MESSAGE, REGISTRATION_TEXTS, LOGIN_TEXTS
 from diary.inline import START_KEYBOARD, AUTH_BUTTONS, CONFIRM_CANCEL_BUTTONS
-from config import START_IMG, STEP_IMAGES, AUTH_IMG
-from diary.database import db, add_pending_user, get_login_data, check_password, save_login_session, login_db, users_db
-from diary.modules.auth import login_user, register_user
+from diary.media import reply_photo
+from diary.sender import reply_text
+from diary.ratelimit import kdf_limiter
+from diary.callbacks import router
+from diary.database import add_pending_user, get_login_data, get_user_by_id, get_user_by_username, hash_password_async, save_login_session
+from diary.database.password import KdfBusy
+from diary.modules.auth import BUSY_TEXT, login_user, register_user
+from diary.modules.pages import handle_add_page
 from pyrogram.types import CallbackQuery, Message
-import bcrypt
-
-if not hasattr(DiaryBot, "user_data"):
-    DiaryBot.user_data = {}
 
 # Password Strength
 def is_valid_password(password):
@@ -29,7 +29,7 @@ CONFIRMATION_TEXTS = {
         "👤 **Username:** {username}\n"
         "🆔 **Telegram ID:** {user_id}\n"
         "📛 **Nickname:** {nickname}\n"
-        "🔐 **Password:** ||{password}||\n"
+        "🔐 **Password:** ••••••••\n"
         "📧 **Email:** {email}\n\n"
         "Click **Confirm** to complete registration or **Cancel** to start over."
     ),
@@ -37,214 +37,220 @@ CONFIRMATION_TEXTS = {
         "**🔑 Login Details**\n\n"
         "Please confirm your details before proceeding:\n\n"
         "👤 **Username:** {username}\n"
-        "🆔 **Telegram ID:** {user_id}\n"
-        "🔐 **Password:** ||{password}||\n\n"
+        "🆔 **Telegram ID:** {user_id}\n\n"
         "Click **Confirm** to log in or **Cancel** to start over."
     )
 }
 
-async def delete_message_after_delay(message, delay=30):
-    """Delete a message after a specified delay."""
-    await asyncio.sleep(delay)
-    await message.delete()
-
 @DiaryBot.on_message(filters.command("start") & filters.private)
-async def start_command(client, message):
-    """✅ Show login/register UI when user starts"""
-    
-    user_id = message.from_user.id
-    await add_pending_user(user_id)  
+async def start_command(client, message, from_user=None):
+    """✅ Show login/register UI when user starts
 
-    user = await users_db.find_one({"telegram_id": user_id})
+    `from_user` is who to show it for when `message` is the bot's own (a button's message).
+    """
+    from_user = from_user or message.from_user
+    user_id = from_user.id
+    add_pending_user(user_id)  # buffered, never waits on Mongo
+
+    user = await get_user_by_id(user_id)
 
     if not user:
-        bot_msg = await message.reply_photo(
-            photo=START_IMG,
-            caption=AUTH_MESSAGE.format(message.from_user.mention, DiaryBot.username),
+        bot_msg = await reply_photo(
+            message, "start",
+            caption=AUTH_MESSAGE.format(from_user.mention, DiaryBot.username),
             reply_markup=AUTH_BUTTONS
         )
 
-        DiaryBot.user_data[user_id] = {"bot_msg": bot_msg.id}
+        await DiaryBot.sessions.set(user_id, {"bot_msg": bot_msg.id})
         return
 
     # ✅ Show main page after successful login/registration
-    await message.reply_photo(
-        photo=START_IMG,
-        caption=WELCOME_MESSAGE.format(message.from_user.mention, DiaryBot.username),
+    await reply_photo(
+        message, "start",
+        caption=WELCOME_MESSAGE.format(from_user.mention, DiaryBot.username),
         reply_markup=START_KEYBOARD
     )
 
-@DiaryBot.on_callback_query(filters.regex("register"))
+@router.route("register")
 async def register(client, callback_query: CallbackQuery):
     """✅ Start registration process"""
     user_id = callback_query.from_user.id
-    user = await db.users_db.find_one({"telegram_id": user_id})
+    user = await get_user_by_id(user_id)
 
     if user:
         await callback_query.answer("❗ You are already registered!", show_alert=True)
         return
 
     # Schedule the message for deletion after 30 seconds
-    asyncio.create_task(delete_message_after_delay(callback_query.message))
+    await DiaryBot.deleter.schedule(callback_query.message, delay=30, owner=callback_query.from_user.id)
 
-    await callback_query.message.reply_photo(
-        photo=STEP_IMAGES["username"],
+    await reply_photo(
+        callback_query.message, "username",
         caption=REGISTRATION_TEXTS["username"]
     )
-    DiaryBot.user_data[user_id] = {"step": "username"}
+    await DiaryBot.sessions.set(user_id, {"step": "username"})
 
-@DiaryBot.on_callback_query(filters.regex("login"))
+@router.route("login")
 async def login(client, callback_query: CallbackQuery):
     """✅ Start login process"""
     # Schedule the message for deletion after 30 seconds
-    asyncio.create_task(delete_message_after_delay(callback_query.message))
+    await DiaryBot.deleter.schedule(callback_query.message, delay=30, owner=callback_query.from_user.id)
 
-    await callback_query.message.reply_photo(
-        photo=STEP_IMAGES["login_username"],
+    await reply_photo(
+        callback_query.message, "login_username",
         caption=LOGIN_TEXTS["username"]
     )
-    DiaryBot.user_data[callback_query.from_user.id] = {"step": "login_username"}
+    await DiaryBot.sessions.set(callback_query.from_user.id, {"step": "login_username"})
 
 @DiaryBot.on_message(filters.text & filters.private)
 async def handle_messages(client, message: Message):
-    """✅ Handle both registration and login messages"""
+    """✅ Handle registration, login and new page messages"""
     user_id = message.from_user.id
+    session = await DiaryBot.sessions.get(user_id)
 
-    if user_id not in DiaryBot.user_data:
+    if session is None:
         return  
 
-    step = DiaryBot.user_data[user_id].get("step")
+    step = session.get("step")
 
     if step and step.startswith("login_"):
-        await handle_login(client, message)
+        await handle_login(client, message, session)
     elif step and step in ["username", "nickname", "password", "email"]:
-        await handle_registration(client, message)
+        await handle_registration(client, message, session)
+    elif step == "add_page":
+        await handle_add_page(client, message, session)
     else:
-        await message.reply_text("❌ An unexpected error occurred. Please try again.", quote=True)
-        del DiaryBot.user_data[user_id]
+        await reply_text(message, "❌ An unexpected error occurred. Please try again.", quote=True)
+        await DiaryBot.sessions.delete(user_id)
 
-async def handle_login(client, message: Message):
+async def handle_login(client, message: Message, session: dict):
     """✅ Handles user login process"""
     user_id = message.from_user.id
-
-    if user_id not in DiaryBot.user_data:
-        return
-
-    step = DiaryBot.user_data[user_id]["step"]
+    step = session["step"]
 
     if step == "login_username":
         username = message.text.strip()
 
-        user = await login_db.find_one({"username": username})
+        user = await get_login_data(username)
 
         if not user:
-            await message.reply_text("❗ Username not found! Please check or register first.")
-            del DiaryBot.user_data[user_id]
+            await reply_text(message, "❗ Username not found! Please check or register first.")
+            await DiaryBot.sessions.delete(user_id)
             return
 
-        DiaryBot.user_data[user_id]["username"] = username
-        DiaryBot.user_data[user_id]["step"] = "login_password"
-        await message.reply_photo(
-            photo=STEP_IMAGES["login_password"],
+        session["username"] = username
+        session["step"] = "login_password"
+        await DiaryBot.sessions.set(user_id, session)
+        await reply_photo(
+            message, "login_password",
             caption=LOGIN_TEXTS["password"]
         )
-        await message.delete()  
+        await DiaryBot.deleter.schedule(message)
 
     elif step == "login_password":
         password = message.text.strip()
-        username = DiaryBot.user_data[user_id]["username"]
+        username = session["username"]
 
-        user = await login_db.find_one({"username": username})
-
-        if not user:
-            await message.reply_text("❌ An unexpected error occurred. Try again.")
-            del DiaryBot.user_data[user_id]
+        if not await kdf_limiter.try_acquire(user_id):
+            await reply_text(message, "⏳ Too many attempts. Please wait a minute and try again.")
             return
 
-        if not check_password(password, user["password"]):
-            await message.reply_text("❌ Incorrect password! Try again.")
+        # ✅ The only KDF verification of the login flow
+        success, response = await login_user(username, password)
+
+        if not success:
+            await reply_text(message, response)
             return
 
-        DiaryBot.user_data[user_id]["password"] = password  
+        # ✅ Keep only the verified flag in the session, never the password
+        session["verified"] = True
 
         confirmation_text = CONFIRMATION_TEXTS["login"].format(
             username=username,
             user_id=user_id
         )
-        await message.reply_photo(
-            photo=STEP_IMAGES["login_password"],
+        await reply_photo(
+            message, "login_password",
             caption=confirmation_text,
             reply_markup=CONFIRM_CANCEL_BUTTONS
         )
-        DiaryBot.user_data[user_id]["step"] = "login_confirm"
-        await message.delete()  
+        session["step"] = "login_confirm"
+        await DiaryBot.sessions.set(user_id, session)
+        await DiaryBot.deleter.schedule(message)
 
-async def handle_registration(client, message: Message):
+async def handle_registration(client, message: Message, session: dict):
     """✅ Handle step-by-step registration"""
     user_id = message.from_user.id
-
-    if user_id not in DiaryBot.user_data:
-        return
-
-    step = DiaryBot.user_data[user_id]["step"]
+    step = session["step"]
 
     if step == "username":
         if " " in message.text:
-            await message.reply_text("❗ Username **cannot contain spaces**. Try again.")
+            await reply_text(message, "❗ Username **cannot contain spaces**. Try again.")
             return
 
-        existing_user = await db.users_db.find_one({"username": message.text})
+        existing_user = await get_user_by_username(message.text)
         if existing_user:
-            await message.reply_text("❗ This username is already taken. Try another.")
-            del DiaryBot.user_data[user_id]
+            await reply_text(message, "❗ This username is already taken. Try another.")
+            await DiaryBot.sessions.delete(user_id)
             return
 
-        DiaryBot.user_data[user_id]["username"] = message.text
-        DiaryBot.user_data[user_id]["step"] = "nickname"
-        await message.reply_photo(
-            photo=STEP_IMAGES["nickname"],
+        session["username"] = message.text
+        session["step"] = "nickname"
+        await DiaryBot.sessions.set(user_id, session)
+        await reply_photo(
+            message, "nickname",
             caption=REGISTRATION_TEXTS["nickname"]
         )
-        await message.delete()  
+        await DiaryBot.deleter.schedule(message)
 
     elif step == "nickname":
         if " " in message.text:
-            await message.reply_text("❗ Nickname **cannot contain spaces**. Try again.")
+            await reply_text(message, "❗ Nickname **cannot contain spaces**. Try again.")
             return
 
-        DiaryBot.user_data[user_id]["nickname"] = message.text
-        DiaryBot.user_data[user_id]["step"] = "password"
-        await message.reply_photo(
-            photo=STEP_IMAGES["password"],
+        session["nickname"] = message.text
+        session["step"] = "password"
+        await DiaryBot.sessions.set(user_id, session)
+        await reply_photo(
+            message, "password",
             caption=REGISTRATION_TEXTS["password"]
         )
-        await message.delete()  
+        await DiaryBot.deleter.schedule(message)
 
     elif step == "password":
         if not is_valid_password(message.text):
-            await message.reply_text("❗ Password must be **at least 8 characters** long and contain **at least 1 special character** (No spaces). Try again.")
+            await reply_text(message, "❗ Password must be **at least 8 characters** long and contain **at least 1 special character** (No spaces). Try again.")
+            return
+
+        if not await kdf_limiter.try_acquire(user_id):
+            await reply_text(message, "⏳ Too many attempts. Please wait a minute and try again.")
             return
 
-        DiaryBot.user_data[user_id]["password"] = message.text
-        DiaryBot.user_data[user_id]["step"] = "email"
-        await message.reply_photo(
-            photo=STEP_IMAGES["email"],
+        # ✅ The only KDF hash of the registration flow
+        try:
+            session["password_hash"] = await hash_password_async(message.text)
+        except KdfBusy:
+            await reply_text(message, BUSY_TEXT)
+            return
+        session["step"] = "email"
+        await DiaryBot.sessions.set(user_id, session)
+        await reply_photo(
+            message, "email",
             caption=REGISTRATION_TEXTS["email"]
         )
-        await message.delete()  
+        await DiaryBot.deleter.schedule(message)
 
     elif step == "email":
         if " " in message.text or not re.match(r"^[a-zA-Z0-9._%+-]+@(gmail|hotmail|outlook)\.com$", message.text):
-            await message.reply_text("❗ Invalid email. Only Gmail, Hotmail, and Outlook are allowed (No spaces). Try again.")
+            await reply_text(message, "❗ Invalid email. Only Gmail, Hotmail, and Outlook are allowed (No spaces). Try again.")
             return
 
         email = message.text.strip()  #
-        DiaryBot.user_data[user_id]["email"] = email  
+        session["email"] = email  
 
         # ✅ Get All User Data for Confirmation
-        username = DiaryBot.user_data[user_id]["username"]
-        password = DiaryBot.user_data[user_id]["password"]
-        nickname = DiaryBot.user_data[user_id]["nickname"]
+        username = session["username"]
+        nickname = session["nickname"]
 
         print(f"✅ Email Captured: {email} for Username: {username}")  
 
@@ -253,109 +259,80 @@ async def handle_registration(client, message: Message):
             username=username,
             user_id=user_id,
             nickname=nickname,
-            password=password,
             email=email  
         )
-        await message.reply_photo(
-            photo=STEP_IMAGES["email"],
+        await reply_photo(
+            message, "email",
             caption=confirmation_text,
             reply_markup=CONFIRM_CANCEL_BUTTONS
         )
-        DiaryBot.user_data[user_id]["step"] = "register_confirm"
-        await message.delete()  #
+        session["step"] = "register_confirm"
+        await DiaryBot.sessions.set(user_id, session)
+        await DiaryBot.deleter.schedule(message)
 
 
-@DiaryBot.on_callback_query(filters.regex("confirm"))
+@router.route("confirm")
 async def confirm_action(client, callback_query: CallbackQuery):
     """✅ Handle confirmation for login/register"""
     user_id = callback_query.from_user.id
+    session = await DiaryBot.sessions.get(user_id)
 
-    if user_id not in DiaryBot.user_data:
+    if session is None:
         await callback_query.answer("❌ No active session found. Please start again.", show_alert=True)
         return
 
-    step = DiaryBot.user_data[user_id]["step"]
+    step = session.get("step")
 
     if step == "login_confirm":
-        username = DiaryBot.user_data[user_id]["username"]
-        entered_password = DiaryBot.user_data[user_id]["password"]  
-
-        user_data = await db.login_db.find_one({"username": username})
-
-        if not user_data:
-            await callback_query.answer("❌ User not found. Please register.", show_alert=True)
-            return
-
-        stored_hashed_password = user_data.get("password")  
-
-        # ✅ Verify Password with Hash (Corrected)
-        if bcrypt.checkpw(entered_password.encode("utf-8"), stored_hashed_password.encode("utf-8")):
-            await save_login_session(user_id, username, stored_hashed_password)  
-
-            await callback_query.answer(f"✅ Welcome back, {username}!", show_alert=True)
-
+        username = session["username"]
 
-            await callback_query.message.delete()
-            await start_command(client, callback_query.message)
-        else:
-            await callback_query.answer("❌ Incorrect password. Please try again.", show_alert=True)
+        # ✅ Password was already verified in the `login_password` step
+        if not session.get("verified"):
+            await callback_query.answer("❌ No active session found. Please start again.", show_alert=True)
             return
 
-        stored_hashed_password = user_data.get("password")  
-
-        if bcrypt.checkpw(entered_password.encode("utf-8"), stored_hashed_password.encode("utf-8")):
-            await save_login_session(user_id, username, stored_hashed_password)  
+        await save_login_session(user_id, username)
 
-            await callback_query.answer(f"✅ Welcome back, {username}!", show_alert=True)
+        await callback_query.answer(f"✅ Welcome back, {username}!", show_alert=True)
 
-            await callback_query.message.delete()
-
-            await start_command(client, callback_query.message)
-        else:
-            await callback_query.answer("❌ Incorrect password. Please try again.", show_alert=True)
+        await DiaryBot.deleter.schedule(callback_query.message)
+        await start_command(client, callback_query.message, callback_query.from_user)
 
     elif step == "register_confirm":
-        username = DiaryBot.user_data[user_id]["username"]
-        entered_password = DiaryBot.user_data[user_id]["password"]
-        nickname = DiaryBot.user_data[user_id]["nickname"]
-        email = DiaryBot.user_data[user_id].get("email") 
-
-        # Hash the password before storing
-        hashed_password = bcrypt.hashpw(entered_password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")  
-
-        # Check if the user already exists in users_db
-        existing_user = await db.users_db.find_one({"username": username})
-        if existing_user:
-            await callback_query.answer("❌ User already exists. Please log in.", show_alert=True)
-            return
+        username = session["username"]
+        hashed_password = session["password_hash"]
+        nickname = session["nickname"]
+        email = session.get("email") 
 
         success, response = await register_user(user_id, username, hashed_password, email, nickname)
 
         if success:
             await callback_query.answer(f"✅ Welcome, {nickname}!", show_alert=True)
 
-            await callback_query.message.delete()
+            await DiaryBot.deleter.schedule(callback_query.message)
 
-            await start_command(client, callback_query.message)
+            await start_command(client, callback_query.message, callback_query.from_user)
         else:
             await callback_query.answer(response, show_alert=True)
 
-    del DiaryBot.user_data[user_id]
+    await DiaryBot.sessions.delete(user_id)
+    # ✅ Flow is over, clear its prompts now instead of waiting for their timers
+    DiaryBot.deleter.flush(user_id)
 
-@DiaryBot.on_callback_query(filters.regex("cancel"))
+@router.route("cancel")
 async def cancel_action(client, callback_query: CallbackQuery):
     """✅ Handle cancellation for login/register"""
     user_id = callback_query.from_user.id
 
-    if user_id in DiaryBot.user_data:
-        del DiaryBot.user_data[user_id] 
+    await DiaryBot.sessions.delete(user_id)
+    DiaryBot.deleter.flush(user_id)
 
     await callback_query.answer("❌ Action canceled.", show_alert=True)
 
-    await callback_query.message.delete()
+    await DiaryBot.deleter.schedule(callback_query.message)
 
-    await callback_query.message.reply_photo(
-        photo=AUTH_IMG,
+    await reply_photo(
+        callback_query.message, "auth",
         caption=AUTH_MESSAGE.format(callback_query.from_user.mention, DiaryBot.username),
         reply_markup=AUTH_BUTTONS
     )
\ No newline at end of file
@@ -0,0 +1,67 @@
+import sys
+import threading
+from collections import Counter
+
+
+class SamplingProfiler:
+    """✅ Samples the event loop thread's stack from a side thread.
+
+    Nothing runs while it is off; when on, the loop only pays for the GIL hand-off
+    of one `sys._current_frames()` call per interval.
+    """
+
+    def __init__(self):
+        self.samples = Counter()
+        self.total = 0
+        self._thread = None
+        self._stop = threading.Event()
+        self._target = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, interval=0.005):
+        if self.running:
+            return
+        self.samples.clear()
+        self.total = 0
+        self._target = threading.get_ident()  # call from the event loop thread
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self.running:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self, interval):
+        while not self._stop.wait(interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+            self.total += 1
+
+    def report(self, top=15) -> str:
+        """✅ Hottest leaf functions, then the raw collapsed stacks"""
+        leaves = Counter()
+        for stack, count in self.samples.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        lines = [f"{self.total} samples"]
+        for leaf, count in leaves.most_common(top):
+            lines.append(f"{count * 100 / max(self.total, 1):5.1f}%  {leaf}")
+        return "\n".join(lines)
+
+    def collapsed(self) -> str:
+        """✅ Stacks in flamegraph.pl's collapsed format"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.items())
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,126 @@
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from pymongo import ReturnDocument
+
+from diary import db
+from diary.metrics import Counter
+from config import (
+    RATE_LIMIT_BACKEND,
+    AUTH_ATTEMPTS_PER_MINUTE,
+    CHAT_SENDS_PER_SECOND,
+    CHAT_SEND_BURST,
+    GLOBAL_SENDS_PER_SECOND,
+)
+
+RATE_LIMITED = Counter("diary_rate_limited_total", "Requests refused or delayed, by policy")
+
+# Buckets kept per limiter before the least recently used are forgotten
+MAX_BUCKETS = 50000
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens, updated):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class RateLimiter:
+    """✅ In-memory token buckets: `rate` tokens per second, at most `burst` saved up"""
+
+    def __init__(self, name, rate, burst):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self._buckets = OrderedDict()
+
+    def _refill(self, key):
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket(self.burst, now)
+            if len(self._buckets) > MAX_BUCKETS:
+                self._buckets.popitem(last=False)
+        else:
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+            bucket.updated = now
+            self._buckets.move_to_end(key)
+        return bucket
+
+    async def try_acquire(self, key) -> bool:
+        """✅ Take a token if there is one"""
+        bucket = self._refill(key)
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            return True
+        RATE_LIMITED.inc(policy=self.name)
+        return False
+
+    async def acquire(self, key):
+        """✅ Wait until a token is free, then take it"""
+        limited = False
+        while True:
+            bucket = self._refill(key)
+            if bucket.tokens >= 1:
+                bucket.tokens -= 1
+                return
+            if not limited:
+                RATE_LIMITED.inc(policy=self.name)
+                limited = True
+            await asyncio.sleep((1 - bucket.tokens) / self.rate)
+
+
+class MongoRateLimiter(RateLimiter):
+    """✅ Same buckets kept in Mongo so several workers share one budget"""
+
+    def __init__(self, name, rate, burst, collection):
+        super().__init__(name, rate, burst)
+        self.collection = collection
+
+    async def _take(self, key) -> bool:
+        now = datetime.utcnow()
+        elapsed = {"$divide": [{"$subtract": [now, {"$ifNull": ["$updated", now]}]}, 1000]}
+        refilled = {"$min": [self.burst, {"$add": [{"$ifNull": ["$tokens", self.burst]}, {"$multiply": [elapsed, self.rate]}]}]}
+        doc = await self.collection.find_one_and_update(
+            {"_id": f"{self.name}:{key}"},
+            [
+                {"$set": {"tokens": refilled, "updated": now}},
+                {"$set": {
+                    "allowed": {"$gte": ["$tokens", 1]},
+                    "tokens": {"$cond": [{"$gte": ["$tokens", 1]}, {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                }},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return doc["allowed"]
+
+    async def try_acquire(self, key) -> bool:
+        if await self._take(key):
+            return True
+        RATE_LIMITED.inc(policy=self.name)
+        return False
+
+    async def acquire(self, key):
+        if await self._take(key):
+            return
+        RATE_LIMITED.inc(policy=self.name)
+        while not await self._take(key):
+            await asyncio.sleep(1 / self.rate)
+
+
+def _limiter(name, rate, burst):
+    if RATE_LIMIT_BACKEND == "mongo":
+        return MongoRateLimiter(name, rate, burst, db.rate_limits)
+    return RateLimiter(name, rate, burst)
+
+### 🔹 Policies
+# Password checks / hashes per user (each costs a full KDF run)
+kdf_limiter = _limiter("kdf", AUTH_ATTEMPTS_PER_MINUTE / 60, AUTH_ATTEMPTS_PER_MINUTE)
+# Outgoing messages per chat and for the whole bot (Telegram flood limits)
+chat_send_limiter = _limiter("chat_send", CHAT_SENDS_PER_SECOND, CHAT_SEND_BURST)
+global_send_limiter = _limiter("global_send", GLOBAL_SENDS_PER_SECOND, GLOBAL_SENDS_PER_SECOND)
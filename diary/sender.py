@@ -0,0 +1,30 @@
+import asyncio
+import logging
+
+from pyrogram.errors import FloodWait
+
+from diary.ratelimit import chat_send_limiter, global_send_limiter
+from config import SEND_RETRIES
+
+LOGGER = logging.getLogger(__name__)
+
+### 🔹 Every Outgoing Message Goes Through Here
+async def send(chat_id, call):
+    """✅ Run `call()` (a Telegram send) within the per-chat and global budgets.
+
+    FloodWait from Telegram is waited out and the send retried.
+    """
+    for attempt in range(SEND_RETRIES + 1):
+        await chat_send_limiter.acquire(chat_id)
+        await global_send_limiter.acquire("global")
+        try:
+            return await call()
+        except FloodWait as e:
+            if attempt == SEND_RETRIES:
+                raise
+            LOGGER.info(f"FloodWait of {e.value}s sending to {chat_id}, retrying.")
+            await asyncio.sleep(e.value)
+
+async def reply_text(message, *args, **kwargs):
+    """✅ `message.reply_text` through `send`"""
+    return await send(message.chat.id, lambda: message.reply_text(*args, **kwargs))
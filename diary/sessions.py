@@ -0,0 +1,148 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from config import SESSION_TTL, SESSION_MAX_SIZE, SESSION_SWEEP_INTERVAL
+
+
+class SessionStore(ABC):
+    """✅ Conversation state per Telegram user (register / login steps)"""
+
+    def __init__(self, ttl=SESSION_TTL):
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0}
+
+    @abstractmethod
+    async def get(self, user_id):
+        ...
+
+    @abstractmethod
+    async def set(self, user_id, data):
+        ...
+
+    @abstractmethod
+    async def delete(self, user_id):
+        ...
+
+    @abstractmethod
+    async def size(self) -> int:
+        ...
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class _Record:
+    __slots__ = ("data", "expires_at")
+
+    def __init__(self, data, expires_at):
+        self.data = data
+        self.expires_at = expires_at
+
+
+class MemorySessionStore(SessionStore):
+    """✅ In-process store with per-entry TTL, LRU cap and a background sweeper"""
+
+    def __init__(self, ttl=SESSION_TTL, max_size=SESSION_MAX_SIZE, sweep_interval=SESSION_SWEEP_INTERVAL):
+        super().__init__(ttl)
+        self.max_size = max_size
+        self.sweep_interval = sweep_interval
+        self._records = OrderedDict()
+        self._sweeper = None
+
+    async def get(self, user_id):
+        record = self._records.get(user_id)
+        if record is None:
+            self.stats["misses"] += 1
+            return None
+        if record.expires_at <= time.monotonic():
+            del self._records[user_id]
+            self.stats["expired"] += 1
+            self.stats["misses"] += 1
+            return None
+        self._records.move_to_end(user_id)
+        self.stats["hits"] += 1
+        return record.data
+
+    async def set(self, user_id, data):
+        self._records[user_id] = _Record(data, time.monotonic() + self.ttl)
+        self._records.move_to_end(user_id)
+        while len(self._records) > self.max_size:
+            self._records.popitem(last=False)
+            self.stats["evicted"] += 1
+
+    async def delete(self, user_id):
+        self._records.pop(user_id, None)
+
+    async def size(self) -> int:
+        return len(self._records)
+
+    def sweep(self) -> int:
+        """✅ Drop every expired record, returns how many were removed"""
+        now = time.monotonic()
+        expired = [user_id for user_id, record in self._records.items() if record.expires_at <= now]
+        for user_id in expired:
+            del self._records[user_id]
+        self.stats["expired"] += len(expired)
+        return len(expired)
+
+    async def _sweep_forever(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            self.sweep()
+
+    async def start(self):
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_forever())
+
+    async def stop(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+
+
+class MongoSessionStore(SessionStore):
+    """✅ Shared store for several bot workers, expired by a Mongo TTL index.
+
+    Its stats only see this worker's reads: "expired" counts the stale
+    documents a `get` found before the TTL monitor removed them, not the ones
+    the monitor removes, and "evicted" stays 0 since there is no size cap.
+    """
+
+    def __init__(self, collection, ttl=SESSION_TTL):
+        super().__init__(ttl)
+        self.collection = collection
+
+    async def get(self, user_id):
+        doc = await self.collection.find_one({"_id": user_id})
+        if doc is None:
+            self.stats["misses"] += 1
+            return None
+        # The TTL monitor only runs once a minute, so filter stale documents here too.
+        if doc["expires_at"] <= datetime.utcnow():
+            self.stats["expired"] += 1
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return doc["data"]
+
+    async def set(self, user_id, data):
+        await self.collection.replace_one(
+            {"_id": user_id},
+            {"data": data, "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl)},
+            upsert=True,
+        )
+
+    async def delete(self, user_id):
+        await self.collection.delete_one({"_id": user_id})
+
+    async def size(self) -> int:
+        return await self.collection.estimated_document_count()
+
+    async def start(self):
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
@@ -0,0 +1,186 @@
+import asyncio
+import multiprocessing
+import pickle
+import queue
+import signal
+from io import BytesIO
+
+from pyrogram import idle
+from pyrogram.raw.core import TLObject
+
+from diary import DiaryBot, LOGGER
+from config import SHARDS, SHARD_QUEUE_SIZE, SHARD_METRICS_PORT
+
+# One receiver process talks to Telegram and hands every update to one of
+# SHARDS worker processes, picked by user id so that a user's conversation
+# steps always reach the same worker in order. Workers run all handlers and
+# keep conversation state in the shared (Mongo) session store.
+#
+# What each shard costs:
+# - Every worker logs in to Telegram with BOT_TOKEN to send, next to the
+#   receiver, and a worker restarted after a crash logs in again. Telegram
+#   limits how often a bot may log in, so keep SHARDS small and crashes rare.
+# - With the default RATE_LIMIT_BACKEND ("mongo") each send is two
+#   find_one_and_update round trips, the chat's bucket and the global one, and
+#   every send of every worker updates the same `global_send:global` document.
+# - The user cache is per worker and only hears of its own writes: a user
+#   changed or deleted through another worker can be served stale for up to
+#   CACHE_TTL seconds (lookups that found nothing are never cached).
+
+### 🔹 Routing
+def update_user_id(update) -> int:
+    """✅ The Telegram user an update belongs to (0 if none)"""
+    user_id = getattr(update, "user_id", None)
+    if user_id:
+        return user_id
+    message = getattr(update, "message", None)
+    for peer in (getattr(message, "from_id", None), getattr(message, "peer_id", None)):
+        user_id = getattr(peer, "user_id", None)
+        if user_id:
+            return user_id
+    return 0
+
+def shard_of(user_id: int, shards: int = SHARDS) -> int:
+    return user_id % shards
+
+
+### 🔹 Wire Format (raw TL bytes, the parsed objects are not picklable)
+def pack(update, users, chats) -> bytes:
+    return pickle.dumps((
+        update.write(),
+        [user.write() for user in users.values()],
+        [chat.write() for chat in chats.values()],
+    ))
+
+def unpack(data: bytes):
+    update, users, chats = pickle.loads(data)
+    users = [TLObject.read(BytesIO(user)) for user in users]
+    chats = [TLObject.read(BytesIO(chat)) for chat in chats]
+    return (
+        TLObject.read(BytesIO(update)),
+        {user.id: user for user in users},
+        {chat.id: chat for chat in chats},
+    )
+
+
+class ShardRouter(asyncio.Queue):
+    """✅ Stands in for the receiver's `dispatcher.updates_queue`.
+
+    Updates go to the worker queues; only the `None` stop markers stay local so
+    the receiver's (idle) handler tasks can exit.
+    """
+
+    def __init__(self, shard_queues):
+        super().__init__()
+        self.shard_queues = shard_queues
+        self.dropped = 0
+
+    def put_nowait(self, item):
+        if item is None:
+            return super().put_nowait(item)
+        update, users, chats = item
+        shard = shard_of(update_user_id(update), len(self.shard_queues))
+        try:
+            self.shard_queues[shard].put_nowait(pack(update, users, chats))
+        except queue.Full:
+            self.dropped += 1
+            LOGGER.error(f"⚠️ Shard {shard} queue is full, dropping an update.")
+        except Exception as e:
+            LOGGER.error(f"⚠️ Could not forward update to shard {shard}: {e}")
+
+
+### 🔹 Worker Process
+def run_worker(index, shard_queue):
+    # Ctrl+C reaches the whole process group; workers wait for the receiver's drain instead
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(_worker_main(index, shard_queue))
+
+async def _worker_main(index, shard_queue):
+    from diary.misc import sudo, watch_sudoers
+    from diary.media import load_media
+    from diary.modules import load_modules
+    from diary.database import warm_pool
+    from diary.keep_alive import keep_alive
+
+    # `diary` was imported when this process unpickled its target, before asyncio.run()
+    # made this loop, and Pyrogram registers handlers with tasks on the client's loop
+    loop = asyncio.get_running_loop()
+    DiaryBot.loop = DiaryBot.dispatcher.loop = loop
+
+    DiaryBot.no_updates = True  # never receive updates, only send
+    load_modules()
+    await asyncio.gather(warm_pool(), sudo(), load_media(), DiaryBot.start())
+    # Scraped and merged by the receiver's /metrics
+    metrics_server = await keep_alive(SHARD_METRICS_PORT + index, host="127.0.0.1")
+    sudoers_watch = asyncio.create_task(watch_sudoers())
+
+    # Same handler tasks Pyrogram starts itself when updates are enabled
+    dispatcher = DiaryBot.dispatcher
+    tasks = []
+    for _ in range(DiaryBot.workers):
+        lock = asyncio.Lock()
+        dispatcher.locks_list.append(lock)
+        tasks.append(asyncio.create_task(dispatcher.handler_worker(lock)))
+    LOGGER.info(f"Shard {index} ready with {DiaryBot.workers} handler tasks.")
+
+    while True:
+        data = await loop.run_in_executor(None, shard_queue.get)
+        if data is None:  # drain: everything before the marker still gets handled
+            break
+        update, users, chats = unpack(data)
+        # Remember access hashes so replies to these users resolve locally
+        await DiaryBot.fetch_peers(users.values())
+        await DiaryBot.fetch_peers(chats.values())
+        dispatcher.updates_queue.put_nowait((update, users, chats))
+
+    await dispatcher.updates_queue.join()
+    for _ in tasks:
+        dispatcher.updates_queue.put_nowait(None)
+    await asyncio.gather(*tasks)
+    # Handlers only queue their work per user, wait for the work itself
+    await DiaryBot.user_dispatcher.join_all()
+    sudoers_watch.cancel()
+    await DiaryBot.stop()
+    await metrics_server.cleanup()
+    LOGGER.info(f"Shard {index} drained and stopped.")
+
+
+### 🔹 Receiver Process
+async def run_receiver():
+    """✅ Start SHARDS workers, feed them updates, drain them on shutdown"""
+    context = multiprocessing.get_context("spawn")
+    shard_queues = [context.Queue(SHARD_QUEUE_SIZE) for _ in range(SHARDS)]
+
+    def spawn(index):
+        process = context.Process(target=run_worker, args=(index, shard_queues[index]), name=f"shard-{index}")
+        process.start()
+        return process
+
+    processes = [spawn(index) for index in range(SHARDS)]
+
+    async def supervise():
+        # A crashed worker is restarted on the same queue, so its users keep their order
+        while True:
+            await asyncio.sleep(1)
+            for index, process in enumerate(processes):
+                if not process.is_alive():
+                    LOGGER.error(f"⚠️ Shard {index} exited with {process.exitcode}, restarting.")
+                    processes[index] = spawn(index)
+
+    DiaryBot.dispatcher.updates_queue = ShardRouter(shard_queues)
+    DiaryBot.receive_only = True  # sessions, deletions and buffered writes live in the workers
+    await DiaryBot.start()
+    supervisor = asyncio.create_task(supervise())
+    LOGGER.info(f"@{DiaryBot.username} receiving for {SHARDS} shards.")
+
+    await idle()
+
+    # Drain: stop taking updates, then let each worker finish its queue
+    supervisor.cancel()
+    await DiaryBot.stop()
+    for shard_queue in shard_queues:
+        shard_queue.put(None)
+    loop = asyncio.get_running_loop()
+    for process in processes:
+        await loop.run_in_executor(None, process.join)
+    LOGGER.info("All shards drained.")
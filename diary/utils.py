@@ -1,6 +1,5 @@
 from functools import wraps
-from diary.database import get_sudoers 
-from config import OWNER_ID
+from config import SUDOERS
 
 def is_user_free(func):
     @wraps(func)
@@ -12,9 +11,9 @@ def sudoers_only(func):
     @wraps(func)
     async def wrapper(client, message, *args, **kwargs):
         user_id = message.from_user.id
-        sudoers = await get_sudoers()  # Fetch list of sudoers from DB
 
-        if user_id not in sudoers:
+        # In-memory set, kept in sync with the DB by `misc.watch_sudoers`
+        if user_id not in SUDOERS:
             await message.reply_text("This command is only available to bot admins.")
             return
         
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from diary.metrics import Counter
+from config import WRITE_FLUSH_INTERVAL, WRITE_BATCH_SIZE
+
+LOGGER = logging.getLogger(__name__)
+
+BUFFER_WRITES = Counter("diary_buffered_writes_total", "Buffered documents, by collection and outcome")
+
+# Duplicate key: another worker upserted the same key first, nothing to retry
+DUPLICATE_KEY = 11000
+
+
+class WriteBuffer:
+    """✅ Insert-if-missing writes collected in memory and sent as one `bulk_write`.
+
+    `add()` never waits on Mongo. The buffer is flushed every `interval`
+    seconds, as soon as it holds `batch_size` keys, and on `stop()`.
+    Adding a key that is already buffered is a no-op, like the upsert itself.
+    """
+
+    def __init__(self, collection, key_field, interval=WRITE_FLUSH_INTERVAL, batch_size=WRITE_BATCH_SIZE):
+        self.collection = collection
+        self.key_field = key_field
+        self.interval = interval
+        self.batch_size = batch_size
+        self.stats = {"added": 0, "written": 0, "flushes": 0, "failed": 0, "dropped": 0}
+        self._pending = {}  # key -> document to insert
+        self._full = asyncio.Event()
+        self._task = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, key, document):
+        """✅ Queue `document` for insertion unless a row with `key` exists"""
+        if key in self._pending:
+            return
+        self._pending[key] = document
+        self.stats["added"] += 1
+        if len(self._pending) >= self.batch_size:
+            self._full.set()
+
+    async def flush(self):
+        """✅ Write everything buffered so far"""
+        while self._pending:
+            keys = list(self._pending)[:self.batch_size]
+            batch = {key: self._pending.pop(key) for key in keys}
+            requests = [
+                UpdateOne({self.key_field: key}, {"$setOnInsert": {self.key_field: key, **document}}, upsert=True)
+                for key, document in batch.items()
+            ]
+            written, failed = len(batch), 0
+            try:
+                await self.collection.bulk_write(requests, ordered=False)
+            except asyncio.CancelledError:
+                self._requeue(batch)  # stop() writes it again
+                raise
+            except BulkWriteError as e:
+                details = e.details
+                errors = [error for error in details["writeErrors"] if error["code"] != DUPLICATE_KEY]
+                if errors:
+                    # Duplicates were written by another worker, the other errors were not written at all
+                    duplicates = len(details["writeErrors"]) - len(errors)
+                    written = details["nInserted"] + details["nUpserted"] + details["nMatched"] + duplicates
+                    failed = len(errors)
+                    LOGGER.error(f"⚠️ {failed} buffered writes to {self.collection.name} failed: {errors[0]['errmsg']}")
+            except Exception as e:
+                # Mongo unreachable: keep the batch for the next flush, up to a limit
+                self._requeue(batch)
+                LOGGER.error(f"⚠️ Could not flush {len(batch)} writes to {self.collection.name}: {e}")
+                return
+            self.stats["written"] += written
+            self.stats["failed"] += failed
+            self.stats["flushes"] += 1
+            BUFFER_WRITES.inc(written, collection=self.collection.name, outcome="written")
+            if failed:
+                BUFFER_WRITES.inc(failed, collection=self.collection.name, outcome="failed")
+
+    def _requeue(self, batch):
+        room = self.batch_size * 10 - len(self._pending)
+        for key, document in list(batch.items())[:max(room, 0)]:
+            self._pending.setdefault(key, document)
+        dropped = len(batch) - max(room, 0)
+        if dropped > 0:
+            self.stats["dropped"] += dropped
+            BUFFER_WRITES.inc(dropped, collection=self.collection.name, outcome="dropped")
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            await self.flush()
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """✅ Stop the timer and write what is left"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
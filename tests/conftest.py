@@ -0,0 +1,69 @@
+"""Shared setup: mongomock instead of Mongo, the real handlers on a fake Telegram client.
+
+Install `requirements-dev.txt`, then run `python -m pytest -q` from the repository root.
+Without mongomock-motor, the tests that need Mongo are skipped.
+
+Set TEST_MONGO_URI to run against a throwaway mongod instead; its `diarybot`
+database is dropped first. Tests that need a real server (e.g. `explain()`)
+only run then.
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The tests count KDF calls, not their cost
+os.environ.setdefault("SCRYPT_LOG_N", "10")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+from bench.loadgen import patch_mongo, start_bot, stop_bot  # noqa: E402
+
+TEST_MONGO_URI = os.environ.get("TEST_MONGO_URI")
+
+# Before anything imports `diary`
+try:
+    import mongomock_motor  # noqa: F401
+except ImportError:
+    mongomock_motor = None
+
+if TEST_MONGO_URI:
+    DB_OPS = patch_mongo(TEST_MONGO_URI)
+elif mongomock_motor is None:
+    # `run` skips the tests that need Mongo; importing `diary` must not connect anywhere
+    os.environ["MONGO_DB_URI"] = "mongodb://localhost:1"
+    DB_OPS = None
+else:
+    DB_OPS = patch_mongo(None)
+
+# Pyrogram binds the client to the current loop when `diary` is imported
+loop = asyncio.new_event_loop()
+asyncio.set_event_loop(loop)
+
+
+@pytest.fixture(scope="session")
+def run():
+    """✅ Run a coroutine on the bot's event loop"""
+    if not TEST_MONGO_URI:
+        pytest.importorskip("mongomock_motor")
+    return loop.run_until_complete
+
+
+@pytest.fixture(scope="session")
+def bot(run):
+    if TEST_MONGO_URI:
+        from diary import mongo_client
+
+        run(mongo_client.drop_database("diarybot"))
+    bot, client = run(start_bot(mocked=not TEST_MONGO_URI))
+    yield bot, client
+    run(stop_bot(bot))
+
+
+@pytest.fixture
+def real_mongo():
+    """✅ Skip unless the tests run against a mongod (TEST_MONGO_URI)"""
+    if not TEST_MONGO_URI:
+        pytest.skip("needs a real mongod, set TEST_MONGO_URI")
@@ -0,0 +1,96 @@
+"""Broadcasts: a failed one is logged, marked and resumable; cancelling keeps or ends the job."""
+import asyncio
+
+from pymongo.errors import AutoReconnect
+
+from diary import DiaryBot, broadcast
+from diary.broadcast import Broadcast, broadcasts_db, recipients
+from diary.database import pending_users_db
+
+
+class StatusMessage:
+    def __init__(self):
+        self.text = None
+
+    async def edit_text(self, text):
+        self.text = text
+
+
+class FailingCheckpoints:
+    """broadcasts_db whose first `update_one` fails, like a Mongo failover"""
+
+    def __init__(self):
+        self.failed = False
+
+    def __getattr__(self, name):
+        return getattr(broadcasts_db, name)
+
+    async def update_one(self, *args, **kwargs):
+        if not self.failed:
+            self.failed = True
+            raise AutoReconnect("primary stepped down")
+        return await broadcasts_db.update_one(*args, **kwargs)
+
+
+def sends(monkeypatch, gate=None):
+    sent = []
+
+    async def send_message(chat_id, text):
+        if gate is not None:
+            await gate.wait()
+        sent.append(chat_id)
+
+    monkeypatch.setattr(DiaryBot, "send_message", send_message, raising=False)
+    return sent
+
+
+async def everyone():
+    return [user_id async for user_id in recipients()]
+
+
+def test_failed_broadcast_is_marked_and_resumes(run, bot, monkeypatch):
+    run(pending_users_db.insert_many([{"telegram_id": 60_000_000 + i} for i in range(5)]))
+    users = run(everyone())
+    monkeypatch.setattr(broadcast, "BROADCAST_CHUNK_SIZE", 2)
+    sent = sends(monkeypatch)
+
+    monkeypatch.setattr(broadcast, "broadcasts_db", FailingCheckpoints())
+    status = StatusMessage()
+    job = run(Broadcast.create({"text": "hello"}, status))
+    run(job.run())  # does not raise
+
+    assert run(broadcasts_db.find_one({"_id": job.job["_id"]}))["status"] == "failed"
+    assert "failed" in status.text
+
+    monkeypatch.setattr(broadcast, "broadcasts_db", broadcasts_db)
+    resumed = run(Broadcast.unfinished(StatusMessage()))
+    assert resumed.job["_id"] == job.job["_id"]
+    run(resumed.run())
+
+    done = run(broadcasts_db.find_one({"_id": job.job["_id"]}))
+    assert done["status"] == "done"
+    assert done["last_id"] == users[-1]
+    # The chunk whose checkpoint failed is sent again, nobody is skipped
+    assert set(sent) == set(users)
+
+
+def test_cancel_by_owner_ends_it_and_shutdown_keeps_it(run, bot, monkeypatch):
+    gate = asyncio.Event()
+    sends(monkeypatch, gate)
+
+    async def start_and_cancel(by_owner):
+        job = await Broadcast.create({"text": "hello"}, StatusMessage())
+        task = asyncio.create_task(job.run())
+        await asyncio.sleep(0.01)  # blocked in the first sends
+        if by_owner:
+            job.cancel(task)
+        else:
+            task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return await broadcasts_db.find_one({"_id": job.job["_id"]})
+
+    assert run(start_and_cancel(by_owner=True))["status"] == "cancelled"
+    interrupted = run(start_and_cancel(by_owner=False))
+    assert interrupted["status"] == "running"
+    assert run(Broadcast.unfinished(StatusMessage())).job["_id"] == interrupted["_id"]
+    run(broadcasts_db.delete_many({}))
@@ -0,0 +1,111 @@
+"""AsyncCache: one load per key at a time, invalidation wins over a load in flight, misses are not cached."""
+import asyncio
+
+import pytest
+
+from diary.database.cache import AsyncCache
+
+
+class Loader:
+    """✅ Counts calls and returns `value` once `release` is set"""
+
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if isinstance(self.value, Exception):
+            raise self.value
+        return dict(self.value)
+
+
+def test_concurrent_misses_load_once(run):
+    cache = AsyncCache(ttl=60)
+    load = Loader({"username": "amy"})
+
+    async def scenario():
+        readers = [asyncio.create_task(cache.get("amy", load)) for _ in range(10)]
+        await asyncio.sleep(0)
+        load.release.set()
+        return await asyncio.gather(*readers)
+
+    results = run(scenario())
+    assert load.calls == 1
+    assert all(result is results[0] for result in results)
+    assert cache.stats["coalesced"] == 9
+    assert run(cache.get("amy", load)) is results[0]  # now a hit
+    assert load.calls == 1
+
+
+def test_failed_load_reaches_every_waiter_and_is_not_cached(run):
+    cache = AsyncCache(ttl=60)
+    load = Loader(RuntimeError("mongo went away"))
+
+    async def scenario():
+        readers = [asyncio.create_task(cache.get("amy", load)) for _ in range(3)]
+        await asyncio.sleep(0)
+        load.release.set()
+        return await asyncio.gather(*readers, return_exceptions=True)
+
+    assert [type(result) for result in run(scenario())] == [RuntimeError] * 3
+    load.value = {"username": "amy"}
+    assert run(cache.get("amy", load)) == {"username": "amy"}
+    assert load.calls == 2
+
+
+def test_invalidate_drops_cached_and_loading_values(run):
+    cache = AsyncCache(ttl=60)
+    load = Loader({"nickname": "old"})
+    load.release.set()
+    run(cache.get("amy", load))
+
+    load.value = {"nickname": "new"}
+    cache.invalidate("amy")
+    assert run(cache.get("amy", load)) == {"nickname": "new"}
+
+    # A write lands while a read is loading the document from before it
+    async def scenario():
+        cache.invalidate("amy")
+        load.value = {"nickname": "stale"}
+        load.release.clear()
+        reader = asyncio.create_task(cache.get("amy", load))
+        await asyncio.sleep(0)
+        cache.invalidate("amy")
+        load.release.set()
+        return await reader
+
+    assert run(scenario()) == {"nickname": "stale"}  # that reader sees what it read
+    load.value = {"nickname": "newest"}
+    assert run(cache.get("amy", load)) == {"nickname": "newest"}  # but it was not kept
+    assert load.calls == 4
+
+
+@pytest.mark.parametrize("telegram_id, username", [(61_000_000, None), (None, "amy")])
+def test_invalidate_user_forgets_its_keys(run, telegram_id, username):
+    from diary.database import invalidate_user, user_cache
+
+    load = Loader({"username": "amy"})
+    load.release.set()
+    for key in [("id", 61_000_000), ("username", "amy"), ("login", "amy")]:
+        run(user_cache.get(key, load))
+
+    invalidate_user(telegram_id, username)
+    cached = [key for key in [("id", 61_000_000), ("username", "amy"), ("login", "amy")] if key in user_cache._entries]
+    assert cached == ([("username", "amy"), ("login", "amy")] if username is None else [("id", 61_000_000)])
+    user_cache.invalidate(*cached)
+
+
+def test_misses_are_not_cached(run):
+    cache = AsyncCache(ttl=60)
+    documents = {}
+
+    async def load():
+        return documents.get("bob")
+
+    assert run(cache.get("bob", load)) is None
+    documents["bob"] = {"username": "bob"}  # e.g. registered on another shard
+    assert run(cache.get("bob", load)) == {"username": "bob"}
+    assert len(cache) == 1
@@ -0,0 +1,81 @@
+"""The deletion worker survives Mongo errors, and stop() keeps what is still pending."""
+import asyncio
+from types import SimpleNamespace
+
+from pymongo.errors import AutoReconnect
+
+from diary import db
+from diary.deleter import MessageDeleter
+
+
+class FakeTelegram:
+    def __init__(self):
+        self.deleted = []
+
+    async def delete_messages(self, chat_id, message_ids):
+        self.deleted.extend(message_ids)
+
+
+def _message(chat_id, message_id):
+    return SimpleNamespace(id=message_id, chat=SimpleNamespace(id=chat_id))
+
+
+def test_worker_survives_failed_cleanup(run, bot, monkeypatch):
+    telegram = FakeTelegram()
+    deleter = MessageDeleter(telegram, db.deleter_test_cleanup)
+
+    async def failing_delete_many(*args, **kwargs):
+        raise AutoReconnect("connection reset")
+
+    async def scenario():
+        await deleter.start()
+        monkeypatch.setattr(deleter.collection, "delete_many", failing_delete_many)
+        await deleter.schedule(_message(1, 1), delay=0.01)
+        await asyncio.sleep(0.05)
+        await deleter.schedule(_message(1, 2))
+        await asyncio.sleep(0.05)
+        assert not deleter._task.done()
+        await deleter.stop()
+
+    run(scenario())
+    assert telegram.deleted == [1, 2]
+
+
+def test_stop_saves_pending_deletions(run, bot):
+    collection = db.deleter_test_stop
+    deleter = MessageDeleter(FakeTelegram(), collection)
+
+    async def scenario():
+        # Not started, so nothing is deleted before stop()
+        await deleter.schedule(_message(2, 1))
+        await deleter.schedule(_message(2, 2), delay=60)
+        await deleter.stop()
+        return sorted([doc["_id"] async for doc in collection.find({})])
+
+    assert run(scenario()) == ["2:1", "2:2"]
+
+
+def test_delayed_deletions_are_saved_together_by_the_worker(run, bot, monkeypatch):
+    collection = db.deleter_test_batch
+    deleter = MessageDeleter(FakeTelegram(), collection)
+    writes = []
+    bulk_write = collection.bulk_write
+
+    async def counting_bulk_write(requests, **kwargs):
+        writes.append(len(requests))
+        return await bulk_write(requests, **kwargs)
+
+    monkeypatch.setattr(collection, "bulk_write", counting_bulk_write)
+
+    async def scenario():
+        await deleter.start()
+        for message_id in range(5):
+            await deleter.schedule(_message(3, message_id), delay=60)
+        assert writes == []  # nothing on the caller's path
+        await asyncio.sleep(0.05)
+        saved = sorted([doc["_id"] async for doc in collection.find({})])
+        await deleter.stop()
+        return saved
+
+    assert run(scenario()) == [f"3:{message_id}" for message_id in range(5)]
+    assert writes == [5]  # one round trip, and stop() had nothing left to save
@@ -0,0 +1,53 @@
+"""Per-user queues: a cancelled drain does not strand the user, a full queue is answered."""
+import asyncio
+
+from bench.loadgen import FakeUser
+from diary.dispatcher import UserDispatcher, serialized
+
+USER_ID = 70_000_000
+
+
+def test_cancelled_drain_leaves_no_stale_queue(run):
+    dispatcher = UserDispatcher()
+    handled = []
+
+    async def stuck():
+        await asyncio.Event().wait()
+
+    async def scenario():
+        dispatcher.submit(USER_ID, stuck)
+        await asyncio.sleep(0)
+        for task in dispatcher._tasks:
+            task.cancel()
+        await asyncio.sleep(0)
+
+        async def later():
+            handled.append("later")
+
+        assert dispatcher.submit(USER_ID, later) == "queued"
+        await asyncio.wait_for(dispatcher.join(USER_ID), 1)
+
+    run(scenario())
+    assert handled == ["later"]
+
+
+def test_full_queue_answers_the_message(run, bot):
+    _, client = bot
+    dispatcher = UserDispatcher(max_pending=1)
+    user = FakeUser(client, USER_ID + 1)
+    release = asyncio.Event()
+
+    async def handler(client, message):
+        await release.wait()
+
+    wrapped = serialized(dispatcher, handler)
+
+    async def scenario():
+        sent = client.calls["send_message"]
+        await wrapped(client, user.message("first"))
+        await wrapped(client, user.message("second"))
+        release.set()
+        await dispatcher.join(user.user.id)
+        return client.calls["send_message"] - sent
+
+    assert run(scenario()) == 1
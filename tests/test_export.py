@@ -0,0 +1,49 @@
+"""A sent export is not reported as failed when remembering its file_id fails, and a remembered one is resent."""
+from datetime import datetime
+
+from bench.loadgen import Flow
+from diary.database import invalidate_user, users_db
+from diary.database.pages import pages_db
+from diary.help import EXPORT_TEXTS
+from diary.modules import export
+
+
+def test_export_survives_a_failed_remember(run, bot, monkeypatch):
+    diary_bot, client = bot
+    flow = Flow(diary_bot, client, 60_000_100, "exporter")
+    run(flow.register())
+    # What add_page writes, without its transaction (mongomock has no sessions)
+    run(pages_db.insert_one({"owner": "exporter", "created_at": datetime.utcnow(), "body": "dear diary", "terms": ["dear", "diary"]}))
+    run(users_db.update_one({"username": "exporter"}, {"$inc": {"total_pages": 1}}))
+    invalidate_user(60_000_100, "exporter")
+
+    texts, documents = [], []
+    send_message, send_document = client.send_message, client.send_document
+
+    async def recording_send_message(chat_id, text, **kwargs):
+        texts.append(text)
+        return await send_message(chat_id, text, **kwargs)
+
+    async def recording_send_document(chat_id, document, **kwargs):
+        documents.append(document)
+        return await send_document(chat_id, document, **kwargs)
+
+    async def failing_remember(*args):
+        raise RuntimeError("mongo went away")
+
+    monkeypatch.setattr(client, "send_message", recording_send_message)
+    monkeypatch.setattr(client, "send_document", recording_send_document)
+    remember_export = export.remember_export
+    monkeypatch.setattr(export, "remember_export", failing_remember)
+
+    run(flow.step("export", flow.user.message("/export")))
+    assert len(documents) == 1
+    assert EXPORT_TEXTS["failed"] not in texts
+
+    # Nothing was remembered, so the next export is built again; then it is cached
+    monkeypatch.setattr(export, "remember_export", remember_export)
+    run(flow.step("export", flow.user.message("/export")))
+    run(flow.step("export", flow.user.message("/export")))
+    assert len(documents) == 3
+    assert documents[2].startswith("fake-")  # resent by file_id
+    assert EXPORT_TEXTS["failed"] not in texts
@@ -0,0 +1,25 @@
+"""Every query shape the bot sends is served by an index."""
+from diary.database import indexes
+
+
+class ScanningCollection:
+    """`find().explain()` answering with a COLLSCAN under a FETCH, like mongod"""
+
+    name = "scanned"
+
+    def find(self, query):
+        return self
+
+    async def explain(self):
+        return {"queryPlanner": {"winningPlan": {"stage": "FETCH", "inputStage": {"stage": "COLLSCAN"}}}}
+
+
+def test_audit_reports_collscans(run, monkeypatch):
+    monkeypatch.setattr(indexes, "QUERY_SHAPES", [(ScanningCollection(), {"field": 0})])
+
+    assert run(indexes.audit_query_shapes()) == [("scanned", {"field": 0})]
+
+
+def test_no_query_shape_scans_a_collection(run, bot, real_mongo):
+    # `bot` ran ensure_indexes()
+    assert run(indexes.audit_query_shapes()) == []
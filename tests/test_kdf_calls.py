@@ -0,0 +1,51 @@
+"""One KDF call per flow: a hash per registration, a verify per login."""
+import itertools
+from collections import Counter
+
+import pytest
+
+from bench.loadgen import Flow
+from diary.database import password
+
+USERS = 5
+_ids = itertools.count(20_000_000)
+
+
+@pytest.fixture
+def kdf_calls(monkeypatch):
+    calls = Counter()
+
+    def counted(name, func):
+        def wrapper(*args):
+            calls[name] += 1
+            return func(*args)
+        return wrapper
+
+    # `_run_kdf` looks these up at call time, so the pool runs the wrappers
+    monkeypatch.setattr(password, "hash_password", counted("hash", password.hash_password))
+    monkeypatch.setattr(password, "check_password", counted("check", password.check_password))
+    return calls
+
+
+def _flows(bot, client, prefix):
+    return [Flow(bot, client, next(_ids), f"{prefix}{i}") for i in range(USERS)]
+
+
+def test_registration_hashes_once(run, bot, kdf_calls):
+    flows = _flows(*bot, "kdfreg")
+    for flow in flows:
+        run(flow.register())
+
+    assert kdf_calls == {"hash": USERS}
+
+
+def test_login_verifies_once(run, bot, kdf_calls):
+    flows = _flows(*bot, "kdflogin")
+    for flow in flows:
+        run(flow.register())
+    kdf_calls.clear()
+
+    for flow in flows:
+        run(flow.login())
+
+    assert kdf_calls == {"check": USERS}
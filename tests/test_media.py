@@ -0,0 +1,68 @@
+"""Image sends: one upload per cold image, and only Telegram's file_id errors cause a re-upload."""
+import asyncio
+import json
+
+import pytest
+
+from bench.loadgen import FakeUser
+from diary import media
+
+
+def counting_uploads(client, monkeypatch, fail_file_ids=None):
+    uploads = []
+    send_photo = client.send_photo
+
+    async def slow_send_photo(chat_id, photo, **kwargs):
+        if photo.startswith("http"):
+            uploads.append(photo)
+            await asyncio.sleep(0.01)  # long enough for the other sends to arrive
+        elif fail_file_ids is not None:
+            raise fail_file_ids
+        return await send_photo(chat_id, photo, **kwargs)
+
+    monkeypatch.setattr(client, "send_photo", slow_send_photo)
+    return uploads
+
+
+def test_concurrent_cold_sends_upload_once(run, bot, monkeypatch):
+    _, client = bot
+    url = media.MEDIA["start"]
+    monkeypatch.setattr(media, "_file_ids", {})
+    uploads = counting_uploads(client, monkeypatch)
+
+    async def cold_start():
+        return await asyncio.gather(*(
+            media.reply_photo(FakeUser(client, 50_000_000 + i).message("/start"), "start") for i in range(10)
+        ))
+
+    sent = run(cold_start())
+
+    assert uploads == [url]
+    assert all(message.photo for message in sent)
+    assert media._file_ids[url] == sent[0].photo.file_id
+
+
+def test_other_errors_are_not_taken_for_a_stale_file_id(run, bot, monkeypatch):
+    _, client = bot
+    url = media.MEDIA["start"]
+    monkeypatch.setitem(media._file_ids, url, "cached")
+    uploads = counting_uploads(client, monkeypatch, fail_file_ids=ValueError("a bug"))
+
+    with pytest.raises(ValueError):
+        run(media.reply_photo(FakeUser(client, 50_000_000).message("/start"), "start"))
+
+    assert uploads == []
+    assert media._file_ids[url] == "cached"
+
+
+def test_undecodable_cached_file_ids_are_dropped(run, bot, monkeypatch, tmp_path):
+    url = media.MEDIA["start"]
+    cache_file = tmp_path / "media_cache.json"
+    cache_file.write_text(json.dumps({url: "corrupt"}))
+    monkeypatch.setattr(media, "MEDIA_CACHE_FILE", str(cache_file))
+    monkeypatch.setattr(media, "_file_ids", {})
+    run(media.media_db.delete_many({}))
+
+    run(media.load_media())
+
+    assert url not in media._file_ids
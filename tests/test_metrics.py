@@ -0,0 +1,104 @@
+"""Prometheus pages: merging the shards' pages, and what the scrape-time metrics report."""
+from diary import metrics
+
+RECEIVER = """# HELP diary_updates_total Updates handled, by handler
+# TYPE diary_updates_total counter
+# HELP diary_kdf_queue_depth Password hashes running or waiting
+# TYPE diary_kdf_queue_depth gauge
+diary_kdf_queue_depth 0
+"""
+
+SHARD = """# HELP diary_updates_total Updates handled, by handler
+# TYPE diary_updates_total counter
+diary_updates_total{handler="start"} 3
+# HELP diary_kdf_queue_depth Password hashes running or waiting
+# TYPE diary_kdf_queue_depth gauge
+diary_kdf_queue_depth 2
+"""
+
+
+def test_merge_labels_shard_samples_once_per_family():
+    merged = metrics.merge({None: RECEIVER, 0: SHARD, 1: SHARD}, "shard")
+
+    assert merged == """# HELP diary_updates_total Updates handled, by handler
+# TYPE diary_updates_total counter
+diary_updates_total{shard="0",handler="start"} 3
+diary_updates_total{shard="1",handler="start"} 3
+# HELP diary_kdf_queue_depth Password hashes running or waiting
+# TYPE diary_kdf_queue_depth gauge
+diary_kdf_queue_depth 0
+diary_kdf_queue_depth{shard="0"} 2
+diary_kdf_queue_depth{shard="1"} 2
+"""
+
+
+def test_user_cache_stats_are_exported(run, bot):
+    from diary.database import user_cache
+    from diary.keep_alive import metrics_page  # noqa: F401  registers the scrape-time metrics
+
+    async def lookups():
+        await user_cache.get("metrics-test", lambda: _loaded("doc"))
+        await user_cache.get("metrics-test", lambda: _loaded("doc"))
+        return await metrics.render()
+
+    page = run(lookups())
+
+    assert f'diary_user_cache_events_total{{event="hits"}} {user_cache.stats["hits"]}' in page
+    assert f'diary_user_cache_events_total{{event="misses"}} {user_cache.stats["misses"]}' in page
+    assert user_cache.stats["hits"] >= 1
+
+
+async def _loaded(value):
+    return value
+
+
+def test_session_evictions_are_exported(run, bot, monkeypatch):
+    from diary.keep_alive import metrics_page  # noqa: F401
+    from diary.sessions import MemorySessionStore
+
+    diary_bot, _ = bot
+    store = MemorySessionStore(max_size=1)
+    monkeypatch.setattr(diary_bot, "sessions", store)
+
+    async def fill():
+        await store.set(1, {})
+        await store.set(2, {})
+        await store.get(1)
+        await store.get(2)
+        return await metrics.render()
+
+    page = run(fill())
+
+    assert 'diary_session_events_total{event="evicted"} 1' in page
+    assert 'diary_session_events_total{event="misses"} 1' in page
+    assert 'diary_session_events_total{event="hits"} 1' in page
+
+
+def test_render_while_listener_threads_add_series(run):
+    import threading
+
+    counter = metrics.Counter("diary_test_threads_total", "Series added from another thread")
+    histogram = metrics.Histogram("diary_test_threads_seconds", "Series added from another thread")
+    done = threading.Event()
+
+    def listener():
+        for i in range(20_000):
+            counter.inc(command=f"cmd{i}")
+            histogram.observe(0.001, command=f"cmd{i}")
+        done.set()
+
+    async def scrape():
+        while not done.is_set():
+            await counter.render()
+            await histogram.render()
+
+    thread = threading.Thread(target=listener)
+    try:
+        thread.start()
+        run(scrape())
+        thread.join()
+        assert sum(counter.values.values()) == 20_000
+        assert len(histogram.values) == 20_000
+    finally:
+        metrics.REGISTRY.remove(counter)
+        metrics.REGISTRY.remove(histogram)
@@ -0,0 +1,65 @@
+"""Legacy login_db session rows fold into `sessions` once, even when a run is repeated."""
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from config import LOGIN_SESSION_DAYS
+from diary.database import login_db, sessions_db
+from diary.database import migrations
+
+# Recent enough that the TTL index on `expires_at` keeps the sessions
+DAY = datetime.utcnow().replace(microsecond=0) - timedelta(days=10)
+
+
+def legacy_rows(telegram_id, username, days):
+    # What the old save_login_session inserted, one row per login
+    return [
+        {"_id": ObjectId.from_datetime(DAY + timedelta(days=day)), "telegram_id": telegram_id, "username": username, "password": "hash"}
+        for day in days
+    ]
+
+
+class FailingDeletes:
+    """login_db whose delete_many fails, like a connection lost after the upserts"""
+
+    def __getattr__(self, name):
+        return getattr(login_db, name)
+
+    async def delete_many(self, query):
+        raise ConnectionError("connection lost")
+
+
+def test_compacts_once_and_survives_a_repeated_run(run, bot, monkeypatch):
+    run(login_db.insert_many(
+        legacy_rows(50_000_001, "legacy1", [0, 3, 7])
+        + legacy_rows(50_000_002, "legacy2", [1])
+        + [{"telegram_id": 50_000_003, "username": "legacy3", "password": "hash", "email": "legacy3@gmail.com"}]
+    ))
+    # legacy2 has logged in since the new code shipped
+    now = datetime.utcnow().replace(microsecond=0)
+    run(sessions_db.insert_one({
+        "telegram_id": 50_000_002, "username": "legacy2", "logins": 2,
+        "first_login_at": now, "last_login_at": now, "expires_at": now + timedelta(days=LOGIN_SESSION_DAYS),
+    }))
+
+    monkeypatch.setattr(migrations, "login_db", FailingDeletes())
+    with pytest.raises(ConnectionError):
+        run(migrations.compact_login_sessions())
+    monkeypatch.undo()
+    run(migrations.compact_login_sessions())
+
+    first = run(sessions_db.find_one({"telegram_id": 50_000_001, "username": "legacy1"}))
+    assert first["logins"] == 3
+    assert first["first_login_at"] == DAY
+    assert first["last_login_at"] == DAY + timedelta(days=7)
+    assert first["expires_at"] == DAY + timedelta(days=7 + LOGIN_SESSION_DAYS)
+
+    second = run(sessions_db.find_one({"telegram_id": 50_000_002, "username": "legacy2"}))
+    assert second["logins"] == 3
+    assert second["first_login_at"] == DAY + timedelta(days=1)
+    assert second["last_login_at"] == now
+
+    # Only the session rows are gone, credentials stay
+    assert run(login_db.count_documents({"username": {"$in": ["legacy1", "legacy2"]}})) == 0
+    assert run(login_db.count_documents({"username": "legacy3"})) == 1
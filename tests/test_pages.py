@@ -0,0 +1,35 @@
+"""Keyset pagination pages through pages created in the same millisecond without skipping or repeating one."""
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from diary.database.pages import encode_cursor, get_pages, pages_db
+
+OWNER = "pagingowner"
+
+
+def test_paging_across_equal_timestamps(run):
+    start = datetime(2026, 1, 1)
+    # Runs of pages sharing a created_at, longer than a screen, so screens end inside a run
+    times = [start] * 3 + [start + timedelta(seconds=1)] * 4 + [start + timedelta(seconds=2)]
+    pages = [{"_id": ObjectId(), "owner": OWNER, "created_at": created_at, "body": str(i)} for i, created_at in enumerate(times)]
+    run(pages_db.insert_many(pages))
+    newest_first = [page["_id"] for page in sorted(pages, key=lambda page: (page["created_at"], page["_id"]), reverse=True)]
+
+    seen, screen, cursor = [], [], None
+    while True:
+        screen, has_more = run(get_pages(OWNER, cursor, limit=3))
+        seen += [page["_id"] for page in screen]
+        if not has_more:
+            break
+        cursor = encode_cursor(screen[-1])
+    assert seen == newest_first
+
+    # And back up from the oldest screen, each screen still newest first
+    seen = [page["_id"] for page in screen]
+    while True:
+        screen, has_more = run(get_pages(OWNER, encode_cursor(screen[0]), newer=True, limit=3))
+        seen = [page["_id"] for page in screen] + seen
+        if not has_more:
+            break
+    assert seen == newest_first
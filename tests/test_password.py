@@ -0,0 +1,66 @@
+"""Password hashing: legacy hashes verify and are upgraded on login, calibration keeps its budget, the KDF queue is bounded."""
+import asyncio
+import time
+
+import pytest
+
+from diary.database import calibrate, password, users_db
+from diary.database.password import BcryptHasher, ScryptHasher, check_password, needs_rehash
+from diary.modules import auth
+
+
+def test_hashes_of_every_algorithm_verify():
+    legacy = BcryptHasher(rounds=4).hash("legacy-pass!")
+    cheaper = ScryptHasher(log_n=8).hash("legacy-pass!")
+    current = password.hash_password("legacy-pass!")
+
+    for hashed in (legacy, cheaper, current):
+        assert check_password("legacy-pass!", hashed)
+        assert not check_password("wrong-pass!", hashed)
+    assert needs_rehash(legacy) and needs_rehash(cheaper)
+    assert not needs_rehash(current)
+
+
+def test_login_rehashes_a_legacy_hash(run, bot):
+    legacy = BcryptHasher(rounds=4).hash("legacy-pass!")
+    run(auth.register_user(70_000_000, "rehashuser", legacy, "rehash@gmail.com", "rehash"))
+
+    async def login_and_wait():
+        result = await auth.login_user("rehashuser", "legacy-pass!")
+        await asyncio.gather(*auth._rehashes)
+        return result
+
+    assert run(login_and_wait()) == (True, 70_000_000)
+    stored = run(users_db.find_one({"username": "rehashuser"}))["password"]
+    assert stored.startswith("$scrypt$") and not needs_rehash(stored)
+    assert run(auth.login_user("rehashuser", "legacy-pass!")) == (True, 70_000_000)
+
+
+def test_calibration_stays_within_budget(monkeypatch):
+    # 2 ** log_n µs per hash, so the choice does not depend on this machine
+    monkeypatch.setattr(calibrate, "COST_RANGES", {"scrypt": ("log_n", "SCRYPT_LOG_N", range(8, 20))})
+    monkeypatch.setattr(calibrate, "_time_hash", lambda hasher: (1 << hasher.log_n) / 1e6)
+
+    # 4 logins on 2 workers: the last waits for 2 hashes, each may take 10 ms
+    chosen = calibrate.calibrate(target_ms=20, concurrent=4, workers=2)
+
+    assert chosen == {"scrypt": ("SCRYPT_LOG_N", 13, 8.2)}
+
+
+def test_kdf_waits_are_bounded(run, bot, monkeypatch):
+    monkeypatch.setattr(password, "_slots", asyncio.Semaphore(1))
+    monkeypatch.setattr(password, "KDF_WAIT_TIMEOUT", 0.05)
+
+    async def storm():
+        holder = asyncio.create_task(password._run_kdf(time.sleep, 0.2))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(password._run_kdf(time.sleep, 0))
+        await asyncio.sleep(0.01)
+        depth = password.kdf_queue_depth()
+        with pytest.raises(password.KdfBusy):
+            await waiter
+        await holder
+        return depth
+
+    assert run(storm()) == 2
+    assert password.kdf_queue_depth() == 0
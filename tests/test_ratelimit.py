@@ -0,0 +1,43 @@
+"""Token buckets: a burst is allowed, then requests are refused until tokens refill, in memory and in Mongo."""
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from diary import db, ratelimit
+from diary.ratelimit import MongoRateLimiter, RateLimiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(seconds=0.0)
+    monkeypatch.setattr(ratelimit, "time", SimpleNamespace(monotonic=lambda: 1000 + now.seconds))
+    start = datetime.utcnow().replace(microsecond=0)  # older buckets fall to the TTL index
+    monkeypatch.setattr(ratelimit, "datetime", SimpleNamespace(utcnow=lambda: start + timedelta(seconds=now.seconds)))
+    return now
+
+
+def attempts(run, limiter, key, count):
+    return [run(limiter.try_acquire(key)) for _ in range(count)]
+
+
+def test_memory_bucket_refills_and_denies(run, clock):
+    limiter = RateLimiter("test_memory", rate=1, burst=2)
+
+    assert attempts(run, limiter, "a", 3) == [True, True, False]
+    assert attempts(run, limiter, "b", 1) == [True]  # buckets are per key
+    clock.seconds += 1
+    assert attempts(run, limiter, "a", 2) == [True, False]
+    clock.seconds += 10  # never more than `burst` saved up
+    assert attempts(run, limiter, "a", 3) == [True, True, False]
+
+
+def test_mongo_bucket_refills_and_denies(run, clock):
+    limiter = MongoRateLimiter("test_mongo", rate=1, burst=2, collection=db.rate_limits)
+
+    assert attempts(run, limiter, "a", 3) == [True, True, False]
+    assert run(db.rate_limits.count_documents({"_id": "test_mongo:a"})) == 1  # upserted once
+    clock.seconds += 1
+    assert attempts(run, limiter, "a", 2) == [True, False]
+    clock.seconds += 10
+    assert attempts(run, limiter, "a", 3) == [True, True, False]
@@ -0,0 +1,23 @@
+"""Concurrent registrations of one username: the unique index lets exactly one in."""
+import asyncio
+
+from diary.database import users_db
+from diary.modules.auth import register_user
+
+ATTEMPTS = 100
+
+
+def test_same_username_registers_once(run, bot):
+    async def race():
+        return await asyncio.gather(*(
+            register_user(30_000_000 + i, "raceuser", "hash", f"race{i}@gmail.com", "race")
+            for i in range(ATTEMPTS)
+        ))
+
+    results = run(race())
+
+    assert sum(success for success, _ in results) == 1
+    assert [response for success, response in results if not success] == (
+        ["❌ Username already exists! Try another."] * (ATTEMPTS - 1)
+    )
+    assert run(users_db.count_documents({"username": "raceuser"})) == 1
@@ -0,0 +1,30 @@
+"""A "More results" button only pages through its owner's search."""
+from bson import ObjectId
+
+from bench.loadgen import Flow
+from diary.callbacks import encode
+from diary.database.search import save_search
+
+
+def test_more_results_of_someone_elses_search_looks_expired(run, bot, monkeypatch):
+    diary_bot, client = bot
+    owner = Flow(diary_bot, client, 60_000_000, "searchowner")
+    intruder = Flow(diary_bot, client, 60_000_001, "searchintruder")
+    run(owner.register())
+    run(intruder.register())
+    search = run(save_search("searchowner", "secret plans"))
+
+    answers = []
+
+    async def answer_callback_query(callback_query_id, **kwargs):
+        answers.append(kwargs)
+        return True
+
+    monkeypatch.setattr(client, "answer_callback_query", answer_callback_query)
+    edits = client.calls["edit_message_text"]
+    cursor = (bytes([1]) + ObjectId().binary).hex()
+
+    run(intruder.step("more", intruder.user.callback(encode("more", f"{search['_id']}:{cursor}"))))
+
+    assert [answer["text"] for answer in answers] == ["⌛ This search has expired, please search again."]
+    assert client.calls["edit_message_text"] == edits
@@ -0,0 +1,50 @@
+"""MemorySessionStore: records expire after their TTL and the least recently used go first."""
+from types import SimpleNamespace
+
+import pytest
+
+from diary import sessions
+from diary.sessions import MemorySessionStore, SessionStore
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(sessions, "time", SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+
+def test_records_expire_after_ttl(run, clock):
+    store = MemorySessionStore(ttl=60, max_size=10)
+    run(store.set(1, {"step": "username"}))
+    run(store.set(2, {"step": "password"}))
+
+    clock.value += 59
+    assert run(store.get(1)) == {"step": "username"}
+    clock.value += 1
+    assert run(store.get(1)) is None
+    assert store.sweep() == 1  # user 2, never read again
+    assert run(store.size()) == 0
+    assert store.stats == {"hits": 1, "misses": 1, "expired": 2, "evicted": 0}
+
+
+def test_least_recently_used_is_evicted(run, clock):
+    store = MemorySessionStore(ttl=60, max_size=2)
+    run(store.set(1, {"step": "username"}))
+    run(store.set(2, {"step": "username"}))
+    run(store.get(1))  # 2 is now the least recently used
+    run(store.set(3, {"step": "username"}))
+
+    assert run(store.get(2)) is None
+    assert run(store.get(1)) is not None
+    assert run(store.get(3)) is not None
+    assert store.stats["evicted"] == 1
+
+
+def test_store_without_methods_cannot_be_built():
+    class Incomplete(SessionStore):
+        async def get(self, user_id):
+            return None
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,19 @@
+"""A sharded worker registers the bot's handlers and answers updates sent through the receiver's router."""
+from bench.loadgen import RawUser, ShardedBot
+
+
+def test_worker_handles_routed_updates(run, bot):
+    bot, client = bot
+    sharded = ShardedBot(1)
+    user = RawUser(40_000_000)
+
+    async def start_send_stop():
+        await sharded.start()
+        calls = await sharded.send(user, user.message("/start"))
+        return calls, await sharded.stop()
+
+    calls, (worker,) = run(start_send_stop())
+
+    assert worker["handlers"] == sum(len(group) for group in bot.dispatcher.groups.values())
+    assert calls
+    assert worker["errors"] == 0
@@ -0,0 +1,46 @@
+"""The sudoers watcher outlives Mongo errors and falls back to polling."""
+import asyncio
+from types import SimpleNamespace
+
+from pymongo.errors import AutoReconnect, OperationFailure
+
+from config import OWNER_ID, SUDOERS
+from diary import misc
+
+
+class FlakySudoers:
+    """Fails the first `find_one`, has no change streams, then returns `sudoers`"""
+
+    def __init__(self, sudoers):
+        self.sudoers = sudoers
+        self.finds = 0
+
+    async def find_one(self, query):
+        self.finds += 1
+        if self.finds == 1:
+            raise AutoReconnect("connection reset")
+        return {"sudo": "sudo", "sudoers": self.sudoers}
+
+    def watch(self, **kwargs):
+        raise OperationFailure("The $changeStream stage is only supported on replica sets")
+
+
+def test_watcher_survives_errors_and_polls(run, bot, monkeypatch):
+    collection = FlakySudoers([OWNER_ID, 123])
+    monkeypatch.setattr(misc, "db", SimpleNamespace(sudoers=collection))
+    monkeypatch.setattr(misc, "SUDOERS_POLL_INTERVAL", 0.01)
+
+    async def watch_a_while():
+        task = asyncio.create_task(misc.watch_sudoers())
+        await asyncio.sleep(0.05)
+        assert not task.done()
+        collection.sudoers = [OWNER_ID, 456]
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+    try:
+        run(watch_a_while())
+        assert 456 in SUDOERS and 123 not in SUDOERS
+        assert collection.finds > 3
+    finally:
+        misc._sync_sudoers([])
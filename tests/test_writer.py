@@ -0,0 +1,34 @@
+"""Buffered writes are counted by what Mongo actually wrote."""
+from pymongo.errors import BulkWriteError
+
+from diary.writer import BUFFER_WRITES, DUPLICATE_KEY, WriteBuffer
+
+
+class PartlyFailingCollection:
+    """Upserts all but two requests: one duplicate key, one rejected document"""
+
+    name = "writer_test"
+
+    async def bulk_write(self, requests, ordered):
+        raise BulkWriteError({
+            "writeErrors": [
+                {"index": 0, "code": DUPLICATE_KEY, "errmsg": "E11000 duplicate key"},
+                {"index": 1, "code": 121, "errmsg": "Document failed validation"},
+            ],
+            "nInserted": 0,
+            "nUpserted": len(requests) - 2,
+            "nMatched": 0,
+        })
+
+
+def test_failed_writes_are_not_counted_as_written(run):
+    buffer = WriteBuffer(PartlyFailingCollection(), "telegram_id")
+    for telegram_id in range(5):
+        buffer.add(telegram_id, {"name": f"user{telegram_id}"})
+
+    run(buffer.flush())
+
+    assert buffer.stats["written"] == 4  # three upserted, one already there
+    assert buffer.stats["failed"] == 1
+    assert BUFFER_WRITES.values[(("collection", "writer_test"), ("outcome", "written"))] == 4
+    assert BUFFER_WRITES.values[(("collection", "writer_test"), ("outcome", "failed"))] == 1